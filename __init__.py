@@ -1 +1,7 @@
+from . import controllers
 from . import models
+
+
+def post_init_hook(env):
+    """Populate the open items snapshot from the existing journal items."""
+    env['mass.reconcile.open.item'].rebuild()
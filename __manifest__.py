@@ -1,6 +1,6 @@
 {
     'name': 'Mass Bank Reconciliation',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Accounting',
     'summary': 'Automate mass bank statement reconciliation with confidence scoring',
     'description': """
@@ -21,7 +21,9 @@
     'data': [
         'security/ir.model.access.csv',
         'security/mass_reconcile_security.xml',
+        'data/ir_cron_data.xml',
     ],
+    'post_init_hook': 'post_init_hook',
     'license': 'LGPL-3',
     'installable': True,
     'application': True,
@@ -0,0 +1,107 @@
+"""HTTP endpoints exposing the matching engine and audit export to external systems."""
+
+import tempfile
+
+from werkzeug.wsgi import wrap_file
+
+from odoo import http
+from odoo.http import request
+
+
+class MassReconcileController(http.Controller):
+
+    @http.route('/mass_reconcile/match', type='json', auth='user', methods=['POST'])
+    def match_statement_lines(self, journal_id, lines, limit=5):
+        """
+        Rank candidates for statement lines that are not in Odoo yet.
+
+        Nothing is created: no batch, statement line or proposal records.
+
+        Args:
+            journal_id: id of the bank journal the lines belong to
+            lines: list of {'ref', 'amount', 'date', 'reference', 'currency',
+                'partner_id', 'partner_name', 'account_number'} payloads
+            limit: number of candidates returned per line
+
+        Returns:
+            list: one {'ref', 'candidates'} dict per line, in request order
+        """
+        return request.env['mass.reconcile.engine'].match_statement_payloads(
+            journal_id, lines, limit=limit,
+        )
+
+    @http.route('/mass_reconcile/review', type='json', auth='user', methods=['POST'])
+    def review_page(self, batch_id, confidence_class=None, after=None, limit=80):
+        """
+        One keyset-paginated page of a batch's review grid.
+
+        Args:
+            batch_id: id of the mass.reconcile.batch
+            confidence_class: optional confidence class of the proposals
+            after: 'next_cursor' of the previous page, None for the first one
+            limit: number of proposals per page
+
+        Returns:
+            dict: {'lines': [...], 'next_cursor': list or None}
+        """
+        batch = request.env['mass.reconcile.batch'].browse(batch_id)
+        return batch.get_review_page(confidence_class=confidence_class, after=after, limit=limit)
+
+    @http.route('/mass_reconcile/export/proposals.<string:file_format>', type='http', auth='user',
+                methods=['GET'])
+    def export_proposals(self, file_format, batch_ids=None, company_ids=None,
+                         date_from=None, date_to=None):
+        """
+        Download the audit export of match proposals as CSV or Parquet.
+
+        The export is spooled to a temporary file, not held in memory, and
+        streamed from there.
+
+        Args:
+            file_format: 'csv' or 'parquet'
+            batch_ids: optional comma-separated batch ids
+            company_ids: optional comma-separated company ids
+            date_from: optional first statement line date (ISO)
+            date_to: optional last statement line date (ISO)
+        """
+        def parse_ids(value):
+            return [int(v) for v in value.split(',')] if value else None
+
+        tmp = tempfile.TemporaryFile()
+        request.env['mass.reconcile.export'].export_proposals(
+            tmp, file_format=file_format,
+            batch_ids=parse_ids(batch_ids), company_ids=parse_ids(company_ids),
+            date_from=date_from, date_to=date_to,
+        )
+        size = tmp.tell()
+        tmp.seek(0)
+        content_type = 'text/csv' if file_format == 'csv' else 'application/vnd.apache.parquet'
+        return request.make_response(
+            wrap_file(request.httprequest.environ, tmp),
+            headers=[
+                ('Content-Type', content_type),
+                ('Content-Length', str(size)),
+                ('Content-Disposition', f'attachment; filename="match_proposals.{file_format}"'),
+            ],
+        )
+
+    @http.route('/mass_reconcile/batch/<int:batch_id>/import', type='http', auth='user',
+                methods=['POST'])
+    def import_statement_file(self, batch_id, statement_file, file_format='camt053', match=None):
+        """
+        Upload a CAMT.053 or CSV statement file into a batch.
+
+        The upload is read from werkzeug's spooled file, and parsed and
+        imported chunk by chunk.
+
+        Args:
+            batch_id: id of the mass.reconcile.batch
+            statement_file: uploaded file
+            file_format: 'camt053' or 'csv'
+            match: any non-empty value matches the chunks while importing
+        """
+        batch = request.env['mass.reconcile.batch'].browse(batch_id)
+        count = batch.action_import_statement_file(
+            statement_file.stream, file_format=file_format, match=bool(match),
+        )
+        return request.make_json_response({'imported': count})
@@ -0,0 +1,25 @@
+"""Upgrade to 18.0.1.1.0: populate the tables and counters added since 18.0.1.0.0."""
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """
+    Drop the unused move line and statement line indexes, fill the content hashes of the
+    existing statement lines (the column is created empty by the pre-migrate
+    script), build the open items snapshot (post_init_hook only runs on
+    install) and recount the statistics of the existing batches, whose new
+    counters start at 0.
+    """
+    if not version:
+        return
+    # Partial indexes of earlier 18.0.1.1.0 builds: candidate queries read the
+    # open items snapshot, not account_move_line
+    cr.execute("DROP INDEX IF EXISTS account_move_line_mass_reconcile_amount_idx")
+    cr.execute("DROP INDEX IF EXISTS account_move_line_mass_reconcile_partner_idx")
+    # Review pages are keyed on the proposals, not on the statement lines
+    cr.execute("DROP INDEX IF EXISTS account_bank_statement_line_mass_reconcile_review_idx")
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['account.bank.statement.line']._fill_content_hashes()
+    env['mass.reconcile.open.item'].rebuild()
+    env['mass.reconcile.batch'].with_context(active_test=False).search([])._refresh_statistics()
@@ -0,0 +1,12 @@
+"""Upgrade to 18.0.1.1.0: create the statement line content hash column."""
+
+
+def migrate(cr, version):
+    """
+    Create the content_hash column before the module is loaded, so the ORM
+    does not compute it line by line for every existing statement line; the
+    post-migrate script fills it in one statement.
+    """
+    if not version:
+        return
+    cr.execute("ALTER TABLE account_bank_statement_line ADD COLUMN IF NOT EXISTS content_hash varchar")
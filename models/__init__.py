@@ -3,3 +3,19 @@ from . import account_bank_statement_line
 from . import mass_reconcile_match
 from . import mass_reconcile_engine
 from . import mass_reconcile_scorer
+from . import mass_reconcile_partner_key
+from . import mass_reconcile_context_mixin
+from . import account_journal
+from . import account_reconcile_model
+from . import res_currency
+from . import account_account
+from . import account_move_line
+from . import mass_reconcile_open_item
+from . import mass_reconcile_claim
+from . import mass_reconcile_queue
+from . import mass_reconcile_candidate_cache
+from . import mass_reconcile_export
+from . import mass_reconcile_import
+from . import mass_reconcile_orchestrator
+from . import account_move
+from . import account_full_reconcile
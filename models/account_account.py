@@ -0,0 +1,12 @@
+from odoo import models
+
+
+class AccountAccount(models.Model):
+    """Keep the mass reconciliation open items snapshot in sync with reconcilable accounts."""
+    _inherit = 'account.account'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'reconcile' in vals:
+            self.env['mass.reconcile.open.item']._sync_accounts(self.ids)
+        return res
@@ -1,4 +1,75 @@
-from odoo import models, fields
+import hashlib
+import re
+import string
+from collections import Counter
+
+from odoo import models, fields, api
+from odoo.tools import float_repr
+
+
+# Only ASCII letters are case folded and only ASCII whitespace is collapsed, so
+# that CONTENT_HASH_SQL gives the same digest whatever the database locale
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_WHITESPACE_RE = re.compile(r'[ \t\r\n\f\v]+')
+_NAME_TOKEN_RE = re.compile(r'[A-Za-z0-9]+')
+_ACCOUNT_NOISE_RE = re.compile(r'[^A-Za-z0-9]')
+
+
+def statement_line_hash(journal_id, date, amount, payment_ref, partner_name, account_number,
+                        transaction_ref=None):
+    """
+    Normalized content hash of a statement line, identical for re-sent copies.
+
+    The normalization is reproduced by CONTENT_HASH_SQL; change both together.
+
+    Args:
+        journal_id: account.journal id
+        date: date or ISO string
+        amount: signed amount
+        payment_ref: label / reference
+        partner_name: counterparty name
+        account_number: counterparty bank account
+        transaction_ref: bank transaction id (CAMT AcctSvcrRef, import id), when
+            the bank sends one: it tells apart same-content transactions
+
+    Returns:
+        str: hex SHA-1 digest
+    """
+    reference = _WHITESPACE_RE.sub(' ', (payment_ref or '').translate(_ASCII_LOWER)).strip(' ')
+    counterparty = (
+        _ACCOUNT_NOISE_RE.sub('', account_number or '').upper()
+        or ' '.join(_NAME_TOKEN_RE.findall(partner_name or '')).translate(_ASCII_LOWER)
+    )
+    parts = [
+        str(journal_id or ''),
+        str(date or ''),
+        float_repr(amount or 0.0, 2),
+        reference,
+        counterparty,
+    ]
+    if transaction_ref:
+        parts.append(transaction_ref)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+# statement_line_hash() of the row aliased "l" of account_bank_statement_line,
+# used to fill the hashes of many lines in one statement
+CONTENT_HASH_SQL = r"""
+    encode(sha1(convert_to(concat_ws('|',
+        COALESCE(l.journal_id::text, ''),
+        COALESCE(to_char(l.date, 'YYYY-MM-DD'), ''),
+        round(COALESCE(l.amount, 0), 2)::text,
+        btrim(regexp_replace(
+            translate(COALESCE(l.payment_ref, ''), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'),
+            '[ \t\r\n\f\v]+', ' ', 'g'), ' '),
+        COALESCE(
+            NULLIF(upper(regexp_replace(COALESCE(l.account_number, ''), '[^A-Za-z0-9]', '', 'g')), ''),
+            translate(btrim(regexp_replace(COALESCE(l.partner_name, ''), '[^A-Za-z0-9]+', ' ', 'g'), ' '),
+                      'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+        ),
+        COALESCE(NULLIF(l.transaction_ref, ''), NULLIF(l.unique_import_id, ''))
+    ), 'UTF8')), 'hex')
+"""
 
 
 class AccountBankStatementLine(models.Model):
@@ -23,6 +94,13 @@ class AccountBankStatementLine(models.Model):
         ondelete='set null',
         help='Best suggested accounting move for reconciliation'
     )
+    inferred_partner_id = fields.Many2one(
+        'res.partner',
+        string='Inferred Partner',
+        ondelete='set null',
+        help='Probable partner resolved from the counterparty bank account or name, '
+             'used to scope the candidate search when no partner is set'
+    )
     match_state = fields.Selection(
         selection=[
             ('unmatched', 'Unmatched'),
@@ -34,3 +112,90 @@ class AccountBankStatementLine(models.Model):
         string='Match State',
         help='Current state of this line in the reconciliation process'
     )
+    match_processed = fields.Boolean(
+        string='Match Processed',
+        default=False,
+        copy=False,
+        help='Checkpoint flag: set once the current matching run has processed this line'
+    )
+
+    transaction_ref = fields.Char(
+        string='Bank Transaction Reference',
+        copy=False,
+        help='Transaction id given by the bank (CAMT AcctSvcrRef), part of the content hash'
+    )
+    import_key = fields.Char(
+        string='Import Key',
+        copy=False,
+        help='Identifier of the statement file import that created the line; identical '
+             'lines of one file are distinct transactions, not duplicates of each other'
+    )
+    content_hash = fields.Char(
+        string='Content Hash',
+        compute='_compute_content_hash',
+        store=True,
+        index=True,
+        help='Hash of journal, date, amount, reference, counterparty and bank '
+             'transaction id, used to detect lines of re-sent statement files'
+    )
+    duplicate_of_id = fields.Many2one(
+        'account.bank.statement.line',
+        string='Duplicate Of',
+        ondelete='set null',
+        copy=False,
+        help='Earlier statement line with the same content; duplicates are not matched'
+    )
+
+    @api.depends('journal_id', 'date', 'amount', 'payment_ref', 'partner_name', 'account_number',
+                 'transaction_ref', 'unique_import_id')
+    def _compute_content_hash(self):
+        for line in self:
+            line.content_hash = statement_line_hash(
+                line.journal_id.id, line.date, line.amount, line.payment_ref,
+                line.partner_name, line.account_number,
+                transaction_ref=line.transaction_ref or line.unique_import_id,
+            )
+
+    @api.model
+    def _fill_content_hashes(self):
+        """Compute the missing content hashes in one statement (see CONTENT_HASH_SQL)."""
+        self.flush_model()
+        self.env.cr.execute(f"""
+            UPDATE account_bank_statement_line l
+               SET content_hash = {CONTENT_HASH_SQL}
+             WHERE l.content_hash IS NULL
+        """)
+        self.invalidate_model(['content_hash'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Count new lines in their batch statistics, and queue continuous matching."""
+        lines = super().create(vals_list)
+        Batch = self.env['mass.reconcile.batch']
+        Batch._apply_statistics_delta(Counter(), Batch._count_line_statistics(lines))
+        lines._enqueue_continuous_matching()
+        return lines
+
+    def write(self, vals):
+        """Move lines between batch statistics counters when their batch or state changes."""
+        if 'batch_id' not in vals and 'match_state' not in vals:
+            return super().write(vals)
+        Batch = self.env['mass.reconcile.batch']
+        before = Batch._count_line_statistics(self)
+        result = super().write(vals)
+        Batch._apply_statistics_delta(before, Batch._count_line_statistics(self))
+        return result
+
+    def _enqueue_continuous_matching(self):
+        """Put lines of continuous journals not in a batch into the journal's batch and queue them."""
+        lines = self.filtered(lambda line: not line.batch_id and line.journal_id.mass_reconcile_continuous)
+        for journal, journal_lines in lines.grouped('journal_id').items():
+            journal_lines.write({'batch_id': journal._get_mass_reconcile_continuous_batch().id})
+        self.env['mass.reconcile.queue'].sudo()._enqueue(lines.ids)
+
+    def unlink(self):
+        """Recount the batches of deleted lines (their proposals are deleted in cascade)."""
+        batches = self.batch_id
+        result = super().unlink()
+        batches._refresh_statistics()
+        return result
@@ -0,0 +1,20 @@
+from odoo import models, api
+
+
+class AccountFullReconcile(models.Model):
+    """Drop/restore open items snapshot rows when lines get (un)reconciled."""
+    _inherit = 'account.full.reconcile'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        full_reconciles = super().create(vals_list)
+        self.env['mass.reconcile.open.item']._sync_move_lines(
+            full_reconciles.reconciled_line_ids.ids
+        )
+        return full_reconciles
+
+    def unlink(self):
+        move_line_ids = self.reconciled_line_ids.ids
+        res = super().unlink()
+        self.env['mass.reconcile.open.item']._sync_move_lines(move_line_ids)
+        return res
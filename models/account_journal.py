@@ -0,0 +1,43 @@
+from odoo import models, fields
+
+
+class AccountJournal(models.Model):
+    """Continuous matching opt-in, and invalidation of the cached matching context."""
+    _name = 'account.journal'
+    _inherit = ['account.journal', 'mass.reconcile.context.mixin']
+
+    # Fields the cached matching context depends on
+    _MASS_RECONCILE_CONTEXT_FIELDS = {'type', 'company_id', 'active'}
+
+    mass_reconcile_continuous = fields.Boolean(
+        string='Continuous Matching',
+        default=False,
+        help='Match new statement lines of this journal as they arrive, and '
+             're-score its unmatched lines when matching journal items are posted'
+    )
+    mass_reconcile_batch_id = fields.Many2one(
+        'mass.reconcile.batch',
+        string='Continuous Matching Batch',
+        readonly=True,
+        copy=False,
+        ondelete='set null',
+        help='Batch collecting the continuously matched lines of this journal'
+    )
+
+    def _filter_mass_reconcile_context_records(self):
+        return self.filtered(lambda journal: journal.type == 'bank')
+
+    def _get_mass_reconcile_continuous_batch(self):
+        """Batch of the journal's continuously matched lines, created on first use."""
+        self.ensure_one()
+        batch = self.mass_reconcile_batch_id
+        if not batch or batch.state == 'reconciled':
+            Batch = self.env['mass.reconcile.batch'].sudo()
+            batch = Batch.create({
+                'name': Batch._get_unique_name(f"Continuous - {self.name}", self.company_id),
+                'company_id': self.company_id.id,
+                'journal_id': self.id,
+                'state': 'review',
+            })
+            self.sudo().mass_reconcile_batch_id = batch
+        return batch
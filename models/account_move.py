@@ -0,0 +1,23 @@
+from odoo import models
+
+
+class AccountMove(models.Model):
+    """Keep the mass reconciliation open items snapshot in sync with move states."""
+    _inherit = 'account.move'
+
+    def _post(self, soft=True):
+        posted = super()._post(soft=soft)
+        self.env['mass.reconcile.open.item']._sync_move_lines(posted.line_ids.ids)
+        # New open items may match lines waiting in continuous matching
+        self.env['mass.reconcile.queue'].sudo()._enqueue_for_move_lines(posted.line_ids)
+        return posted
+
+    def button_draft(self):
+        res = super().button_draft()
+        self.env['mass.reconcile.open.item']._sync_move_lines(self.line_ids.ids)
+        return res
+
+    def button_cancel(self):
+        res = super().button_cancel()
+        self.env['mass.reconcile.open.item']._sync_move_lines(self.line_ids.ids)
+        return res
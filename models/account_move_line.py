@@ -0,0 +1,30 @@
+from odoo import models, api
+
+
+class AccountMoveLine(models.Model):
+    """Keeps the mass reconciliation open items snapshot in sync with posted lines."""
+    _inherit = 'account.move.line'
+
+    # Written fields that change a line's open items snapshot row
+    _MASS_RECONCILE_SNAPSHOT_FIELDS = {
+        'full_reconcile_id', 'account_id', 'partner_id', 'date', 'debit', 'credit',
+        'balance', 'amount_currency', 'currency_id', 'ref', 'payment_ref',
+        'company_id', 'journal_id',
+    }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        # Lines added to moves that are already posted (moves posted later are
+        # synced by account.move._post)
+        posted = lines.filtered(lambda line: line.parent_state == 'posted')
+        self.env['mass.reconcile.open.item']._sync_move_lines(posted.ids)
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        if self._MASS_RECONCILE_SNAPSHOT_FIELDS.intersection(vals):
+            # Draft lines are never in the snapshot (button_draft removes them)
+            posted = self.filtered(lambda line: line.parent_state == 'posted')
+            self.env['mass.reconcile.open.item']._sync_move_lines(posted.ids)
+        return res
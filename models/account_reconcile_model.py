@@ -0,0 +1,13 @@
+from odoo import models
+
+
+class AccountReconcileModel(models.Model):
+    """Invalidate the cached mass reconciliation matching context on changes."""
+    _name = 'account.reconcile.model'
+    _inherit = ['account.reconcile.model', 'mass.reconcile.context.mixin']
+
+    # Fields the cached matching context depends on
+    _MASS_RECONCILE_CONTEXT_FIELDS = {'rule_type', 'company_id', 'active'}
+
+    def _filter_mass_reconcile_context_records(self):
+        return self.filtered(lambda model: model.rule_type == 'invoice_matching')
@@ -1,5 +1,12 @@
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from psycopg2.extras import execute_values
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import split_every
 
 
 class MassReconcileBatch(models.Model):
@@ -8,6 +15,44 @@ class MassReconcileBatch(models.Model):
     _inherit = ['mail.thread']
     _order = 'create_date desc'
 
+    # Statement lines matched per chunk; the env cache is dropped between chunks
+    MATCHING_CHUNK_SIZE = 200
+
+    # A matching run without heartbeat for this long is resumed by cron
+    MATCHING_STALL_MINUTES = 15
+
+    # Namespace of the advisory locks held by matching runs (keyed by batch id)
+    MATCHING_LOCK_NAMESPACE = 7110
+
+    # Statement line fields prefetched for each chunk
+    MATCHING_PREFETCH_FIELDS = [
+        'amount', 'date', 'partner_id', 'inferred_partner_id', 'payment_ref',
+        'currency_id', 'company_id', 'journal_id', 'account_number', 'partner_name',
+    ]
+
+    # Review grid: proposals per page (default and maximum)
+    REVIEW_PAGE_SIZE = 80
+    REVIEW_PAGE_MAX = 500
+
+    # Statistics counter per statement line match_state and proposal confidence_class
+    LINE_STATE_COUNTERS = {
+        'unmatched': 'unmatched_line_count',
+        'matched': 'matched_line_count',
+        'reviewed': 'reviewed_line_count',
+        'reconciled': 'reconciled_line_count',
+    }
+    MATCH_CLASS_COUNTERS = {
+        'safe': 'safe_match_count',
+        'probable': 'probable_match_count',
+        'doubtful': 'doubtful_match_count',
+    }
+    STATISTICS_FIELDS = (
+        'line_count', 'unmatched_line_count', 'matched_line_count',
+        'reviewed_line_count', 'reconciled_line_count', 'match_count',
+        'safe_match_count', 'probable_match_count', 'doubtful_match_count',
+        'selected_match_count',
+    )
+
     # Basic fields
     name = fields.Char(
         string='Batch Name',
@@ -61,6 +106,96 @@ class MassReconcileBatch(models.Model):
         help='End date filter for statement lines'
     )
 
+    # Matching configuration
+    search_mode = fields.Selection(
+        selection=[
+            ('full', 'Full Window'),
+            ('progressive', 'Progressive Widening'),
+            ('blocking', 'Blocking Keys'),
+        ],
+        default='full',
+        required=True,
+        string='Search Mode',
+        help='Full Window searches the whole date range at once. Progressive '
+             'Widening tries +/-3 days, then +/-10, then the full range, and '
+             'stops as soon as a unique safe candidate is found. Blocking Keys '
+             'loads the open items once and only scores pairs sharing an amount '
+             'bucket, partner, ISO week or reference prefix.'
+    )
+
+    use_read_replica = fields.Boolean(
+        string='Search on Read Replica',
+        default=False,
+        help='Run the candidate search on a read-only connection (the database '
+             'replica when one is configured); proposals are still written on '
+             'the primary, and candidates reconciled meanwhile are dropped'
+    )
+
+    score_floor = fields.Float(
+        string='Minimum Candidate Score',
+        default=lambda self: self.env['mass.reconcile.scorer'].SCORE_FLOOR,
+        help='Candidates that cannot reach this score are dropped, and their '
+             'remaining factors are not evaluated once the factors scored so far '
+             'rule them out (0 keeps every candidate)'
+    )
+
+    use_candidate_cache = fields.Boolean(
+        string='Warm-Start Candidate Search',
+        default=True,
+        help='Keep the candidates found for each statement line; re-runs only '
+             'check they are still open and search the items added since '
+             '(not used with Blocking Keys)'
+    )
+
+    duplicate_policy = fields.Selection(
+        selection=[
+            ('flag', 'Flag'),
+            ('skip', 'Skip'),
+        ],
+        default='flag',
+        required=True,
+        string='Duplicate Lines',
+        help='Flag: imported duplicates are kept, linked to the earlier line and '
+             'left out of matching. Skip: the importer does not create them.'
+    )
+    duplicate_line_count = fields.Integer(
+        string='Duplicate Lines Found',
+        readonly=True,
+        copy=False,
+        help='Statement lines of this batch with the same content as an earlier line'
+    )
+
+    matching_heartbeat = fields.Datetime(
+        string='Matching Heartbeat',
+        readonly=True,
+        copy=False,
+        help='Last time a matching run committed a chunk; stale runs are resumed automatically'
+    )
+
+    # Sharded runs scheduled by mass.reconcile.orchestrator
+    shard_requested_by_id = fields.Many2one(
+        'res.users',
+        string='Matching Requested By',
+        readonly=True,
+        copy=False,
+        ondelete='set null',
+        help='Set while the batch waits for a shard worker; the run uses this '
+             'user\'s access rights'
+    )
+    matching_duration = fields.Float(
+        string='Matching Duration (s)',
+        readonly=True,
+        copy=False,
+        help='Duration of the last matching run started by a shard worker'
+    )
+    matching_error = fields.Text(
+        string='Matching Error',
+        readonly=True,
+        copy=False,
+        help='Error that interrupted the last shard run; the chunks committed '
+             'before it are kept and the run is resumed automatically'
+    )
+
     # Notes
     notes = fields.Text(
         string='Notes',
@@ -81,23 +216,71 @@ class MassReconcileBatch(models.Model):
         help='All match proposals for this batch'
     )
 
-    # Computed fields (use _read_group for batch performance)
+    # Statistics, maintained incrementally (see _apply_statistics_delta)
     line_count = fields.Integer(
         string='Line Count',
-        compute='_compute_line_count',
-        store=True,
+        readonly=True,
+        copy=False,
         help='Number of statement lines in this batch'
     )
+    unmatched_line_count = fields.Integer(
+        string='Unmatched Lines',
+        readonly=True,
+        copy=False,
+        help='Number of statement lines without match proposal'
+    )
+    matched_line_count = fields.Integer(
+        string='Matched Lines',
+        readonly=True,
+        copy=False,
+        help='Number of statement lines with match proposals awaiting review'
+    )
+    reviewed_line_count = fields.Integer(
+        string='Reviewed Lines',
+        readonly=True,
+        copy=False,
+        help='Number of reviewed statement lines'
+    )
+    reconciled_line_count = fields.Integer(
+        string='Reconciled Lines',
+        readonly=True,
+        copy=False,
+        help='Number of reconciled statement lines'
+    )
     match_count = fields.Integer(
         string='Match Count',
-        compute='_compute_match_count',
-        store=True,
+        readonly=True,
+        copy=False,
         help='Number of match proposals in this batch'
     )
+    safe_match_count = fields.Integer(
+        string='Safe Proposals',
+        readonly=True,
+        copy=False,
+        help='Number of safe match proposals'
+    )
+    probable_match_count = fields.Integer(
+        string='Probable Proposals',
+        readonly=True,
+        copy=False,
+        help='Number of probable match proposals'
+    )
+    doubtful_match_count = fields.Integer(
+        string='Doubtful Proposals',
+        readonly=True,
+        copy=False,
+        help='Number of doubtful match proposals'
+    )
+    selected_match_count = fields.Integer(
+        string='Selected Proposals',
+        readonly=True,
+        copy=False,
+        help='Number of proposals selected for reconciliation'
+    )
     matched_percentage = fields.Float(
         string='Matched Percentage',
         compute='_compute_matched_percentage',
-        help='Percentage of lines with matches'
+        help='Percentage of lines with at least one match proposal (or reviewed/reconciled)'
     )
 
     # SQL constraints
@@ -107,46 +290,36 @@ class MassReconcileBatch(models.Model):
          'Batch name must be unique per company')
     ]
 
-    @api.depends('statement_line_ids')
-    def _compute_line_count(self):
-        """Use _read_group for batch performance to avoid N+1 queries."""
-        if not self.ids:
-            # Handle empty recordset
-            for batch in self:
-                batch.line_count = 0
-            return
-
-        domain = [('batch_id', 'in', self.ids)]
-        counts_data = self.env['account.bank.statement.line']._read_group(
-            domain, ['batch_id'], ['__count']
-        )
-        mapped_data = dict(counts_data)
-        for batch in self:
-            batch.line_count = mapped_data.get(batch, 0)
+    @api.model
+    def _get_unique_name(self, base_name, company):
+        """
+        Batch name derived from base_name that is free in the company.
 
-    @api.depends('match_ids')
-    def _compute_match_count(self):
-        """Use _read_group for batch performance to avoid N+1 queries."""
-        if not self.ids:
-            # Handle empty recordset
-            for batch in self:
-                batch.match_count = 0
-            return
+        Args:
+            base_name: preferred name
+            company: res.company record
 
-        domain = [('batch_id', 'in', self.ids)]
-        counts_data = self.env['mass.reconcile.match']._read_group(
-            domain, ['batch_id'], ['__count']
-        )
-        mapped_data = dict(counts_data)
-        for batch in self:
-            batch.match_count = mapped_data.get(batch, 0)
+        Returns:
+            str: base_name, or base_name followed by the first free " (n)" suffix
+        """
+        taken = set(self.sudo().with_context(active_test=False).search([
+            ('company_id', '=', company.id),
+            ('name', '=like', f"{base_name}%"),
+        ]).mapped('name'))
+        name = base_name
+        suffix = 2
+        while name in taken:
+            name = f"{base_name} ({suffix})"
+            suffix += 1
+        return name
 
-    @api.depends('line_count', 'match_count')
+    @api.depends('line_count', 'unmatched_line_count')
     def _compute_matched_percentage(self):
-        """Calculate percentage of lines with matches."""
+        """Calculate percentage of lines past the unmatched state."""
         for batch in self:
             if batch.line_count > 0:
-                batch.matched_percentage = (batch.match_count / batch.line_count) * 100
+                matched = batch.line_count - batch.unmatched_line_count
+                batch.matched_percentage = (matched / batch.line_count) * 100
             else:
                 batch.matched_percentage = 0.0
 
@@ -169,85 +342,780 @@ class MassReconcileBatch(models.Model):
                     "Cannot reconcile a batch with no statement lines"
                 )
 
+    # Statistics
+    @api.model
+    def _count_line_statistics(self, lines):
+        """
+        Counter contributions of statement lines.
+
+        Args:
+            lines: account.bank.statement.line recordset
+
+        Returns:
+            Counter: {(batch_id, counter field): count}
+        """
+        counts = Counter()
+        for line in lines:
+            if line.batch_id:
+                state_field = self.LINE_STATE_COUNTERS.get(line.match_state, 'unmatched_line_count')
+                counts[line.batch_id.id, 'line_count'] += 1
+                counts[line.batch_id.id, state_field] += 1
+        return counts
+
+    @api.model
+    def _count_match_statistics(self, matches):
+        """
+        Counter contributions of match proposals.
+
+        Args:
+            matches: mass.reconcile.match recordset
+
+        Returns:
+            Counter: {(batch_id, counter field): count}
+        """
+        counts = Counter()
+        for match in matches:
+            counts[match.batch_id.id, 'match_count'] += 1
+            class_field = self.MATCH_CLASS_COUNTERS.get(match.confidence_class)
+            if class_field:
+                counts[match.batch_id.id, class_field] += 1
+            if match.is_selected:
+                counts[match.batch_id.id, 'selected_match_count'] += 1
+        return counts
+
+    @api.model
+    def _apply_statistics_delta(self, before, after):
+        """
+        Add the difference between two counter snapshots to the batch statistics.
+
+        Increments are applied in SQL (counter = counter + delta), so concurrent
+        updates of the same batch do not overwrite each other.
+
+        Args:
+            before: Counter from _count_*_statistics before the change
+            after: Counter from _count_*_statistics after the change
+        """
+        deltas = defaultdict(dict)
+        for key in set(before) | set(after):
+            delta = after[key] - before[key]
+            if delta:
+                batch_id, field_name = key
+                deltas[batch_id][field_name] = delta
+        if not deltas:
+            return
+        rows = [
+            (batch_id, *(batch_deltas.get(f, 0) for f in self.STATISTICS_FIELDS))
+            for batch_id, batch_deltas in deltas.items()
+        ]
+        self.flush_model(self.STATISTICS_FIELDS)
+        execute_values(self.env.cr._obj, f"""
+            UPDATE mass_reconcile_batch b
+               SET {', '.join(f'{f} = b.{f} + v.{f}' for f in self.STATISTICS_FIELDS)}
+              FROM (VALUES %s) AS v(id, {', '.join(self.STATISTICS_FIELDS)})
+             WHERE b.id = v.id
+        """, rows)
+        self.invalidate_model(self.STATISTICS_FIELDS + ('matched_percentage',))
+
+    def _refresh_statistics(self):
+        """Recount the statistics of these batches from their lines and proposals."""
+        if not self.ids:
+            return
+        self.env['account.bank.statement.line'].flush_model(['batch_id', 'match_state'])
+        self.env['mass.reconcile.match'].flush_model(['batch_id', 'confidence_class', 'is_selected'])
+        self.env.cr.execute("""
+            WITH line_stats AS (
+                SELECT batch_id,
+                       COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE match_state = 'matched') AS matched,
+                       COUNT(*) FILTER (WHERE match_state = 'reviewed') AS reviewed,
+                       COUNT(*) FILTER (WHERE match_state = 'reconciled') AS reconciled
+                  FROM account_bank_statement_line
+                 WHERE batch_id = ANY(%(ids)s)
+              GROUP BY batch_id
+            ), match_stats AS (
+                SELECT batch_id,
+                       COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE confidence_class = 'safe') AS safe,
+                       COUNT(*) FILTER (WHERE confidence_class = 'probable') AS probable,
+                       COUNT(*) FILTER (WHERE confidence_class = 'doubtful') AS doubtful,
+                       COUNT(*) FILTER (WHERE is_selected) AS selected
+                  FROM mass_reconcile_match
+                 WHERE batch_id = ANY(%(ids)s)
+              GROUP BY batch_id
+            )
+            UPDATE mass_reconcile_batch b
+               SET line_count = COALESCE(ls.total, 0),
+                   unmatched_line_count = COALESCE(ls.total - ls.matched - ls.reviewed - ls.reconciled, 0),
+                   matched_line_count = COALESCE(ls.matched, 0),
+                   reviewed_line_count = COALESCE(ls.reviewed, 0),
+                   reconciled_line_count = COALESCE(ls.reconciled, 0),
+                   match_count = COALESCE(ms.total, 0),
+                   safe_match_count = COALESCE(ms.safe, 0),
+                   probable_match_count = COALESCE(ms.probable, 0),
+                   doubtful_match_count = COALESCE(ms.doubtful, 0),
+                   selected_match_count = COALESCE(ms.selected, 0)
+              FROM mass_reconcile_batch b2
+         LEFT JOIN line_stats ls ON ls.batch_id = b2.id
+         LEFT JOIN match_stats ms ON ms.batch_id = b2.id
+             WHERE b.id = b2.id
+               AND b2.id = ANY(%(ids)s)
+        """, {'ids': self.ids})
+        self.invalidate_model(self.STATISTICS_FIELDS + ('matched_percentage',))
+
+    @api.model
+    def get_dashboard_data(self, domain=None):
+        """
+        Statistics of all open (not reconciled) batches, in one query.
+
+        Reads the maintained counters only, so the cost does not depend on the
+        number of statement lines or proposals.
+
+        Args:
+            domain: optional extra domain on the batches
+
+        Returns:
+            dict: {'batches': [{id, name, state, <counters>, matched_percentage}],
+                   'totals': {<counters>, 'batch_count', 'matched_percentage'}}
+        """
+        domain = [('state', '!=', 'reconciled')] + (domain or [])
+        records = self.search_fetch(domain, ['name', 'state', *self.STATISTICS_FIELDS])
+        batches = []
+        totals = dict.fromkeys(self.STATISTICS_FIELDS, 0)
+        for batch in records:
+            values = {field_name: batch[field_name] for field_name in self.STATISTICS_FIELDS}
+            for field_name, value in values.items():
+                totals[field_name] += value
+            batches.append(dict(
+                values, id=batch.id, name=batch.name, state=batch.state,
+                matched_percentage=self._matched_percentage(values),
+            ))
+        totals.update(batch_count=len(batches), matched_percentage=self._matched_percentage(totals))
+        return {'batches': batches, 'totals': totals}
+
+    @staticmethod
+    def _matched_percentage(values):
+        """Matched percentage from a dict of counters."""
+        if not values['line_count']:
+            return 0.0
+        return (values['line_count'] - values['unmatched_line_count']) / values['line_count'] * 100
+
     # State transition button methods
     def action_start_matching(self):
-        """Start the matching process."""
+        """
+        Schedule the matching run of the batch.
+
+        The run commits chunk by chunk, which a request must not do: it is
+        queued for the shard worker crons (see mass.reconcile.orchestrator),
+        which match the batch as the current user.
+        """
         self.ensure_one()
         if self.line_count == 0:
             raise ValidationError(
                 "Cannot start matching without statement lines"
             )
+        with self._matching_lock() as locked:
+            if not locked:
+                raise ValidationError(self._matching_locked_message())
+        self.write({
+            'shard_requested_by_id': self.env.uid,
+            'matching_duration': 0.0,
+            'matching_error': False,
+        })
+        self.env['mass.reconcile.orchestrator']._trigger_shard_workers()
+
+    def _start_matching(self):
+        """Run the matching of the batch from scratch (cron and queue workers)."""
+        self.ensure_one()
+        if self.line_count == 0:
+            raise ValidationError(
+                "Cannot start matching without statement lines"
+            )
+        with self._matching_lock() as locked:
+            if not locked:
+                raise ValidationError(self._matching_locked_message())
+
+            # Set state to matching
+            self.write({'state': 'matching', 'matching_heartbeat': fields.Datetime.now()})
+
+            # Delete any existing match proposals (re-matching scenario)
+            self.match_ids.unlink()
+            self.env['mass.reconcile.claim'].sudo()._release(self.ids)
+
+            # Reset all statement line match_states to unmatched
+            self._reset_line_match_states()
+
+            # Keep re-sent lines out of the run before they claim open items
+            duplicates = self._flag_duplicate_lines()
+            if duplicates:
+                self.message_post(
+                    body=(
+                        f"<p>{len(duplicates)} statement lines have the same content as an "
+                        f"earlier line and were left out of matching.</p>"
+                    ),
+                    subject='Duplicate Statement Lines',
+                )
+
+            # Resolve probable partners so candidate search stays partner-scoped
+            self._infer_statement_line_partners()
+
+            # Persist the reset so a crash later on can resume from here
+            self._commit_matching_checkpoint()
+
+            self._run_matching()
+
+    def action_resume_matching(self):
+        """Schedule the resumption of an interrupted matching run by the resume cron."""
+        self.ensure_one()
+        if self.state != 'matching':
+            raise ValidationError(
+                "Only batches in matching state can be resumed"
+            )
+        with self._matching_lock() as locked:
+            if not locked:
+                raise ValidationError(self._matching_locked_message())
+        # No heartbeat: the resume cron takes the batch on its next run
+        self.write({'matching_heartbeat': False})
+        cron = self.env.ref(f'{self._module}.ir_cron_resume_stalled_matching', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
 
-        # Set state to matching
-        self.write({'state': 'matching'})
+    def _resume_matching(self):
+        """Resume the run, with the matching lock held."""
+        self.write({'matching_heartbeat': fields.Datetime.now()})
+        self._commit_matching_checkpoint()
+        self._run_matching(resumed=True)
 
-        # Delete any existing match proposals (re-matching scenario)
-        self.match_ids.unlink()
+    @contextmanager
+    def _matching_lock(self):
+        """
+        Hold the matching lock of the batch for the duration of a run.
+
+        Checkpoint commits release row locks, so the lock is a transaction-level
+        advisory lock taken on a dedicated cursor that stays open, its
+        transaction untouched, until the run ends. Closing that cursor releases
+        it, also when the run fails or its worker dies.
+
+        Yields:
+            bool: whether the lock was acquired (False while another worker
+                  matches the batch)
+        """
+        self.ensure_one()
+        with self.env.registry.cursor() as lock_cr:
+            lock_cr.execute(
+                "SELECT pg_try_advisory_xact_lock(%s, %s)", (self.MATCHING_LOCK_NAMESPACE, self.id),
+            )
+            yield lock_cr.fetchone()[0]
+
+    def _matching_locked_message(self):
+        """Error raised when the batch is already being matched."""
+        return f"Batch {self.name} is already being matched by another worker"
+
+    def action_import_statement_file(self, fileobj, file_format='camt053', match=False):
+        """
+        Stream a CAMT.053 or CSV statement file into this batch.
 
-        # Reset all statement line match_states to unmatched
-        self.statement_line_ids.write({'match_state': 'unmatched'})
+        Args:
+            fileobj: binary file object
+            file_format: 'camt053' or 'csv'
+            match: match each imported chunk right away
+
+        Returns:
+            int: number of statement lines imported
+        """
+        self.ensure_one()
+        return self.env['mass.reconcile.import'].import_statement_file(
+            self, fileobj, file_format=file_format, match=match,
+        )
+
+    def _start_streaming_matching(self):
+        """Put the batch in matching state for lines matched while they are imported."""
+        self.ensure_one()
+        self.write({'state': 'matching', 'matching_heartbeat': fields.Datetime.now()})
+        self._commit_matching_checkpoint()
+
+    def _match_streamed_lines(self, lines):
+        """
+        Match and checkpoint a chunk of lines just added to the batch.
 
-        # Get the engine
+        Args:
+            lines: account.bank.statement.line recordset of this batch
+        """
+        self.ensure_one()
         engine = self.env['mass.reconcile.engine'].sudo()
+        matching_context = engine._get_matching_context(self.company_id)
+        duplicates = self._flag_duplicate_lines(lines)
+        to_match = lines.filtered(lambda line: line.id not in duplicates)
+        self._infer_statement_line_partners(to_match)
+        # The candidate search may read the lines on the read replica, which
+        # only sees committed rows
+        self._commit_matching_checkpoint()
+        blocking_index = None
+        if self.search_mode == 'blocking':
+            blocking_index = engine._build_blocking_index(to_match, matching_context=matching_context)
+        self._match_statement_line_chunk(
+            to_match.ids, engine, matching_context, blocking_index=blocking_index,
+        )
+        to_match.write({'match_processed': True})
+        self.write({'matching_heartbeat': fields.Datetime.now()})
+        self._commit_matching_checkpoint()
 
-        # Track matching statistics
-        safe_count = 0
-        probable_count = 0
-        doubtful_count = 0
-        unmatched_count = 0
+    def _rematch_lines(self, lines):
+        """
+        Match lines of the batch again, outside of a full matching run.
 
-        # Process each statement line
-        for line in self.statement_line_ids:
-            # Find regular candidates
-            candidates = engine.find_candidates(line)
+        Used by continuous matching: the lines' previous proposals and claims are
+        dropped and the lines go through the streamed matching pipeline.
 
-            # Also check reconcile models
-            model_candidates = engine.apply_reconcile_models(line)
+        Args:
+            lines: account.bank.statement.line recordset of this batch
+        """
+        self.ensure_one()
+        stale = self.match_ids.filtered(lambda match: match.statement_line_id in lines)
+        self.env['mass.reconcile.claim'].sudo()._release(self.ids, stale.suggested_move_line_id.ids)
+        stale.unlink()
+        self._reset_line_match_states(lines)
+        self._match_streamed_lines(lines)
 
-            # Combine all candidates
-            all_candidates = candidates + model_candidates
+    @api.model
+    def _cron_resume_stalled_matching(self):
+        """Resume matching runs whose worker stopped sending heartbeats."""
+        stalled_before = fields.Datetime.subtract(
+            fields.Datetime.now(), minutes=self.MATCHING_STALL_MINUTES,
+        )
+        # A worker: resumed runs commit chunk by chunk
+        batches = self.with_context(mass_reconcile_checkpoint_commits=True).search([
+            ('state', '=', 'matching'),
+            '|',
+            ('matching_heartbeat', '=', False),
+            ('matching_heartbeat', '<', stalled_before),
+        ])
+        for batch in batches:
+            with batch._matching_lock() as locked:
+                # A run still holding the lock is alive, only slow
+                if not locked:
+                    continue
+                # The run may have ended between the search and the lock
+                batch.invalidate_recordset(['state'])
+                if batch.state == 'matching':
+                    batch._resume_matching()
 
-            if all_candidates:
-                # Create match proposals
-                self._create_match_proposals(line, all_candidates)
-
-                # Count by best match classification
-                best_score = max(c['score'] for c in all_candidates)
-                if best_score == 100:
-                    safe_count += 1
-                elif best_score >= 80:
-                    probable_count += 1
-                else:
-                    doubtful_count += 1
-            else:
-                unmatched_count += 1
+    def _commit_matching_checkpoint(self):
+        """
+        Commit the work done so far, in cron and queue workers only.
+
+        The workers' entry points set mass_reconcile_checkpoint_commits;
+        requests (buttons, RPC calls) keep their single transaction, only
+        flushed here. Tests never commit, commits are forbidden there.
+        """
+        self.env.flush_all()
+        if (self.env.context.get('mass_reconcile_checkpoint_commits')
+                and not getattr(threading.current_thread(), 'testing', False)):
+            self.env.cr.commit()
+
+    def _run_matching(self, resumed=False):
+        """
+        Match every statement line of the batch not yet processed.
+
+        Each chunk's proposals, processed flags and heartbeat are committed
+        together, so an interrupted run resumes at the first unfinished chunk.
+
+        Args:
+            resumed: whether this run picks up an interrupted one
+        """
+        self.ensure_one()
+        batch_id = self.id
+
+        # Get the engine and the company data shared by all lines of the run
+        engine = self.env['mass.reconcile.engine'].sudo()
+        matching_context = engine._get_matching_context(self.company_id)
+
+        # Lines still to process (all of them on a fresh run)
+        StatementLine = self.env['account.bank.statement.line']
+        pending_ids = StatementLine.search([
+            ('batch_id', '=', batch_id),
+            ('match_processed', '=', False),
+        ], order='id').ids
+
+        # Drop proposals of unfinished lines left by an interrupted chunk
+        if resumed and pending_ids:
+            stale_matches = self.env['mass.reconcile.match'].search([
+                ('batch_id', '=', batch_id),
+                ('statement_line_id', 'in', pending_ids),
+            ])
+            self.env['mass.reconcile.claim'].sudo()._release(
+                [batch_id], stale_matches.suggested_move_line_id.ids,
+            )
+            stale_matches.unlink()
+
+        # Which progressive stage ended the search, per line
+        stage_stats = {}
+
+        # Blocking mode indexes the open items once for the whole batch
+        blocking_stats = {}
+        blocking_index = None
+        if self.search_mode == 'blocking':
+            blocking_index = engine._build_blocking_index(
+                StatementLine.browse(pending_ids), blocking_stats=blocking_stats,
+                matching_context=matching_context,
+            )
+            # The index only keeps ids: drop the move lines loaded to build it
+            self.env.invalidate_all()
+
+        # Process statement lines in fixed-size chunks. Flushing and dropping the
+        # environment cache between chunks keeps memory flat whatever the batch size.
+        for chunk_ids in split_every(self.MATCHING_CHUNK_SIZE, pending_ids):
+            batch = self.browse(batch_id)
+            batch._match_statement_line_chunk(
+                chunk_ids, engine, matching_context,
+                stage_stats=stage_stats, blocking_index=blocking_index,
+            )
+            StatementLine.browse(chunk_ids).write({'match_processed': True})
+            batch.write({'matching_heartbeat': fields.Datetime.now()})
+            batch._commit_matching_checkpoint()
+            self.env.invalidate_all()
 
         # Transition to review state
         self.write({'state': 'review'})
 
         # Post summary message to chatter
+        counts = self._get_matching_counts()
         summary_message = (
-            f"<p><strong>Matching completed:</strong></p>"
+            f"<p><strong>Matching completed{' (resumed)' if resumed else ''}:</strong></p>"
             f"<ul>"
             f"<li>Total lines processed: {self.line_count}</li>"
-            f"<li>Safe matches (100%): {safe_count}</li>"
-            f"<li>Probable matches (80-99%): {probable_count}</li>"
-            f"<li>Doubtful matches (<80%): {doubtful_count}</li>"
-            f"<li>Unmatched: {unmatched_count}</li>"
+            f"<li>Safe matches (100%): {counts['safe']}</li>"
+            f"<li>Probable matches (80-99%): {counts['probable']}</li>"
+            f"<li>Doubtful matches (<80%): {counts['doubtful']}</li>"
+            f"<li>Unmatched: {counts['unmatched']}</li>"
             f"</ul>"
         )
+        if stage_stats:
+            summary_message += (
+                "<p><strong>Search ended at stage:</strong></p><ul>"
+                + "".join(
+                    f"<li>{stage}: {count}</li>"
+                    for stage, count in sorted(stage_stats.items(), key=self._stage_sort_key)
+                )
+                + "</ul>"
+            )
+        if blocking_stats.get('pairs_total'):
+            reduction = 1.0 - blocking_stats['pairs_blocked'] / blocking_stats['pairs_total']
+            summary_message += (
+                f"<p><strong>Blocking:</strong> {blocking_stats['pairs_blocked']} of "
+                f"{blocking_stats['pairs_total']} pairs scored "
+                f"({reduction:.1%} reduction)</p>"
+            )
         self.message_post(body=summary_message, subject='Matching Complete')
 
-    def _create_match_proposals(self, line, candidates):
+    def _get_matching_counts(self):
         """
-        Create match proposals for a statement line.
+        Count the batch lines by best-match classification.
+
+        Read from the database rather than accumulated in memory, so the
+        totals stay correct when a run was resumed.
+
+        Returns:
+            dict: {'safe', 'probable', 'doubtful', 'unmatched'} -> int
+        """
+        self.ensure_one()
+        scorer = self.env['mass.reconcile.scorer']
+        self.env['account.bank.statement.line'].flush_model(['batch_id', 'match_state', 'match_score'])
+        self.env.cr.execute("""
+            SELECT COUNT(*) FILTER (WHERE match_state = 'matched' AND match_score >= %(safe)s),
+                   COUNT(*) FILTER (WHERE match_state = 'matched' AND match_score >= %(probable)s
+                                                                  AND match_score < %(safe)s),
+                   COUNT(*) FILTER (WHERE match_state = 'matched' AND match_score < %(probable)s),
+                   COUNT(*) FILTER (WHERE match_state IS DISTINCT FROM 'matched')
+              FROM account_bank_statement_line
+             WHERE batch_id = %(batch_id)s
+        """, {
+            'safe': scorer.SAFE_THRESHOLD,
+            'probable': scorer.PROBABLE_THRESHOLD,
+            'batch_id': self.id,
+        })
+        safe, probable, doubtful, unmatched = self.env.cr.fetchone()
+        return {'safe': safe, 'probable': probable, 'doubtful': doubtful, 'unmatched': unmatched}
+
+    def _flag_duplicate_lines(self, lines=None):
+        """
+        Link batch lines to an earlier line with the same content hash.
+
+        Identical lines of one imported file are separate transactions (two
+        equal card payments on the same day), so lines are only duplicates of
+        lines of other imports, repeat by repeat as in the importer's skip
+        policy: the n-th line of a file with a hash is linked to the n-th
+        earlier non-duplicate line with that hash, and is no duplicate when
+        there is none. Lines created outside of an import are linked to the
+        earliest line with the same hash. Each line costs lookups on the
+        indexed content_hash. Duplicates are marked as processed, so matching
+        runs skip them.
+
+        Args:
+            lines: optional subset of the batch lines (all of them by default)
+
+        Returns:
+            dict: {duplicate line id: original line id}
+        """
+        self.ensure_one()
+        if lines is None:
+            lines = self.statement_line_ids
+        if not lines:
+            return {}
+        StatementLine = self.env['account.bank.statement.line']
+        StatementLine.flush_model()
+        self.env.cr.execute("""
+            WITH chunk AS (
+                SELECT l.id, l.content_hash, l.import_key,
+                       CASE WHEN l.import_key IS NULL THEN 1 ELSE (
+                           SELECT COUNT(*)
+                             FROM account_bank_statement_line s
+                            WHERE s.content_hash = l.content_hash
+                              AND s.import_key = l.import_key
+                              AND s.id <= l.id
+                       ) END AS repeat
+                  FROM account_bank_statement_line l
+                 WHERE l.id = ANY(%s)
+            )
+            UPDATE account_bank_statement_line sl
+               SET duplicate_of_id = d.original_id,
+                   match_processed = sl.match_processed OR d.original_id IS NOT NULL
+              FROM (
+                  SELECT c.id,
+                         (SELECT o.id
+                            FROM account_bank_statement_line o
+                           WHERE o.content_hash = c.content_hash
+                             AND o.id < c.id
+                             AND o.duplicate_of_id IS NULL
+                             AND (c.import_key IS NULL OR o.import_key IS DISTINCT FROM c.import_key)
+                        ORDER BY o.id
+                          OFFSET c.repeat - 1
+                           LIMIT 1) AS original_id
+                    FROM chunk c
+              ) d
+             WHERE sl.id = d.id
+         RETURNING sl.id, d.original_id
+        """, (lines.ids,))
+        duplicates = {line_id: original_id for line_id, original_id in self.env.cr.fetchall() if original_id}
+        StatementLine.invalidate_model(['duplicate_of_id', 'match_processed'])
+
+        self.env.cr.execute("""
+            SELECT COUNT(*) FROM account_bank_statement_line
+             WHERE batch_id = %s AND duplicate_of_id IS NOT NULL
+        """, (self.id,))
+        self.duplicate_line_count = self.env.cr.fetchone()[0]
+        return duplicates
+
+    def _match_statement_line_chunk(self, line_ids, engine, matching_context,
+                                    stage_stats=None, blocking_index=None):
+        """
+        Find candidates and create proposals for one chunk of statement lines.
+
+        Args:
+            line_ids: list of account.bank.statement.line ids
+            engine: mass.reconcile.engine model
+            matching_context: MatchingContext of the batch company
+            stage_stats: optional dict of progressive search stages to update
+            blocking_index: index from engine._build_blocking_index, if any
+        """
+        self.ensure_one()
+        search_mode = self.search_mode
+        lines = self.env['account.bank.statement.line'].browse(line_ids)
+
+        use_cache = self.use_candidate_cache and search_mode != 'blocking'
+        cache_entries = []
+        candidates_by_line = []
+        # Prefetch the chunk's fields used by the engine and scorer in one query,
+        # on the primary: the lines were just written (inferred partners, hashes)
+        lines.fetch(self.MATCHING_PREFETCH_FIELDS + ['content_hash'])
+        with self._candidate_search_cursor() as search_cr:
+            # Only the open item and journal item searches go to the search cursor
+            search_engine = engine.with_env(engine.env(cr=search_cr)).with_context(
+                mass_reconcile_score_floor=self.score_floor,
+            )
+
+            if use_cache:
+                Cache = self.env['mass.reconcile.candidate.cache'].with_env(search_engine.env).sudo()
+                snapshot = Cache._current_snapshot()
+                new_item_ids = {}
+                signatures = {
+                    line.id: Cache._signature(line, search_mode, engine._get_date_range_days(), matching_context)
+                    for line in lines
+                }
+                warm = Cache._get_warm_candidates(signatures)
+
+            for line in lines:
+                if use_cache and line.id in warm:
+                    # Warm start: cached candidates still open, plus the items added since
+                    cached_snapshot, candidates = warm[line.id]
+                    if cached_snapshot not in new_item_ids:
+                        new_item_ids[cached_snapshot] = Cache._get_new_open_item_ids(cached_snapshot)
+                    new_candidates = search_engine.with_context(
+                        mass_reconcile_open_item_ids=new_item_ids[cached_snapshot],
+                    ).find_candidates(line, search_mode=search_mode, matching_context=matching_context)
+                    new_ids = {c['move_line_id'] for c in new_candidates}
+                    candidates = [c for c in candidates if c['move_line_id'] not in new_ids] + new_candidates
+                    candidates.sort(key=lambda c: c['score'], reverse=True)
+                    if stage_stats is not None:
+                        stage_stats['cached'] = stage_stats.get('cached', 0) + 1
+                else:
+                    candidates = search_engine.find_candidates(
+                        line, search_mode=search_mode, stage_stats=stage_stats,
+                        blocking_index=blocking_index, matching_context=matching_context,
+                    )
+                if use_cache:
+                    cache_entries.append((line.id, signatures[line.id], candidates))
+
+                # Also check reconcile models
+                model_candidates = search_engine.apply_reconcile_models(
+                    line, matching_context=matching_context,
+                )
+
+                # Combine all candidates
+                candidates_by_line.append((line, candidates + model_candidates))
+
+        if cache_entries:
+            self.env['mass.reconcile.candidate.cache'].sudo()._store(cache_entries, snapshot)
+
+        if self.use_read_replica:
+            candidates_by_line = self._drop_stale_candidates(candidates_by_line)
+        candidates_by_line = self._filter_claimed_candidates(candidates_by_line)
+
+        # Create the chunk's proposals at once, then write each line's best match back
+        proposal_vals = []
+        best_matches = []
+        for line, all_candidates in candidates_by_line:
+            if all_candidates:
+                vals_list, best_score, best_move_id = self._prepare_match_proposals(line, all_candidates)
+                proposal_vals += vals_list
+                best_matches.append((line.id, best_score, best_move_id))
+        if proposal_vals:
+            self.env['mass.reconcile.match'].create(proposal_vals)
+        self._write_back_best_matches(best_matches)
+
+    @contextmanager
+    def _candidate_search_cursor(self):
+        """
+        Cursor the candidate search runs on.
+
+        With use_read_replica, a separate read-only cursor, routed by Odoo to
+        the replica configured with db_replica_host / db_replica_port (or to
+        the primary when none is configured). Otherwise the batch's own cursor.
+        """
+        if not self.use_read_replica:
+            yield self.env.cr
+            return
+        with self.env.registry.cursor(readonly=True) as replica_cr:
+            yield replica_cr
+
+    def _drop_stale_candidates(self, candidates_by_line):
+        """
+        Drop candidates that are no longer open on the primary database.
+
+        Guards against replica lag: items reconciled (or reset to draft) after
+        the replica last caught up are still open items there.
+
+        Args:
+            candidates_by_line: list of (statement line, candidate dicts)
+
+        Returns:
+            list: (statement line, candidate dicts) with stale items removed
+        """
+        candidate_ids = list({
+            c['move_line_id'] for _line, candidates in candidates_by_line for c in candidates
+        })
+        if not candidate_ids:
+            return candidates_by_line
+        self.env['mass.reconcile.open.item'].flush_model()
+        self.env.cr.execute(
+            "SELECT move_line_id FROM mass_reconcile_open_item WHERE move_line_id = ANY(%s)",
+            (candidate_ids,),
+        )
+        open_ids = {row[0] for row in self.env.cr.fetchall()}
+        return [
+            (line, [c for c in candidates if c['move_line_id'] in open_ids])
+            for line, candidates in candidates_by_line
+        ]
+
+    def _filter_claimed_candidates(self, candidates_by_line):
+        """
+        Drop candidates claimed by other batches and claim the safe ones.
+
+        Each line's best candidate, when safe, is claimed for this batch; if a
+        concurrent run got it first the candidate is dropped instead.
+
+        Args:
+            candidates_by_line: list of (statement line, candidate dicts)
+
+        Returns:
+            list: (statement line, candidate dicts) with claimed items removed
+        """
+        self.ensure_one()
+        Claim = self.env['mass.reconcile.claim'].sudo()
+        scorer = self.env['mass.reconcile.scorer']
+
+        candidate_ids = {
+            c['move_line_id'] for _line, candidates in candidates_by_line for c in candidates
+        }
+        taken_ids = Claim._get_claimed_by_others(candidate_ids, self.id)
+
+        wanted_ids = set()
+        for _line, candidates in candidates_by_line:
+            candidates[:] = [c for c in candidates if c['move_line_id'] not in taken_ids]
+            if candidates:
+                best = max(candidates, key=lambda c: c['score'])
+                if best['score'] >= scorer.SAFE_THRESHOLD:
+                    wanted_ids.add(best['move_line_id'])
+
+        lost_ids = wanted_ids - Claim._claim(wanted_ids, self.id)
+        if lost_ids:
+            for _line, candidates in candidates_by_line:
+                candidates[:] = [c for c in candidates if c['move_line_id'] not in lost_ids]
+        return candidates_by_line
+
+    @staticmethod
+    def _stage_sort_key(item):
+        """Order warm-started lines ('cached') first, then progressive stages narrowest first, 'full' last."""
+        stage = item[0]
+        return (stage == 'full', int(stage[:-1]) if stage[:-1].isdigit() else 0)
+
+    def _infer_statement_line_partners(self, lines=None):
+        """
+        Assign an inferred partner to the batch lines without partner, in bulk.
+
+        Args:
+            lines: optional subset of the batch lines (all of them by default)
+        """
+        self.ensure_one()
+        if lines is None:
+            lines = self.statement_line_ids
+        lines.write({'inferred_partner_id': False})
+
+        resolved = self.env['mass.reconcile.partner.key'].sudo().resolve_statement_lines(lines)
+
+        # One write per partner instead of one per line
+        lines_by_partner = {}
+        for line_id, partner_id in resolved.items():
+            lines_by_partner.setdefault(partner_id, []).append(line_id)
+        StatementLine = self.env['account.bank.statement.line']
+        for partner_id, line_ids in lines_by_partner.items():
+            StatementLine.browse(line_ids).write({'inferred_partner_id': partner_id})
+        return resolved
+
+    def _prepare_match_proposals(self, line, candidates):
+        """
+        Match proposal values and best match of a statement line.
 
         Args:
             line: account.bank.statement.line record
             candidates: list of candidate dicts [{move_line_id, score, match_type, reason}]
+
+        Returns:
+            tuple: (proposal values list, best score, best move id or None)
         """
         self.ensure_one()
 
+        scorer = self.env['mass.reconcile.scorer'].sudo()
+
         # Prepare values for batch create
         vals_list = []
         best_score = 0
@@ -266,7 +1134,7 @@ class MassReconcileBatch(models.Model):
             else:
                 match_type = 'partial'
 
-            vals_list.append({
+            vals = {
                 'batch_id': self.id,
                 'statement_line_id': line.id,
                 'suggested_move_id': move_line.move_id.id,
@@ -274,24 +1142,282 @@ class MassReconcileBatch(models.Model):
                 'match_score': candidate['score'],
                 'match_type': match_type,
                 'match_reason': candidate['reason'],
-            })
+            }
+
+            # Persist the factor breakdown so weights can be re-applied later
+            factor_scores = candidate.get('factor_scores')
+            if factor_scores:
+                vals.update({
+                    'amount_score': factor_scores['amount'],
+                    'partner_score': factor_scores['partner'],
+                    'reference_score': factor_scores['reference'],
+                    'date_score': factor_scores['date'],
+                    'score_bonus': (
+                        candidate.get('score_bonus', 0.0)
+                        + scorer._unstored_factor_bonus(factor_scores)
+                    ),
+                })
+            vals_list.append(vals)
 
             # Track best match
             if candidate['score'] > best_score:
                 best_score = candidate['score']
                 best_move = move_line.move_id
 
-        # Batch create all proposals
-        if vals_list:
-            self.env['mass.reconcile.match'].create(vals_list)
+        return vals_list, best_score, best_move.id if best_move else None
+
+    def _write_back_best_matches(self, best_matches):
+        """
+        Store the best match of statement lines and mark them matched, in one UPDATE.
+
+        The statement line cache is invalidated once for all of them, and the
+        state change of the lines is applied to the batch statistics as a delta.
+
+        Args:
+            best_matches: list of (statement line id, best score, best move id or None)
+        """
+        if not best_matches:
+            return
+        StatementLine = self.env['account.bank.statement.line']
+        fnames = ['match_score', 'suggested_move_id', 'match_state']
+        StatementLine.flush_model(fnames)
+        lines = StatementLine.browse([line_id for line_id, _score, _move_id in best_matches])
+        before = self._count_line_statistics(lines)
+        execute_values(self.env.cr._obj, """
+            UPDATE account_bank_statement_line sl
+               SET match_score = v.match_score,
+                   suggested_move_id = v.move_id,
+                   match_state = 'matched',
+                   write_uid = v.uid,
+                   write_date = (now() AT TIME ZONE 'UTC')
+              FROM (VALUES %s) AS v(id, match_score, move_id, uid)
+             WHERE sl.id = v.id
+        """, [
+            (line_id, best_score, best_move_id, self.env.uid)
+            for line_id, best_score, best_move_id in best_matches
+        ], template='(%s, %s::numeric, %s::int, %s::int)', page_size=len(best_matches))
+        StatementLine.invalidate_model(fnames + ['write_uid', 'write_date'])
+        self._apply_statistics_delta(before, self._count_line_statistics(lines))
+
+    def _reset_line_match_states(self, lines=None):
+        """
+        Set statement lines back to unmatched and not processed, in one UPDATE.
+
+        The statistics of a whole batch reset are recounted; those of a subset
+        are updated by its delta.
+
+        Args:
+            lines: optional subset of the batch lines (all of them by default)
+        """
+        self.ensure_one()
+        StatementLine = self.env['account.bank.statement.line']
+        fnames = ['batch_id', 'match_state', 'match_processed']
+        StatementLine.flush_model(fnames)
+        if lines is not None:
+            before = self._count_line_statistics(lines)
+        self.env.cr.execute("""
+            UPDATE account_bank_statement_line
+               SET match_state = 'unmatched',
+                   match_processed = FALSE,
+                   write_uid = %(uid)s,
+                   write_date = (now() AT TIME ZONE 'UTC')
+             WHERE batch_id = %(batch_id)s
+               AND (%(all_lines)s OR id = ANY(%(line_ids)s))
+        """, {
+            'uid': self.env.uid,
+            'batch_id': self.id,
+            'all_lines': lines is None,
+            'line_ids': lines.ids if lines is not None else [],
+        })
+        StatementLine.invalidate_model(fnames + ['write_uid', 'write_date'])
+        if lines is None:
+            self._refresh_statistics()
+        else:
+            self._apply_statistics_delta(before, self._count_line_statistics(lines))
+
+    def get_review_page(self, confidence_class=None, after=None, limit=REVIEW_PAGE_SIZE):
+        """
+        One page of the review grid: proposals grouped by statement line.
+
+        Proposals are paged by keyset on their own (match_score, id), so every
+        page costs the same whatever its position, and the confidence class
+        filter applies to each proposal. Rescoring statement lines between
+        pages does not move the cursor; a proposal rescored between pages is
+        returned again or skipped only when its score crosses the cursor.
+
+        A line is listed on each page holding one of its proposals, with the
+        proposals of that page; the grid merges lines spanning several pages
+        by id.
 
-            # Update statement line with best match
-            line.write({
-                'match_score': best_score,
-                'suggested_move_id': best_move.id if best_move else False,
-                'match_state': 'matched',
+        Args:
+            confidence_class: optional 'safe', 'probable' or 'doubtful'
+            after: cursor [match_score, proposal id] returned by the previous page
+            limit: number of proposals per page
+
+        Returns:
+            dict: {'lines': [{..., 'proposals': [...]}], 'next_cursor': list or None}
+        """
+        self.ensure_one()
+        self.check_access('read')
+        limit = min(limit, self.REVIEW_PAGE_MAX)
+
+        self.env['account.bank.statement.line'].flush_model()
+        self.env['mass.reconcile.match'].flush_model()
+        self.env.cr.execute("""
+            SELECT m.id, m.match_score, m.statement_line_id, m.suggested_move_line_id, am.name,
+                   m.confidence_class, m.match_type, m.is_selected,
+                   m.amount_score, m.partner_score, m.reference_score, m.date_score
+              FROM mass_reconcile_match m
+              JOIN account_move am ON am.id = m.suggested_move_id
+             WHERE m.batch_id = %(batch_id)s
+               AND (%(confidence_class)s IS NULL OR m.confidence_class = %(confidence_class)s)
+               AND (%(after_score)s IS NULL OR (m.match_score, m.id) < (%(after_score)s, %(after_id)s))
+          ORDER BY m.match_score DESC, m.id DESC
+             LIMIT %(limit)s
+        """, {
+            'batch_id': self.id,
+            'confidence_class': confidence_class,
+            'after_score': after[0] if after else None,
+            'after_id': after[1] if after else None,
+            'limit': limit,
+        })
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return {'lines': [], 'next_cursor': None}
+
+        # Lines in the order of their best proposal on the page
+        proposals_by_line = {}
+        for (match_id, match_score, line_id, move_line_id, move_name, confidence, match_type,
+             is_selected, amount_score, partner_score, reference_score, date_score) in rows:
+            proposals_by_line.setdefault(line_id, []).append({
+                'id': match_id, 'move_line_id': move_line_id, 'move_name': move_name,
+                'match_score': match_score, 'confidence_class': confidence,
+                'match_type': match_type, 'is_selected': is_selected,
+                'factor_scores': {
+                    'amount': amount_score, 'partner': partner_score,
+                    'reference': reference_score, 'date': date_score,
+                },
             })
 
+        self.env.cr.execute("""
+            SELECT sl.id, sl.date, sl.amount, sl.payment_ref, sl.match_score,
+                   sl.match_state, COALESCE(p.name, sl.partner_name)
+              FROM account_bank_statement_line sl
+         LEFT JOIN res_partner p ON p.id = sl.partner_id
+             WHERE sl.id = ANY(%s)
+        """, (list(proposals_by_line),))
+        line_values = {
+            line_id: {
+                'id': line_id, 'date': fields.Date.to_string(date), 'amount': amount,
+                'payment_ref': payment_ref, 'match_score': match_score,
+                'match_state': match_state, 'partner_name': partner_name,
+            }
+            for line_id, date, amount, payment_ref, match_score, match_state, partner_name
+            in self.env.cr.fetchall()
+        }
+        lines = [
+            dict(line_values[line_id], proposals=proposals)
+            for line_id, proposals in proposals_by_line.items()
+        ]
+
+        last_id, last_score = rows[-1][:2]
+        next_cursor = [last_score, last_id] if len(rows) == limit else None
+        return {'lines': lines, 'next_cursor': next_cursor}
+
+    def action_evaluate_blocking(self):
+        """Report blocking recall and pair reduction for this batch in the chatter."""
+        self.ensure_one()
+        engine = self.env['mass.reconcile.engine'].sudo()
+        stats = engine.evaluate_blocking(self.statement_line_ids)
+        self.message_post(
+            body=(
+                f"<p><strong>Blocking evaluation:</strong></p>"
+                f"<ul>"
+                f"<li>Pairs in date window: {stats['pairs_total']}</li>"
+                f"<li>Pairs sharing a blocking key: {stats['pairs_blocked']}</li>"
+                f"<li>Pair reduction: {stats['reduction_ratio']:.1%}</li>"
+                f"<li>Recall (probable or better): {stats['recall']:.1%} "
+                f"({stats['relevant_kept']}/{stats['relevant_pairs']})</li>"
+                f"</ul>"
+            ),
+            subject='Blocking Evaluation',
+        )
+        return stats
+
+    def action_simulate_matching(self, **options):
+        """
+        Dry-run matching on the batch lines without writing anything.
+
+        Args:
+            options: overrides passed to the engine's simulate_matching
+                (weights, date_range_days, reconcile_model_ids, search_mode)
+
+        Returns:
+            dict: statistics as returned by simulate_matching
+        """
+        self.ensure_one()
+        options.setdefault('search_mode', self.search_mode)
+        engine = self.env['mass.reconcile.engine'].sudo()
+        return engine.simulate_matching(self.statement_line_ids, **options)
+
+    def action_index_advisor(self):
+        """Post the query plans of the engine's candidate searches to the chatter."""
+        self.ensure_one()
+        sample_line = self.statement_line_ids[:1]
+        if not sample_line:
+            raise ValidationError(
+                "The index advisor needs at least one statement line as sample"
+            )
+        engine = self.env['mass.reconcile.engine'].sudo()
+        report = engine.explain_candidate_queries(sample_line)
+        body = "<p><strong>Index advisor:</strong></p><ul>"
+        for name, result in report.items():
+            indexes = ', '.join(result['indexes']) or 'no index (sequential scan)'
+            body += f"<li>{name}: {indexes}<pre>{result['plan']}</pre></li>"
+        body += "</ul>"
+        self.message_post(body=body, subject='Index Advisor')
+        return report
+
+    def action_reweight_scores(self):
+        """Re-apply the scorer weights to the stored factor scores of these batches."""
+        count = self.env['mass.reconcile.match']._reweight_scores(batch_ids=self.ids)
+        self._refresh_best_match_scores()
+        for batch in self:
+            batch.message_post(
+                body="<p>Match scores re-weighted from stored factor scores.</p>",
+                subject='Scores Re-weighted',
+            )
+        return count
+
+    @api.model
+    def action_reweight_all_scores(self):
+        """Re-apply the scorer weights to the stored factor scores of every batch."""
+        count = self.env['mass.reconcile.match']._reweight_scores()
+        self.search([])._refresh_best_match_scores()
+        return count
+
+    def _refresh_best_match_scores(self):
+        """Copy the best proposal score and move back onto the batch statement lines."""
+        if not self.ids:
+            return
+        self.env['mass.reconcile.match'].flush_model()
+        self.env.cr.execute("""
+            UPDATE account_bank_statement_line sl
+               SET match_score = best.match_score,
+                   suggested_move_id = best.suggested_move_id
+              FROM (
+                  SELECT DISTINCT ON (statement_line_id)
+                         statement_line_id, match_score, suggested_move_id
+                    FROM mass_reconcile_match
+                   WHERE batch_id = ANY(%s)
+                ORDER BY statement_line_id, match_score DESC, id
+              ) best
+             WHERE sl.id = best.statement_line_id
+        """, (self.ids,))
+        self.env['account.bank.statement.line'].invalidate_model(
+            ['match_score', 'suggested_move_id']
+        )
+
     def action_move_to_review(self):
         """Move batch to review state."""
         self.write({'state': 'review'})
@@ -300,7 +1426,9 @@ class MassReconcileBatch(models.Model):
         """Mark batch as reconciled."""
         self.ensure_one()
         self.write({'state': 'reconciled'})
+        self.env['mass.reconcile.claim'].sudo()._release(self.ids)
 
     def action_reset_to_draft(self):
         """Reset batch to draft state."""
         self.write({'state': 'draft'})
+        self.env['mass.reconcile.claim'].sudo()._release(self.ids)
@@ -0,0 +1,180 @@
+"""Candidate cache - warm start of re-matching runs from earlier candidate searches."""
+
+import hashlib
+
+from psycopg2.extras import Json, execute_values
+
+from odoo import models, fields, api
+
+
+class MassReconcileCandidateCache(models.Model):
+    """
+    Candidates found for a statement line, valid for the open items of a snapshot.
+
+    Open items are deleted and re-inserted whenever their journal item changes
+    (see mass.reconcile.open.item._sync_move_lines), and each row records the
+    transaction that inserted it (sync_xid). The cache keeps the database
+    snapshot the candidates were searched in: a re-run keeps the cached
+    candidates whose open item row was visible in that snapshot, and only
+    searches the rows that were not. Unlike the highest id, the snapshot is
+    commit-ordered: rows of transactions still running during the search are
+    re-searched once they are committed, whatever their id.
+    """
+    _name = 'mass.reconcile.candidate.cache'
+    _description = 'Mass Reconciliation Candidate Cache'
+    _log_access = False
+
+    statement_line_id = fields.Many2one(
+        'account.bank.statement.line',
+        string='Statement Line',
+        required=True,
+        ondelete='cascade',
+        help='Statement line the candidates were searched for'
+    )
+    signature = fields.Char(
+        string='Signature',
+        required=True,
+        help='Hash of the line content and search settings the candidates depend on'
+    )
+    snapshot = fields.Char(
+        string='Open Items Snapshot',
+        required=True,
+        help='Database snapshot (pg_snapshot) the candidates were searched in'
+    )
+    candidates = fields.Json(
+        string='Candidates',
+        help='Candidate dicts (move line, factor scores, score bonus, reason)'
+    )
+
+    _sql_constraints = [
+        ('unique_statement_line',
+         'UNIQUE(statement_line_id)',
+         'A statement line has a single candidate cache entry'),
+    ]
+
+    @api.model
+    def _signature(self, statement_line, search_mode, date_range_days, matching_context):
+        """Signature of what the cached candidates of a line depend on."""
+        parts = (
+            statement_line.content_hash,
+            statement_line.partner_id.id,
+            statement_line.inferred_partner_id.id,
+            statement_line.currency_id.id,
+            search_mode,
+            date_range_days,
+            matching_context.bank_journal_ids,
+            self.env['mass.reconcile.scorer']._get_score_floor(),
+        )
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    @api.model
+    def _current_snapshot(self):
+        """Database snapshot of the cursor the candidate search runs on."""
+        self.env.cr.execute("SELECT pg_current_snapshot()::text")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _get_new_open_item_ids(self, snapshot):
+        """
+        Open items that were not visible in a snapshot.
+
+        Rows inserted before the oldest transaction running in the snapshot are
+        visible in it, so only the rows from its xmin on are checked.
+
+        Args:
+            snapshot: pg_snapshot text, from _current_snapshot
+
+        Returns:
+            list: mass.reconcile.open.item ids
+        """
+        self.env.cr.execute("""
+            SELECT id FROM mass_reconcile_open_item
+             WHERE sync_xid >= pg_snapshot_xmin(%(snapshot)s::pg_snapshot)
+               AND NOT pg_visible_in_snapshot(sync_xid, %(snapshot)s::pg_snapshot)
+        """, {'snapshot': snapshot})
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_warm_candidates(self, signatures):
+        """
+        Cached candidates still valid for statement lines.
+
+        Entries with another signature are ignored. Cached candidates whose
+        open item row is gone or was not visible in the entry's snapshot are
+        dropped: items re-inserted since are found again by the delta search.
+
+        Args:
+            signatures: dict {statement line id: signature}
+
+        Returns:
+            dict: {statement line id: (snapshot, candidate dicts)}
+        """
+        if not signatures:
+            return {}
+        self.env.cr.execute("""
+            SELECT c.statement_line_id, c.signature, c.snapshot, c.candidates,
+                   ARRAY(
+                       SELECT oi.move_line_id
+                         FROM mass_reconcile_open_item oi
+                        WHERE oi.move_line_id IN (
+                                SELECT (candidate->>'move_line_id')::int
+                                  FROM jsonb_array_elements(c.candidates) candidate
+                              )
+                          AND pg_visible_in_snapshot(oi.sync_xid, c.snapshot::pg_snapshot)
+                   )
+              FROM mass_reconcile_candidate_cache c
+             WHERE c.statement_line_id = ANY(%s)
+        """, (list(signatures),))
+        warm = {}
+        for line_id, signature, snapshot, candidates, known_ids in self.env.cr.fetchall():
+            if signatures[line_id] != signature:
+                continue
+            known_ids = set(known_ids)
+            warm[line_id] = (snapshot, self._rescore([
+                c for c in candidates or [] if c['move_line_id'] in known_ids
+            ]))
+        return warm
+
+    @api.model
+    def _rescore(self, candidates):
+        """Re-apply the current weights and thresholds to cached factor scores."""
+        scorer = self.env['mass.reconcile.scorer'].sudo()
+        for candidate in candidates:
+            score = scorer.combine_factor_scores(candidate['factor_scores'])
+            if candidate.get('score_bonus'):
+                score = min(score + candidate['score_bonus'], 100.0)
+            candidate['score'] = score
+            if candidate['match_type'] != 'internal_transfer':
+                candidate['match_type'] = scorer.classify_match(score)
+        return candidates
+
+    @api.model
+    def _store(self, entries, snapshot):
+        """
+        Save the candidates of statement lines, replacing older entries.
+
+        Args:
+            entries: list of (statement line id, signature, candidate dicts)
+            snapshot: database snapshot the candidates were searched in
+        """
+        rows = [
+            (line_id, signature, snapshot, Json([
+                {key: c[key] for key in ('move_line_id', 'match_type', 'reason', 'factor_scores', 'score_bonus')
+                 if key in c}
+                for c in candidates if c.get('factor_scores')
+            ]))
+            for line_id, signature, candidates in entries
+        ]
+        if not rows:
+            return
+        self.flush_model()
+        execute_values(self.env.cr._obj, """
+            INSERT INTO mass_reconcile_candidate_cache
+                (statement_line_id, signature, snapshot, candidates)
+            VALUES %s
+            ON CONFLICT (statement_line_id) DO UPDATE
+               SET signature = EXCLUDED.signature,
+                   snapshot = EXCLUDED.snapshot,
+                   candidates = EXCLUDED.candidates
+        """, rows)
+        self.invalidate_model()
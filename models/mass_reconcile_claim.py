@@ -0,0 +1,193 @@
+"""Move line claims - leases that keep concurrent batches off the same open items."""
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+
+class ClaimError(ValidationError):
+    """
+    Journal items could not be claimed for a batch.
+
+    reason tells why (the first of them when several items failed for
+    different reasons): 'closed' (no longer open), 'claimed' (claimed by
+    another batch) or 'locked' (being claimed by a concurrent transaction).
+    """
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+class MassReconcileClaim(models.Model):
+    """
+    Lease of an open journal item by one batch.
+
+    Safe and selected proposals claim their journal item, so concurrent
+    batches skip it instead of proposing it again. Claims expire after
+    LEASE_HOURS and are dropped when the batch releases them.
+    """
+
+    _name = 'mass.reconcile.claim'
+    _description = 'Mass Reconciliation Move Line Claim'
+    _log_access = False
+
+    # Lease duration of a claim
+    LEASE_HOURS = 8
+
+    move_line_id = fields.Many2one(
+        'account.move.line',
+        string='Journal Item',
+        required=True,
+        ondelete='cascade',
+        help='Claimed journal item'
+    )
+    batch_id = fields.Many2one(
+        'mass.reconcile.batch',
+        string='Batch',
+        required=True,
+        index=True,
+        ondelete='cascade',
+        help='Batch holding the claim'
+    )
+    expires_at = fields.Datetime(
+        string='Expires At',
+        required=True,
+        help='The claim is ignored (and can be taken over) after this time'
+    )
+
+    _sql_constraints = [
+        ('move_line_unique',
+         'UNIQUE(move_line_id)',
+         'A journal item can only be claimed by one batch')
+    ]
+
+    @api.model
+    def _get_claimed_by_others(self, move_line_ids, batch_id):
+        """
+        Return the journal items held by an unexpired claim of another batch.
+
+        Args:
+            move_line_ids: iterable of account.move.line ids
+            batch_id: id of the batch asking
+
+        Returns:
+            set: claimed account.move.line ids
+        """
+        move_line_ids = list(move_line_ids)
+        if not move_line_ids:
+            return set()
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT move_line_id
+              FROM mass_reconcile_claim
+             WHERE move_line_id = ANY(%s)
+               AND batch_id != %s
+               AND expires_at > (NOW() AT TIME ZONE 'UTC')
+        """, (move_line_ids, batch_id))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _claim(self, move_line_ids, batch_id):
+        """
+        Claim journal items for a batch without waiting on concurrent runs.
+
+        The open items rows are locked with FOR UPDATE SKIP LOCKED, so items
+        another transaction is claiming right now are skipped rather than
+        waited for. Items already claimed by another batch keep their claim
+        until it expires.
+
+        Args:
+            move_line_ids: iterable of account.move.line ids
+            batch_id: id of the claiming batch
+
+        Returns:
+            set: account.move.line ids now claimed by the batch
+        """
+        move_line_ids = list(move_line_ids)
+        if not move_line_ids:
+            return set()
+        self.flush_model()
+        self.env['mass.reconcile.open.item'].flush_model()
+        self.env.cr.execute("""
+            SELECT move_line_id
+              FROM mass_reconcile_open_item
+             WHERE move_line_id = ANY(%s)
+               FOR UPDATE SKIP LOCKED
+        """, (move_line_ids,))
+        lockable_ids = [row[0] for row in self.env.cr.fetchall()]
+        if not lockable_ids:
+            return set()
+
+        self.env.cr.execute("""
+            INSERT INTO mass_reconcile_claim (move_line_id, batch_id, expires_at)
+            SELECT ml_id, %(batch_id)s,
+                   (NOW() AT TIME ZONE 'UTC') + make_interval(hours => %(hours)s)
+              FROM unnest(%(ids)s::int[]) AS ml_id
+            ON CONFLICT (move_line_id) DO UPDATE
+               SET batch_id = EXCLUDED.batch_id,
+                   expires_at = EXCLUDED.expires_at
+             WHERE mass_reconcile_claim.batch_id = EXCLUDED.batch_id
+                OR mass_reconcile_claim.expires_at <= (NOW() AT TIME ZONE 'UTC')
+            RETURNING move_line_id
+        """, {'batch_id': batch_id, 'hours': self.LEASE_HOURS, 'ids': lockable_ids})
+        claimed = {row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_model()
+        return claimed
+
+    @api.model
+    def _explain_unclaimed(self, move_line_ids, batch_id):
+        """
+        Tell why journal items were not claimed by _claim.
+
+        Args:
+            move_line_ids: iterable of account.move.line ids _claim did not return
+            batch_id: id of the claiming batch
+
+        Returns:
+            dict: {'closed', 'claimed', 'locked'} -> set of account.move.line ids
+                  (items no longer in the open items snapshot, held by an
+                  unexpired claim of another batch, or locked by a concurrent
+                  transaction)
+        """
+        move_line_ids = set(move_line_ids)
+        if not move_line_ids:
+            return {'closed': set(), 'claimed': set(), 'locked': set()}
+        self.env.cr.execute("""
+            SELECT move_line_id FROM mass_reconcile_open_item WHERE move_line_id = ANY(%s)
+        """, (list(move_line_ids),))
+        open_ids = {row[0] for row in self.env.cr.fetchall()}
+        claimed_ids = self._get_claimed_by_others(open_ids, batch_id)
+        return {
+            'closed': move_line_ids - open_ids,
+            'claimed': claimed_ids,
+            'locked': open_ids - claimed_ids,
+        }
+
+    @api.model
+    def _release(self, batch_ids, move_line_ids=None):
+        """
+        Drop the claims of batches, optionally only on some journal items.
+
+        Args:
+            batch_ids: list of batch ids
+            move_line_ids: optional list of account.move.line ids
+        """
+        self.flush_model()
+        if move_line_ids is None:
+            self.env.cr.execute(
+                "DELETE FROM mass_reconcile_claim WHERE batch_id = ANY(%s)",
+                (list(batch_ids),),
+            )
+        else:
+            self.env.cr.execute(
+                "DELETE FROM mass_reconcile_claim WHERE batch_id = ANY(%s) AND move_line_id = ANY(%s)",
+                (list(batch_ids), list(move_line_ids)),
+            )
+        self.invalidate_model()
+
+    @api.autovacuum
+    def _gc_expired_claims(self):
+        """Delete expired claims."""
+        self.env.cr.execute(
+            "DELETE FROM mass_reconcile_claim WHERE expires_at <= (NOW() AT TIME ZONE 'UTC')"
+        )
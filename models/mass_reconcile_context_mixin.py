@@ -0,0 +1,47 @@
+"""Matching context source - invalidates the cached matching context on relevant changes."""
+
+from odoo import models, api
+
+
+class MassReconcileContextMixin(models.AbstractModel):
+    """
+    Records the cached matching context is built from.
+
+    Creating or deleting a record the context includes, or writing one of the
+    fields it reads, drops the engine's cached context data (see
+    mass.reconcile.engine._clear_matching_context_cache). Other records and
+    fields leave the cache alone.
+    """
+    _name = 'mass.reconcile.context.mixin'
+    _description = 'Mass Reconciliation Matching Context Source'
+
+    # Fields the cached matching context depends on
+    _MASS_RECONCILE_CONTEXT_FIELDS = set()
+
+    def _filter_mass_reconcile_context_records(self):
+        """Records of this recordset the matching context includes (all of them by default)."""
+        return self
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if records._filter_mass_reconcile_context_records():
+            self.env['mass.reconcile.engine']._clear_matching_context_cache()
+        return records
+
+    def write(self, vals):
+        if not self._MASS_RECONCILE_CONTEXT_FIELDS.intersection(vals):
+            return super().write(vals)
+        # A record may enter or leave the context with this write
+        included = bool(self._filter_mass_reconcile_context_records())
+        res = super().write(vals)
+        if included or self._filter_mass_reconcile_context_records():
+            self.env['mass.reconcile.engine']._clear_matching_context_cache()
+        return res
+
+    def unlink(self):
+        included = bool(self._filter_mass_reconcile_context_records())
+        res = super().unlink()
+        if included:
+            self.env['mass.reconcile.engine']._clear_matching_context_cache()
+        return res
@@ -1,8 +1,42 @@
 """Mass Reconciliation Engine - searches and scores reconciliation candidates."""
 
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from contextlib import suppress
 from datetime import timedelta
-from odoo import models, fields, api
-from odoo.tools.float_utils import float_compare
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
+from odoo.tools import SQL, split_every
+from odoo.tools.float_utils import float_compare, float_round
+
+
+class MatchingContext:
+    """
+    Company-level data shared by every statement line of a matching run.
+
+    Built from the engine's ormcache'd lookups, so bank journals, reconcile
+    models and currency roundings are queried once per company instead of
+    once per statement line.
+    """
+
+    __slots__ = ('company_id', 'company_currency_id', 'bank_journal_ids',
+                 'reconcile_model_ids', 'roundings', 'rates')
+
+    def __init__(self, company_id, company_currency_id, bank_journal_ids,
+                 reconcile_model_ids, roundings):
+        self.company_id = company_id
+        self.company_currency_id = company_currency_id
+        self.bank_journal_ids = bank_journal_ids
+        self.reconcile_model_ids = reconcile_model_ids
+        self.roundings = roundings
+        # Per-run rate table: {date: {currency_id: rate}}, filled on demand
+        self.rates = {}
+
+    def get_rounding(self, currency_id=None):
+        """Rounding of the given currency, or of the company currency."""
+        return self.roundings[currency_id or self.company_currency_id]
 
 
 class MassReconcileEngine(models.AbstractModel):
@@ -11,6 +45,24 @@ class MassReconcileEngine(models.AbstractModel):
     _name = 'mass.reconcile.engine'
     _description = 'Mass Reconciliation Engine'
 
+    # Score boost applied on top of the weighted factors for internal transfers
+    TRANSFER_SCORE_BONUS = 5.0
+
+    # Inner +/- day windows tried by the progressive search before the full range
+    PROGRESSIVE_WINDOWS = (3, 10)
+
+    # Blocking: minimum score for a blocked (not amount-filtered) pair to be proposed,
+    # and length of the reference token prefixes used as blocking keys
+    BLOCKING_MIN_SCORE = 50.0
+    BLOCKING_REF_PREFIX = 6
+
+    # Payload API: statement lines per request, and per in-memory chunk
+    PAYLOAD_MAX_LINES = 10000
+    PAYLOAD_CHUNK_SIZE = 500
+
+    # Index names in EXPLAIN output ("Index Scan using x", "Bitmap Index Scan on x")
+    _PLAN_INDEX_PATTERN = r'(?:Index (?:Only )?Scan (?:Backward )?using|Bitmap Index Scan on) (\w+)'
+
     # Configuration field
     date_range_days = fields.Integer(
         string='Date Range Days',
@@ -18,28 +70,117 @@ class MassReconcileEngine(models.AbstractModel):
         help='Number of days +/- for date range filtering'
     )
 
-    def find_candidates(self, statement_line):
+    def _get_date_range_days(self):
+        """Search window in days: date_range_days, or the window a simulation tries through the context."""
+        return self.env.context.get('mass_reconcile_date_range_days') or self.date_range_days or 30
+
+    def find_candidates(self, statement_line, search_mode='full', stage_stats=None,
+                        blocking_index=None, matching_context=None):
         """
         Find and score reconciliation candidates for a statement line.
 
         Args:
             statement_line: account.bank.statement.line record
+            search_mode: 'full' searches the whole +/- date_range_days window at
+                once; 'progressive' widens through PROGRESSIVE_WINDOWS and stops
+                as soon as a unique safe candidate is found
+            stage_stats: optional dict {stage: count}, incremented with the
+                stage that ended the search (progressive mode only)
+            blocking_index: index from _build_blocking_index (required for
+                search_mode 'blocking', where only pairs sharing a blocking
+                key are scored)
+            matching_context: MatchingContext of the line's company (looked up
+                when not given)
 
         Returns:
-            list: List of candidate dicts [{move_line_id, score, match_type, reason}]
+            list: List of candidate dicts
+                  [{move_line_id, score, match_type, reason, factor_scores}]
                   sorted by score descending
         """
         self.ensure_one() if self.ids else None
+        ctx = matching_context or self._get_matching_context(statement_line.company_id)
+
+        if search_mode == 'progressive':
+            candidates = self._find_candidates_progressive(statement_line, stage_stats, ctx)
+        elif search_mode == 'blocking':
+            move_lines = self._search_blocked_candidates(statement_line, blocking_index)
+            floor = max(self.BLOCKING_MIN_SCORE, self.env['mass.reconcile.scorer']._get_score_floor())
+            candidates = self._score_amount_candidates(statement_line, move_lines, ctx, floor=floor)
+        else:
+            amount_candidates = self._search_amount_candidates(statement_line, matching_context=ctx)
+            candidates = self._score_amount_candidates(statement_line, amount_candidates, ctx)
+
+        # Search for internal transfers
+        transfer_candidates = self._detect_internal_transfers(statement_line, matching_context=ctx)
+        candidates.extend(transfer_candidates)
+
+        # Sort by score descending
+        candidates.sort(key=lambda c: c['score'], reverse=True)
+
+        return candidates
+
+    def _find_candidates_progressive(self, statement_line, stage_stats=None,
+                                     matching_context=None):
+        """
+        Search widening date rings, stopping at the first unique safe candidate.
+
+        Each stage only searches the days not covered by the previous one, so
+        no move line is fetched or scored twice.
+
+        Args:
+            statement_line: account.bank.statement.line record
+            stage_stats: optional dict {stage: count} to update
+            matching_context: MatchingContext of the line's company
+
+        Returns:
+            list: List of scored candidate dicts (unsorted)
+        """
+        date_range = self._get_date_range_days()
+        windows = [w for w in self.PROGRESSIVE_WINDOWS if w < date_range] + [date_range]
 
         candidates = []
+        searched_days = None
+        stage = 'full'
+        for days in windows:
+            stage = 'full' if days == date_range else f'{days}d'
+            move_lines = self._search_amount_candidates(
+                statement_line, date_range=days, exclude_days=searched_days,
+                matching_context=matching_context,
+            )
+            candidates += self._score_amount_candidates(statement_line, move_lines, matching_context)
+            searched_days = days
+
+            # A unique safe candidate ends the search early
+            if sum(1 for c in candidates if c['match_type'] == 'safe') == 1:
+                break
+
+        if stage_stats is not None:
+            stage_stats[stage] = stage_stats.get(stage, 0) + 1
+        return candidates
+
+    def _score_amount_candidates(self, statement_line, move_lines, matching_context=None, floor=None):
+        """
+        Score amount-matching move lines against a statement line.
 
-        # Search for regular candidates (amount + filters)
-        amount_candidates = self._search_amount_candidates(statement_line)
+        Args:
+            statement_line: account.bank.statement.line record
+            move_lines: account.move.line recordset
+            matching_context: MatchingContext of the line's company
+            floor: minimum score of the candidates kept (defaults to the
+                scorer's floor, see _get_score_floor)
 
-        # Score each candidate
+        Returns:
+            list: List of candidate dicts
+        """
+        candidates = []
         scorer = self.env['mass.reconcile.scorer'].sudo()
-        for move_line in amount_candidates:
-            score = scorer.calculate_score(statement_line, move_line)
+        for move_line in move_lines:
+            factor_scores = scorer.calculate_factor_scores(
+                statement_line, move_line, matching_context=matching_context, floor=floor,
+            )
+            if factor_scores is None:
+                continue
+            score = scorer.combine_factor_scores(factor_scores)
             classification = scorer.classify_match(score)
 
             # Build reason string
@@ -57,23 +198,17 @@ class MassReconcileEngine(models.AbstractModel):
                 'score': score,
                 'match_type': classification,
                 'reason': ' | '.join(reason_parts) if reason_parts else 'Amount match',
+                'factor_scores': factor_scores,
             })
-
-        # Search for internal transfers
-        transfer_candidates = self._detect_internal_transfers(statement_line)
-        candidates.extend(transfer_candidates)
-
-        # Sort by score descending
-        candidates.sort(key=lambda c: c['score'], reverse=True)
-
         return candidates
 
-    def apply_reconcile_models(self, statement_line):
+    def apply_reconcile_models(self, statement_line, matching_context=None):
         """
         Apply account.reconcile.model rules for invoice matching.
 
         Args:
             statement_line: account.bank.statement.line record
+            matching_context: MatchingContext of the line's company
 
         Returns:
             list: List of candidate dicts [{move_line_id, score, match_type, reason}]
@@ -83,11 +218,9 @@ class MassReconcileEngine(models.AbstractModel):
         candidates = []
 
         try:
-            # Search for applicable reconciliation models (invoice_matching only)
-            models = self.env['account.reconcile.model'].search([
-                ('rule_type', '=', 'invoice_matching'),
-                ('company_id', '=', statement_line.company_id.id),
-            ])
+            # Applicable reconciliation models (invoice_matching only), cached per company
+            ctx = matching_context or self._get_matching_context(statement_line.company_id)
+            models = self.env['account.reconcile.model'].browse(ctx.reconcile_model_ids)
 
             if not models:
                 return candidates
@@ -149,11 +282,10 @@ class MassReconcileEngine(models.AbstractModel):
         # If all criteria match, search for move lines
         if matches_partner and matches_label and matches_amount:
             # Build domain for move line search based on model configuration
-            domain = self._build_base_domain(statement_line)
+            domain = self._build_base_domain(statement_line, open_items=True)
 
-            # Search for matching move lines
-            MoveLine = self.env['account.move.line']
-            matching_move_lines = MoveLine.search(domain, limit=10)
+            # Search for matching move lines in the open items snapshot
+            matching_move_lines = self._search_open_items(domain, limit=10)
 
             # Score each matching move line
             scorer = self.env['mass.reconcile.scorer'].sudo()
@@ -173,51 +305,59 @@ class MassReconcileEngine(models.AbstractModel):
 
         return candidates
 
-    def _search_amount_candidates(self, statement_line):
+    def _search_amount_candidates(self, statement_line, date_range=None, exclude_days=None,
+                                  matching_context=None):
         """
         Search for move lines matching statement line amount.
 
         Args:
             statement_line: account.bank.statement.line record
+            date_range: +/- days to search (defaults to date_range_days)
+            exclude_days: skip the inner +/- window already searched
+            matching_context: MatchingContext of the line's company
 
         Returns:
             recordset: account.move.line records matching criteria
         """
         self.ensure_one() if self.ids else None
 
-        # Build base domain
-        domain = self._build_base_domain(statement_line)
+        ctx = matching_context or self._get_matching_context(statement_line.company_id)
+        st_amounts = self._get_statement_amounts(statement_line, ctx)
 
-        # Add amount filter using float_compare logic
-        # We need to find move lines where abs(debit - credit) matches statement amount
-        # Since we can't use float_compare in domain directly, we'll get candidates
-        # and filter them in Python (Odoo best practice for float comparisons)
+        # Build base domain, narrowed to amount ranges around the statement
+        # amount, and search the open items snapshot rather than account_move_line
+        domain = self._build_base_domain(
+            statement_line, date_range=date_range, exclude_days=exclude_days,
+            open_items=True,
+        ) + self._build_amount_domain(st_amounts, ctx)
 
-        # Search without exact amount filter first
-        MoveLine = self.env['account.move.line']
-        all_candidates = MoveLine.search(domain)
-
-        # Filter by amount using float_compare
-        currency = statement_line.currency_id or statement_line.company_id.currency_id
-        precision = currency.rounding
-        st_amount = abs(statement_line.amount)
+        # The ranges are only a superset: the exact comparison uses float_compare
+        # in Python (Odoo best practice for float comparisons)
+        all_candidates = self._search_open_items(domain)
 
         matching_candidates = all_candidates.filtered(
-            lambda ml: float_compare(
-                abs(ml.debit - ml.credit),
-                st_amount,
-                precision_rounding=precision
-            ) == 0
+            lambda ml: self._amount_matches(st_amounts, ml, ctx)
         )
 
+        # An inferred partner is only a guess: widen the search if it found nothing
+        if not matching_candidates and not statement_line.partner_id and statement_line.inferred_partner_id:
+            domain = self._build_base_domain(
+                statement_line, use_inferred_partner=False,
+                date_range=date_range, exclude_days=exclude_days, open_items=True,
+            ) + self._build_amount_domain(st_amounts, ctx)
+            matching_candidates = self._search_open_items(domain).filtered(
+                lambda ml: self._amount_matches(st_amounts, ml, ctx)
+            )
+
         return matching_candidates
 
-    def _detect_internal_transfers(self, statement_line):
+    def _detect_internal_transfers(self, statement_line, matching_context=None):
         """
         Detect internal transfers between bank accounts.
 
         Args:
             statement_line: account.bank.statement.line record
+            matching_context: MatchingContext of the line's company
 
         Returns:
             list: List of internal transfer candidate dicts
@@ -225,15 +365,15 @@ class MassReconcileEngine(models.AbstractModel):
         self.ensure_one() if self.ids else None
 
         candidates = []
+        ctx = matching_context or self._get_matching_context(statement_line.company_id)
 
         # Get all bank journals in same company except current one
-        bank_journals = self.env['account.journal'].search([
-            ('type', '=', 'bank'),
-            ('company_id', '=', statement_line.company_id.id),
-            ('id', '!=', statement_line.journal_id.id),
-        ])
+        bank_journal_ids = [
+            journal_id for journal_id in ctx.bank_journal_ids
+            if journal_id != statement_line.journal_id.id
+        ]
 
-        if not bank_journals:
+        if not bank_journal_ids:
             return candidates
 
         # Look for opposite amount in other bank journals
@@ -241,61 +381,299 @@ class MassReconcileEngine(models.AbstractModel):
         transfer_date_from = statement_line.date - timedelta(days=7)
         transfer_date_to = statement_line.date + timedelta(days=7)
 
-        # Opposite amount
-        opposite_amount = -statement_line.amount
+        # Statement amounts; the other leg carries the opposite amount
+        st_amounts = self._get_statement_amounts(statement_line, ctx)
 
         # Build domain for transfer search
-        domain = [
-            ('journal_id', 'in', bank_journals.ids),
-            ('company_id', '=', statement_line.company_id.id),
-            ('parent_state', '=', 'posted'),
-            ('full_reconcile_id', '=', False),
-            ('account_id.reconcile', '=', True),
-            ('date', '>=', transfer_date_from),
-            ('date', '<=', transfer_date_to),
-        ]
-
-        # Search and filter by amount
-        MoveLine = self.env['account.move.line']
-        potential_transfers = MoveLine.search(domain)
+        domain = self._build_transfer_domain(
+            statement_line, bank_journal_ids, transfer_date_from, transfer_date_to,
+            st_amounts, ctx,
+        )
 
-        currency = statement_line.currency_id or statement_line.company_id.currency_id
-        precision = currency.rounding
+        # Search the open items snapshot and filter by amount
+        potential_transfers = self._search_open_items(domain)
 
         # Filter by opposite amount
         matching_transfers = potential_transfers.filtered(
-            lambda ml: float_compare(
-                ml.debit - ml.credit,
-                opposite_amount,
-                precision_rounding=precision
-            ) == 0
+            lambda ml: self._amount_matches(st_amounts, ml, ctx, opposite=True)
         )
 
         # Score transfer candidates
         scorer = self.env['mass.reconcile.scorer'].sudo()
         for move_line in matching_transfers:
-            # Transfers get high score due to amount match + internal context
-            score = scorer.calculate_score(statement_line, move_line)
+            # Transfers get high score due to amount match + internal context. Their
+            # amount factor misses the opposite amount, so no floor applies here
+            factor_scores = scorer.calculate_factor_scores(
+                statement_line, move_line, matching_context=ctx, floor=0.0,
+            )
+            if factor_scores is None:
+                continue
+            score = scorer.combine_factor_scores(factor_scores)
 
             # Boost score slightly for internal transfers (amount is opposite but matching)
             # This is a known internal operation
-            score = min(score + 5.0, 100.0)
+            score = min(score + self.TRANSFER_SCORE_BONUS, 100.0)
 
             candidates.append({
                 'move_line_id': move_line.id,
                 'score': score,
                 'match_type': 'internal_transfer',
                 'reason': f'Internal transfer from {move_line.journal_id.name}',
+                'factor_scores': factor_scores,
+                'score_bonus': self.TRANSFER_SCORE_BONUS,
             })
 
         return candidates
 
-    def _build_base_domain(self, statement_line):
+    def _get_matching_context(self, company):
+        """
+        Return the cached MatchingContext of a company.
+
+        Args:
+            company: res.company record
+
+        Returns:
+            MatchingContext
+        """
+        company_currency_id, bank_journal_ids, reconcile_model_ids = (
+            self._get_company_matching_data(company.id)
+        )
+        return MatchingContext(
+            company_id=company.id,
+            company_currency_id=company_currency_id,
+            bank_journal_ids=bank_journal_ids,
+            reconcile_model_ids=reconcile_model_ids,
+            roundings=dict(self._get_currency_roundings()),
+        )
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_company_matching_data(self, company_id):
+        """
+        Company currency, bank journals and invoice-matching reconcile models.
+
+        Cached until a bank journal or invoice-matching reconcile model changes
+        (see _clear_matching_context_cache).
+
+        Returns:
+            tuple: (company_currency_id, bank_journal_ids, reconcile_model_ids)
+        """
+        company = self.env['res.company'].sudo().browse(company_id)
+        bank_journals = self.env['account.journal'].sudo().search([
+            ('type', '=', 'bank'),
+            ('company_id', '=', company_id),
+        ])
+        reconcile_models = self.env['account.reconcile.model'].sudo().search([
+            ('rule_type', '=', 'invoice_matching'),
+            ('company_id', '=', company_id),
+        ])
+        return company.currency_id.id, tuple(bank_journals.ids), tuple(reconcile_models.ids)
+
+    @api.model
+    @tools.ormcache()
+    def _get_currency_roundings(self):
+        """
+        Rounding of every currency, cached until a currency is added, removed
+        or rounded differently (see _clear_matching_context_cache).
+
+        Returns:
+            tuple: ((currency_id, rounding), ...)
+        """
+        currencies = self.env['res.currency'].sudo().with_context(active_test=False).search([])
+        return tuple((currency.id, currency.rounding) for currency in currencies)
+
+    @api.model
+    def _clear_matching_context_cache(self):
+        """
+        Drop the cached matching context data (see mass.reconcile.context.mixin).
+
+        Only the entries of the context lookups are removed from this worker's
+        cache, other cached methods are kept. Other workers only learn of
+        invalidations per cache, so the cache is also signalled as changed to
+        them at the end of the transaction.
+        """
+        methods = {
+            type(self)._get_company_matching_data.__cache__.method,
+            type(self)._get_currency_roundings.__cache__.method,
+        }
+        cache = self.env.registry._Registry__caches['default']
+        for key in list(cache.d):
+            if key[:1] == (self._name,) and key[1] in methods:
+                with suppress(KeyError):  # evicted by another thread meanwhile
+                    del cache[key]
+        self.env.registry.cache_invalidated.add('default')
+
+    def _get_statement_amounts(self, statement_line, matching_context):
+        """
+        Amount of a statement line in its transaction and company currencies.
+
+        The transaction currency is the foreign currency when the line has one,
+        else the journal currency. The company amount is converted through the
+        run's rate table when the currencies differ.
+
+        Args:
+            statement_line: account.bank.statement.line record
+            matching_context: MatchingContext of the line's company
+
+        Returns:
+            tuple: (currency_id, signed amount, signed company-currency amount)
+        """
+        ctx = matching_context
+        if statement_line.foreign_currency_id:
+            currency_id = statement_line.foreign_currency_id.id
+            amount = statement_line.amount_currency
+        else:
+            currency_id = statement_line.currency_id.id or ctx.company_currency_id
+            amount = statement_line.amount
+        company_amount = self._convert_to_company_currency(
+            amount, currency_id, statement_line.date, ctx,
+        )
+        return currency_id, amount, company_amount
+
+    def _convert_to_company_currency(self, amount, currency_id, date, matching_context):
+        """
+        Convert an amount to the company currency with the run's rate table.
+
+        Args:
+            amount: amount in currency_id
+            currency_id: res.currency id
+            date: conversion date
+            matching_context: MatchingContext holding the rate table
+
+        Returns:
+            float: amount in company currency, rounded
+        """
+        return self._convert_currency(
+            amount, currency_id, matching_context.company_currency_id, date, matching_context,
+        )
+
+    def _convert_currency(self, amount, from_currency_id, to_currency_id, date, matching_context):
+        """
+        Convert an amount between two currencies with the run's rate table.
+
+        Rates are loaded once per date for all currencies, instead of calling
+        res.currency._convert for every pair.
+
+        Args:
+            amount: amount in from_currency_id
+            from_currency_id: res.currency id of the amount
+            to_currency_id: res.currency id to convert to
+            date: conversion date
+            matching_context: MatchingContext holding the rate table
+
+        Returns:
+            float: amount in to_currency_id, rounded
+        """
+        ctx = matching_context
+        if from_currency_id == to_currency_id:
+            return amount
+        rates = ctx.rates.get(date)
+        if rates is None:
+            currencies = self.env['res.currency'].sudo().browse(list(ctx.roundings))
+            company = self.env['res.company'].sudo().browse(ctx.company_id)
+            rates = ctx.rates[date] = currencies._get_rates(company, date)
+        converted = amount * rates.get(to_currency_id, 1.0) / (rates.get(from_currency_id) or 1.0)
+        return float_round(converted, precision_rounding=ctx.get_rounding(to_currency_id))
+
+    def _amount_matches(self, statement_amounts, move_line, matching_context, opposite=False):
+        """
+        Whether a move line carries the statement amount.
+
+        Lines in the statement's transaction currency are compared on
+        amount_currency; others on their company-currency balance.
+
+        Args:
+            statement_amounts: tuple from _get_statement_amounts
+            move_line: account.move.line record
+            matching_context: MatchingContext of the line's company
+            opposite: compare signed against the opposite amount (transfers)
+                instead of absolute values
+
+        Returns:
+            bool
+        """
+        ctx = matching_context
+        currency_id, amount, company_amount = statement_amounts
+        if move_line.currency_id.id == currency_id:
+            value, target, rounding = move_line.amount_currency, amount, ctx.get_rounding(currency_id)
+        else:
+            value, target, rounding = move_line.balance, company_amount, ctx.get_rounding()
+        if opposite:
+            return float_compare(value, -target, precision_rounding=rounding) == 0
+        return float_compare(abs(value), abs(target), precision_rounding=rounding) == 0
+
+    def _build_transfer_domain(self, statement_line, journal_ids, date_from, date_to,
+                               statement_amounts, matching_context):
+        """
+        Open items domain for the opposite leg of an internal transfer.
+
+        Args:
+            statement_line: account.bank.statement.line record
+            journal_ids: candidate bank journal ids
+            date_from: first date of the window
+            date_to: last date of the window
+            statement_amounts: tuple from _get_statement_amounts
+            matching_context: MatchingContext of the line's company
+
+        Returns:
+            list: mass.reconcile.open.item domain
+        """
+        return [
+            ('journal_id', 'in', journal_ids),
+            ('company_id', '=', statement_line.company_id.id),
+            ('date', '>=', date_from),
+            ('date', '<=', date_to),
+        ] + self._build_amount_domain(statement_amounts, matching_context, opposite=True)
+
+    def _build_amount_domain(self, statement_amounts, matching_context, opposite=False):
+        """
+        Open items domain matching the statement amount within half a rounding unit.
+
+        Matches either the transaction-currency amount on items in that
+        currency, or the company-currency amount.
+
+        Args:
+            statement_amounts: tuple from _get_statement_amounts
+            matching_context: MatchingContext of the line's company
+            opposite: match the signed opposite amount (transfers) instead of
+                the absolute amount
+
+        Returns:
+            list: mass.reconcile.open.item domain (a superset of the
+                  float_compare match)
+        """
+        ctx = matching_context
+        currency_id, amount, company_amount = statement_amounts
+        if opposite:
+            currency_field, company_field = 'amount_currency', 'balance'
+            amount, company_amount = -amount, -company_amount
+        else:
+            currency_field, company_field = 'abs_amount_currency', 'abs_amount'
+            amount, company_amount = abs(amount), abs(company_amount)
+        currency_tolerance = ctx.get_rounding(currency_id) / 2
+        company_tolerance = ctx.get_rounding() / 2
+        return [
+            '|',
+            '&', ('currency_id', '=', currency_id),
+            '&', (currency_field, '>=', amount - currency_tolerance),
+            (currency_field, '<=', amount + currency_tolerance),
+            '&', (company_field, '>=', company_amount - company_tolerance),
+            (company_field, '<=', company_amount + company_tolerance),
+        ]
+
+    def _build_base_domain(self, statement_line, use_inferred_partner=True,
+                           date_range=None, exclude_days=None, open_items=False):
         """
         Build base domain for candidate search.
 
         Args:
             statement_line: account.bank.statement.line record
+            use_inferred_partner: scope by inferred_partner_id when partner_id is empty
+            date_range: +/- days to search (defaults to date_range_days)
+            exclude_days: leave out the inner +/- window (progressive search)
+            open_items: build the domain for mass.reconcile.open.item (which only
+                holds open posted lines, keyed by commercial partner) instead
+                of account.move.line
 
         Returns:
             list: Odoo domain filter
@@ -303,22 +681,578 @@ class MassReconcileEngine(models.AbstractModel):
         self.ensure_one() if self.ids else None
 
         # Calculate date range
-        date_range = self.date_range_days or 30
+        date_range = date_range or self._get_date_range_days()
         date_from = statement_line.date - timedelta(days=date_range)
         date_to = statement_line.date + timedelta(days=date_range)
 
         # Base domain
         domain = [
-            ('full_reconcile_id', '=', False),  # Not already reconciled
-            ('account_id.reconcile', '=', True),  # Reconcilable account
-            ('parent_state', '=', 'posted'),  # Only posted moves
             ('company_id', '=', statement_line.company_id.id),  # Same company
             ('date', '>=', date_from),  # Date range start
             ('date', '<=', date_to),  # Date range end
         ]
-
-        # Add partner filter if partner is set
-        if statement_line.partner_id:
-            domain.append(('partner_id', '=', statement_line.partner_id.id))
+        if not open_items:
+            domain = [
+                ('full_reconcile_id', '=', False),  # Not already reconciled
+                ('account_id.reconcile', '=', True),  # Reconcilable account
+                ('parent_state', '=', 'posted'),  # Only posted moves
+            ] + domain
+
+        # Skip the inner window when it was already searched
+        if exclude_days is not None:
+            domain += [
+                '|',
+                ('date', '<', statement_line.date - timedelta(days=exclude_days)),
+                ('date', '>', statement_line.date + timedelta(days=exclude_days)),
+            ]
+
+        # Add partner filter if partner is set (or was inferred)
+        partner = statement_line.partner_id
+        if not partner and use_inferred_partner:
+            partner = statement_line.inferred_partner_id
+        if partner:
+            partner_id = partner.commercial_partner_id.id if open_items else partner.id
+            domain.append(('partner_id', '=', partner_id))
 
         return domain
+
+    def _search_open_items(self, domain, limit=None):
+        """
+        Search the open items snapshot and return the matching move lines.
+
+        Args:
+            domain: mass.reconcile.open.item domain
+            limit: optional maximum number of items
+
+        Returns:
+            recordset: account.move.line records still open
+        """
+        # Warm-started re-runs only search the items added since their cached search
+        new_item_ids = self.env.context.get('mass_reconcile_open_item_ids')
+        items = self.env['mass.reconcile.open.item'].sudo().search(
+            domain + [('id', 'in', new_item_ids)] if new_item_ids is not None else domain, limit=limit,
+        )
+        move_lines = items.move_line_id.filtered(
+            lambda ml: not ml.full_reconcile_id and ml.parent_state == 'posted'
+        )
+        # Simulations put already reconciled lines back in the pool, in memory
+        reopened_items = self.env.context.get('mass_reconcile_reopened_items')
+        if reopened_items:
+            move_lines |= reopened_items.filtered_domain(domain).move_line_id
+        return move_lines
+
+    def _reference_blocking_tokens(self, *refs):
+        """Return the reference token prefixes used as blocking keys."""
+        tokens = set()
+        for ref in refs:
+            for token in re.findall(r'[a-z0-9]{4,}', (ref or '').lower()):
+                tokens.add(token[:self.BLOCKING_REF_PREFIX])
+        return tokens
+
+    def _blocking_keys(self, company_amount, currency_id, amount_currency, partner_id, date, refs):
+        """
+        Compute the cheap blocking keys of one side of a pair.
+
+        Amounts are keyed in the company currency and in the transaction
+        currency, so both sides of a pair share an amount key whichever
+        currency they have in common.
+
+        Args:
+            company_amount: signed amount in company currency
+            currency_id: transaction currency id
+            amount_currency: signed amount in the transaction currency
+            partner_id: commercial partner id or False
+            date: date or False
+            refs: iterable of reference strings
+
+        Returns:
+            set: hashable blocking keys
+        """
+        keys = {
+            ('amount', round(abs(company_amount))),
+            ('amount_currency', currency_id, round(abs(amount_currency))),
+        }
+        if partner_id:
+            keys.add(('partner', partner_id))
+        if date:
+            keys.add(('week',) + tuple(date.isocalendar()[:2]))
+        keys.update(('ref', token) for token in self._reference_blocking_tokens(*refs))
+        return keys
+
+    def _statement_line_blocking_keys(self, statement_line, matching_context):
+        """Blocking keys of a statement line (company amount converted with the run's rates)."""
+        partner = statement_line.partner_id or statement_line.inferred_partner_id
+        currency_id, amount, company_amount = self._get_statement_amounts(statement_line, matching_context)
+        return self._blocking_keys(
+            company_amount,
+            currency_id,
+            amount,
+            partner.commercial_partner_id.id,
+            statement_line.date,
+            [statement_line.payment_ref],
+        )
+
+    def _move_line_blocking_keys(self, move_line, matching_context):
+        """Blocking keys of an open move line."""
+        return self._blocking_keys(
+            move_line.debit - move_line.credit,
+            move_line.currency_id.id or matching_context.company_currency_id,
+            move_line.amount_currency,
+            move_line.partner_id.commercial_partner_id.id,
+            move_line.date,
+            [move_line.payment_ref, move_line.ref],
+        )
+
+    def _build_blocking_index(self, statement_lines, blocking_stats=None, matching_context=None):
+        """
+        Load the open items in scope once and index them by blocking key.
+
+        Args:
+            statement_lines: account.bank.statement.line recordset (one company)
+            blocking_stats: optional dict updated with 'pairs_total' (pairs in
+                the date window) and 'pairs_blocked' (pairs sharing a key)
+            matching_context: MatchingContext of the lines' company, whose
+                rate table converts the statement amounts
+
+        Returns:
+            dict: {'keys': {key: set(move_line_ids)}, 'dates': sorted [(date, id)],
+                   'date_range': int, 'matching_context': MatchingContext}
+        """
+        index = {'keys': defaultdict(set), 'dates': [], 'date_range': self._get_date_range_days()}
+        statement_lines = statement_lines.filtered('date')
+        if not statement_lines:
+            return index
+        ctx = matching_context or self._get_matching_context(statement_lines.company_id[:1])
+        index['matching_context'] = ctx
+
+        date_range = index['date_range']
+        dates = statement_lines.mapped('date')
+        domain = [
+            ('company_id', 'in', statement_lines.company_id.ids),
+            ('date', '>=', min(dates) - timedelta(days=date_range)),
+            ('date', '<=', max(dates) + timedelta(days=date_range)),
+        ]
+        move_lines = self._search_open_items(domain)
+        for move_line in move_lines:
+            for key in self._move_line_blocking_keys(move_line, ctx):
+                index['keys'][key].add(move_line.id)
+        index['dates'] = sorted((ml.date, ml.id) for ml in move_lines)
+
+        if blocking_stats is not None:
+            for line in statement_lines:
+                blocked = self._search_blocked_candidates(line, index)
+                blocking_stats['pairs_total'] = (
+                    blocking_stats.get('pairs_total', 0) + len(self._window_ids(line, index))
+                )
+                blocking_stats['pairs_blocked'] = blocking_stats.get('pairs_blocked', 0) + len(blocked)
+        return index
+
+    def _window_ids(self, statement_line, blocking_index):
+        """Ids of the indexed move lines within the statement line's date window."""
+        delta = timedelta(days=blocking_index['date_range'])
+        dates = blocking_index['dates']
+        lo = bisect_left(dates, (statement_line.date - delta,))
+        hi = bisect_right(dates, (statement_line.date + delta, float('inf')))
+        return {ml_id for _date, ml_id in dates[lo:hi]}
+
+    def _search_blocked_candidates(self, statement_line, blocking_index):
+        """
+        Return the open items sharing at least one blocking key with the line.
+
+        Args:
+            statement_line: account.bank.statement.line record
+            blocking_index: dict from _build_blocking_index
+
+        Returns:
+            recordset: account.move.line records to score
+        """
+        if not blocking_index or not statement_line.date:
+            return self.env['account.move.line']
+        keys = blocking_index['keys']
+        ids = set()
+        for key in self._statement_line_blocking_keys(statement_line, blocking_index['matching_context']):
+            ids |= keys.get(key, set())
+        ids &= self._window_ids(statement_line, blocking_index)
+        return self.env['account.move.line'].browse(sorted(ids))
+
+    def evaluate_blocking(self, statement_lines):
+        """
+        Measure blocking recall and pair reduction against exhaustive scoring.
+
+        Every pair in the date window is scored (expensive, diagnostic only).
+        Recall is the share of pairs reaching the probable threshold that
+        blocking keeps; reduction is the share of pairs blocking skips.
+
+        Args:
+            statement_lines: account.bank.statement.line recordset
+
+        Returns:
+            dict: {pairs_total, pairs_blocked, reduction_ratio,
+                   relevant_pairs, relevant_kept, recall}
+        """
+        scorer = self.env['mass.reconcile.scorer'].sudo()
+        # One matching context (and rate table) per company for the whole evaluation
+        contexts = {
+            company: self._get_matching_context(company)
+            for company in statement_lines.company_id
+        }
+        stats = {}
+        index = self._build_blocking_index(
+            statement_lines, blocking_stats=stats,
+            matching_context=contexts.get(statement_lines.company_id[:1]),
+        )
+        MoveLine = self.env['account.move.line']
+
+        relevant = kept = 0
+        for line in statement_lines.filtered('date'):
+            ctx = contexts[line.company_id]
+            blocked_ids = set(self._search_blocked_candidates(line, index).ids)
+            for move_line in MoveLine.browse(sorted(self._window_ids(line, index))):
+                factor_scores = scorer.calculate_factor_scores(
+                    line, move_line, matching_context=ctx, floor=scorer.PROBABLE_THRESHOLD,
+                )
+                if factor_scores is not None:
+                    relevant += 1
+                    kept += move_line.id in blocked_ids
+
+        pairs_total = stats.get('pairs_total', 0)
+        pairs_blocked = stats.get('pairs_blocked', 0)
+        return {
+            'pairs_total': pairs_total,
+            'pairs_blocked': pairs_blocked,
+            'reduction_ratio': 1.0 - pairs_blocked / pairs_total if pairs_total else 0.0,
+            'relevant_pairs': relevant,
+            'relevant_kept': kept,
+            'recall': kept / relevant if relevant else 1.0,
+        }
+
+    def explain_candidate_queries(self, statement_line, analyze=False):
+        """
+        Index advisor: report the query plans of the engine's candidate searches.
+
+        Args:
+            statement_line: account.bank.statement.line record used as sample
+            analyze: run EXPLAIN ANALYZE (executes the queries) instead of EXPLAIN
+
+        Returns:
+            dict: {query_name: {'plan': str, 'indexes': [index names used]}}
+        """
+        ctx = self._get_matching_context(statement_line.company_id)
+        st_amounts = self._get_statement_amounts(statement_line, ctx)
+        transfer_journal_ids = [
+            journal_id for journal_id in ctx.bank_journal_ids
+            if journal_id != statement_line.journal_id.id
+        ]
+        domains = {
+            'amount_candidates': (
+                self._build_base_domain(statement_line, open_items=True)
+                + self._build_amount_domain(st_amounts, ctx)
+            ),
+            'partner_scoped': self._build_base_domain(statement_line, open_items=True),
+            'internal_transfers': self._build_transfer_domain(
+                statement_line, transfer_journal_ids,
+                statement_line.date - timedelta(days=7),
+                statement_line.date + timedelta(days=7),
+                st_amounts, ctx,
+            ),
+        }
+
+        OpenItem = self.env['mass.reconcile.open.item'].sudo()
+        OpenItem.flush_model()
+        explain = SQL('EXPLAIN (ANALYZE, BUFFERS)') if analyze else SQL('EXPLAIN')
+        report = {}
+        for name, domain in domains.items():
+            query = OpenItem._search(domain)
+            self.env.cr.execute(SQL('%s %s', explain, query.select()))
+            plan = '\n'.join(row[0] for row in self.env.cr.fetchall())
+            report[name] = {
+                'plan': plan,
+                'indexes': sorted(set(re.findall(self._PLAN_INDEX_PATTERN, plan))),
+            }
+        return report
+
+    @api.model
+    def match_statement_payloads(self, journal_id, payloads, limit=5):
+        """
+        Rank candidates for statement lines held outside Odoo, without storing anything.
+
+        Each payload is turned into an in-memory (new) statement line of the
+        given bank journal and run through the regular candidate search and
+        reconcile models. Payloads are processed in chunks of
+        PAYLOAD_CHUNK_SIZE, dropping the cache between chunks.
+
+        Args:
+            journal_id: id of the bank journal the lines belong to
+            payloads: list of dicts with 'amount' and 'date' (required) and
+                optionally 'ref' (echoed back), 'reference', 'currency' (ISO
+                code), 'partner_id', 'partner_name' and 'account_number'
+            limit: number of candidates returned per line
+
+        Returns:
+            list: one {'ref', 'candidates': [...]} dict per payload, in order
+        """
+        if len(payloads) > self.PAYLOAD_MAX_LINES:
+            raise ValidationError(
+                f"At most {self.PAYLOAD_MAX_LINES} statement lines can be matched per request"
+            )
+        journal = self.env['account.journal'].browse(journal_id).exists()
+        if not journal or journal.type != 'bank':
+            raise ValidationError(f"Bank journal {journal_id} not found")
+        journal.check_access('read')
+
+        engine = self.sudo()
+        journal = journal.sudo()
+        ctx = engine._get_matching_context(journal.company_id)
+        codes = {p['currency'] for p in payloads if p.get('currency')}
+        currency_ids = dict(
+            self.env['res.currency'].sudo().with_context(active_test=False)
+            .search([('name', 'in', list(codes))]).mapped(lambda c: (c.name, c.id))
+        )
+        unknown = codes - set(currency_ids)
+        if unknown:
+            raise ValidationError(f"Unknown currencies: {', '.join(sorted(unknown))}")
+
+        results = []
+        for chunk in split_every(self.PAYLOAD_CHUNK_SIZE, payloads):
+            lines = engine._new_payload_statement_lines(journal, chunk, currency_ids, ctx)
+            resolved = self.env['mass.reconcile.partner.key'].sudo().resolve_statement_lines(lines)
+            for line in lines:
+                if line.id in resolved:
+                    line.inferred_partner_id = resolved[line.id]
+
+            ranked = []
+            for line in lines:
+                candidates = engine.find_candidates(line, matching_context=ctx)
+                candidates += engine.apply_reconcile_models(line, matching_context=ctx)
+                candidates.sort(key=lambda c: c['score'], reverse=True)
+                ranked.append(candidates[:limit])
+
+            move_lines = self.env['account.move.line'].sudo().browse(
+                {c['move_line_id'] for candidates in ranked for c in candidates}
+            )
+            move_lines.fetch(['move_id', 'partner_id', 'date', 'balance', 'amount_currency', 'currency_id'])
+            scorer = self.env['mass.reconcile.scorer']
+            for payload, candidates in zip(chunk, ranked):
+                results.append({
+                    'ref': payload.get('ref', len(results)),
+                    'candidates': [
+                        engine._format_payload_candidate(candidate, scorer)
+                        for candidate in candidates
+                    ],
+                })
+            self.env.invalidate_all()
+        return results
+
+    def _new_payload_statement_lines(self, journal, payloads, currency_ids, matching_context):
+        """
+        Build in-memory statement lines from API payloads.
+
+        A payload in another currency than the journal's becomes a foreign
+        currency line, with its amount converted to the journal currency (the
+        company currency for journals without one) through the run's rate
+        table.
+
+        Returns:
+            account.bank.statement.line: new (unsaved) records
+        """
+        ctx = matching_context
+        journal_currency_id = journal.currency_id.id or ctx.company_currency_id
+        StatementLine = self.env['account.bank.statement.line']
+        lines = StatementLine
+        for payload in payloads:
+            try:
+                amount = float(payload['amount'])
+                date = fields.Date.to_date(payload['date'])
+            except (KeyError, TypeError, ValueError):
+                raise ValidationError(
+                    f"Statement line {payload.get('ref', len(lines))} needs a numeric "
+                    "'amount' and an ISO 'date'"
+                )
+            vals = {
+                'journal_id': journal.id,
+                'date': date,
+                'amount': amount,
+                'payment_ref': payload.get('reference') or False,
+                'partner_id': payload.get('partner_id') or False,
+                'partner_name': payload.get('partner_name') or False,
+                'account_number': payload.get('account_number') or False,
+            }
+            currency_id = currency_ids.get(payload.get('currency'), journal_currency_id)
+            if currency_id != journal_currency_id:
+                vals.update({
+                    'foreign_currency_id': currency_id,
+                    'amount_currency': amount,
+                    'amount': self._convert_currency(amount, currency_id, journal_currency_id, date, ctx),
+                })
+            lines |= StatementLine.new(vals)
+        return lines
+
+    def _format_payload_candidate(self, candidate, scorer):
+        """JSON-serializable view of a candidate for the payload API."""
+        move_line = self.env['account.move.line'].browse(candidate['move_line_id'])
+        return {
+            'move_line_id': move_line.id,
+            'move_id': move_line.move_id.id,
+            'move_name': move_line.move_id.name,
+            'partner_id': move_line.partner_id.id or False,
+            'date': fields.Date.to_string(move_line.date),
+            'balance': move_line.balance,
+            'amount_currency': move_line.amount_currency,
+            'currency': move_line.currency_id.name,
+            'score': candidate['score'],
+            'confidence_class': scorer.classify_match(candidate['score']),
+            'match_type': candidate.get('match_type'),
+            'reason': candidate.get('reason'),
+            'factor_scores': candidate.get('factor_scores'),
+        }
+
+    @api.model
+    def simulate_matching(self, statement_lines, search_mode='full', weights=None,
+                          date_range_days=None, reconcile_model_ids=None):
+        """
+        Dry-run the matching pipeline in memory and report aggregate statistics.
+
+        Nothing is written: inferred partners are set on in-memory copies of the
+        lines, and no proposal is created. Lines already reconciled serve as
+        ground truth; the journal items they were reconciled with are put back
+        in the candidate pool (in memory) so the search can find them again.
+
+        Args:
+            statement_lines: account.bank.statement.line recordset (one company)
+            search_mode: 'full', 'progressive' or 'blocking'
+            weights: optional {factor: weight} replacing the scorer's WEIGHTS
+            date_range_days: optional search window replacing date_range_days
+            reconcile_model_ids: optional reconcile model ids replacing the
+                company's invoice-matching models
+
+        Returns:
+            dict: 'lines', 'classes' ({class: count}), 'ground_truth_lines',
+                  'precision' ({class: ratio or None}), 'recall' (ratio or None)
+                  and 'timings' ({stage: seconds})
+        """
+        scorer = self.env['mass.reconcile.scorer']
+        timings = defaultdict(float)
+        classes = dict.fromkeys(('safe', 'probable', 'doubtful', 'unmatched'), 0)
+        result = {
+            'lines': len(statement_lines), 'classes': classes, 'ground_truth_lines': 0,
+            'precision': {}, 'recall': None, 'timings': {},
+        }
+        if not statement_lines:
+            return result
+
+        engine = self.sudo()
+        if weights:
+            engine = engine.with_context(mass_reconcile_weights=weights)
+        if date_range_days:
+            # Read by the engine's search and by the scorer's date factor
+            engine = engine.with_context(mass_reconcile_date_range_days=date_range_days)
+        ctx = engine._get_matching_context(statement_lines.company_id[:1])
+        if reconcile_model_ids is not None:
+            ctx.reconcile_model_ids = tuple(reconcile_model_ids)
+
+        started = time.perf_counter()
+        ground_truth = self._get_simulation_ground_truth(statement_lines)
+        reopened_ids = set().union(*ground_truth.values()) if ground_truth else set()
+        reopened_items = self.env['mass.reconcile.open.item'].sudo()._new_from_move_lines(
+            self.env['account.move.line'].sudo().browse(reopened_ids)
+        )
+        engine = engine.with_context(mass_reconcile_reopened_items=reopened_items)
+        timings['ground_truth'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        resolved = self.env['mass.reconcile.partner.key'].sudo().resolve_statement_lines(statement_lines)
+        StatementLine = engine.env['account.bank.statement.line']
+        lines = StatementLine.concat(*(
+            StatementLine.new({'inferred_partner_id': resolved.get(line.id, False)}, origin=line)
+            for line in statement_lines
+        ))
+        timings['partner_inference'] += time.perf_counter() - started
+
+        blocking_index = None
+        if search_mode == 'blocking':
+            started = time.perf_counter()
+            blocking_index = engine._build_blocking_index(lines, matching_context=ctx)
+            timings['blocking_index'] += time.perf_counter() - started
+
+        correct = defaultdict(int)
+        proposed = defaultdict(int)
+        found = 0
+        for line in lines:
+            started = time.perf_counter()
+            candidates = engine.find_candidates(
+                line, search_mode=search_mode, blocking_index=blocking_index,
+                matching_context=ctx,
+            )
+            timings['candidate_search'] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            candidates += engine.apply_reconcile_models(line, matching_context=ctx)
+            timings['reconcile_models'] += time.perf_counter() - started
+
+            best = max(candidates, key=lambda c: c['score']) if candidates else None
+            confidence_class = scorer.classify_match(best['score']) if best else 'unmatched'
+            classes[confidence_class] += 1
+
+            truth = ground_truth.get(line._origin.id)
+            if truth:
+                found += any(c['move_line_id'] in truth for c in candidates)
+                if best:
+                    proposed[confidence_class] += 1
+                    correct[confidence_class] += best['move_line_id'] in truth
+
+        result['ground_truth_lines'] = len(ground_truth)
+        result['recall'] = found / len(ground_truth) if ground_truth else None
+        for confidence_class in ('safe', 'probable', 'doubtful'):
+            result['precision'][confidence_class] = (
+                correct[confidence_class] / proposed[confidence_class]
+                if proposed[confidence_class] else None
+            )
+        total_proposed = sum(proposed.values())
+        result['precision']['overall'] = (
+            sum(correct.values()) / total_proposed if total_proposed else None
+        )
+        result['timings'] = dict(timings)
+        return result
+
+    @api.model
+    def simulate_historical_matching(self, company, date_from, date_to, journal=None, **options):
+        """
+        Dry-run the matching pipeline over the statement lines of a date range.
+
+        Args:
+            company: res.company record
+            date_from: first statement line date
+            date_to: last statement line date
+            journal: optional bank journal restricting the lines
+            options: keyword arguments of simulate_matching
+
+        Returns:
+            dict: statistics as returned by simulate_matching
+        """
+        domain = [
+            ('company_id', '=', company.id),
+            ('date', '>=', date_from),
+            ('date', '<=', date_to),
+        ]
+        if journal:
+            domain.append(('journal_id', '=', journal.id))
+        statement_lines = self.env['account.bank.statement.line'].search(domain, order='date, id')
+        return self.simulate_matching(statement_lines, **options)
+
+    @api.model
+    def _get_simulation_ground_truth(self, statement_lines):
+        """
+        Journal items each reconciled statement line was actually matched with.
+
+        Returns:
+            dict: {statement_line_id: set(account.move.line ids)} for the
+                  reconciled lines only
+        """
+        truth = {}
+        for line in statement_lines.filtered('is_reconciled'):
+            own_lines = line.move_id.line_ids
+            counterparts = own_lines.matched_debit_ids.debit_move_id | own_lines.matched_credit_ids.credit_move_id
+            matched = counterparts - own_lines
+            if matched:
+                truth[line.id] = set(matched.ids)
+        return truth
@@ -0,0 +1,167 @@
+"""Audit export - streams match proposals and decisions to CSV or Parquet."""
+
+import csv
+import io
+import uuid
+
+from odoo import models, api
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class MassReconcileExport(models.AbstractModel):
+    """Exporter reading proposals through a server-side cursor, in constant memory."""
+
+    _name = 'mass.reconcile.export'
+    _description = 'Mass Reconciliation Audit Export'
+
+    # Rows fetched from the server-side cursor (and written) at a time
+    FETCH_SIZE = 5000
+
+    # (column name, SQL expression, Parquet type)
+    EXPORT_COLUMNS = [
+        ('match_id', 'm.id', 'int64'),
+        ('batch', 'b.name', 'string'),
+        ('company_id', 'b.company_id', 'int64'),
+        ('statement_line_id', 'm.statement_line_id', 'int64'),
+        ('statement_date', 'sl.date', 'date32'),
+        ('statement_amount', 'sl.amount', 'float64'),
+        ('statement_reference', 'sl.payment_ref', 'string'),
+        ('move_line_id', 'm.suggested_move_line_id', 'int64'),
+        ('move', 'am.name', 'string'),
+        ('move_line_date', 'aml.date', 'date32'),
+        ('move_line_balance', 'aml.balance', 'float64'),
+        ('match_score', 'm.match_score', 'float64'),
+        ('confidence_class', 'm.confidence_class', 'string'),
+        ('match_type', 'm.match_type', 'string'),
+        ('amount_score', 'm.amount_score', 'float64'),
+        ('partner_score', 'm.partner_score', 'float64'),
+        ('reference_score', 'm.reference_score', 'float64'),
+        ('date_score', 'm.date_score', 'float64'),
+        ('score_bonus', 'm.score_bonus', 'float64'),
+        ('is_selected', 'm.is_selected', 'bool'),
+        ('match_reason', 'm.match_reason', 'string'),
+        ('created_by', 'cu.login', 'string'),
+        ('create_date', 'm.create_date', 'timestamp'),
+        ('updated_by', 'wu.login', 'string'),
+        ('write_date', 'm.write_date', 'timestamp'),
+    ]
+
+    @api.model
+    def _get_export_domain(self, batch_ids=None, company_ids=None, date_from=None, date_to=None):
+        """Proposal domain of the export filters (dates are statement line dates)."""
+        domain = []
+        if batch_ids:
+            domain.append(('batch_id', 'in', list(batch_ids)))
+        if company_ids:
+            domain.append(('batch_id.company_id', 'in', list(company_ids)))
+        if date_from:
+            domain.append(('statement_line_id.date', '>=', date_from))
+        if date_to:
+            domain.append(('statement_line_id.date', '<=', date_to))
+        return domain
+
+    @api.model
+    def _iter_export_rows(self, domain):
+        """
+        Yield chunks of export rows from a server-side (named) cursor.
+
+        Access rules apply through the proposals' _search query.
+
+        Args:
+            domain: mass.reconcile.match domain
+
+        Yields:
+            list: up to FETCH_SIZE row tuples, in EXPORT_COLUMNS order
+        """
+        Match = self.env['mass.reconcile.match']
+        Match.check_access('read')
+        self.env.flush_all()
+        query = SQL(
+            """
+            SELECT %s
+              FROM mass_reconcile_match m
+              JOIN mass_reconcile_batch b ON b.id = m.batch_id
+              JOIN account_bank_statement_line sl ON sl.id = m.statement_line_id
+              JOIN account_move am ON am.id = m.suggested_move_id
+         LEFT JOIN account_move_line aml ON aml.id = m.suggested_move_line_id
+         LEFT JOIN res_users cu ON cu.id = m.create_uid
+         LEFT JOIN res_users wu ON wu.id = m.write_uid
+             WHERE m.id IN %s
+          ORDER BY m.id
+            """,
+            SQL(', '.join(expression for _name, expression, _type in self.EXPORT_COLUMNS)),
+            Match._search(domain).subselect(),
+        )
+        with self.env.cr._cnx.cursor(name=f'mass_reconcile_export_{uuid.uuid4().hex}') as cursor:
+            cursor.itersize = self.FETCH_SIZE
+            cursor.execute(query.code, query.params)
+            while rows := cursor.fetchmany(self.FETCH_SIZE):
+                yield rows
+
+    @api.model
+    def export_proposals(self, fileobj, file_format='csv', **filters):
+        """
+        Write the proposals matching the filters to a binary file object.
+
+        Args:
+            fileobj: writable binary file object
+            file_format: 'csv' or 'parquet' (requires pyarrow)
+            filters: batch_ids, company_ids, date_from, date_to
+
+        Returns:
+            int: number of proposals exported
+        """
+        domain = self._get_export_domain(**filters)
+        if file_format == 'csv':
+            return self._write_csv(fileobj, domain)
+        if file_format == 'parquet':
+            if pyarrow is None:
+                raise UserError("The Parquet export requires the pyarrow Python package")
+            return self._write_parquet(fileobj, domain)
+        raise UserError(f"Unsupported export format: {file_format}")
+
+    @api.model
+    def _write_csv(self, fileobj, domain):
+        """Stream the export rows as UTF-8 CSV."""
+        stream = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+        writer = csv.writer(stream)
+        writer.writerow([name for name, _expression, _type in self.EXPORT_COLUMNS])
+        count = 0
+        for rows in self._iter_export_rows(domain):
+            writer.writerows(rows)
+            count += len(rows)
+        stream.flush()
+        stream.detach()
+        return count
+
+    @api.model
+    def _write_parquet(self, fileobj, domain):
+        """Stream the export rows as Parquet, one row group per fetched chunk."""
+        types = {
+            'int64': pyarrow.int64(),
+            'float64': pyarrow.float64(),
+            'string': pyarrow.string(),
+            'bool': pyarrow.bool_(),
+            'date32': pyarrow.date32(),
+            'timestamp': pyarrow.timestamp('us'),
+        }
+        schema = pyarrow.schema([
+            (name, types[type_name]) for name, _expression, type_name in self.EXPORT_COLUMNS
+        ])
+        count = 0
+        with pyarrow.parquet.ParquetWriter(fileobj, schema) as writer:
+            for rows in self._iter_export_rows(domain):
+                columns = list(zip(*rows))
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                count += len(rows)
+        return count
@@ -0,0 +1,379 @@
+"""Streaming statement importer - parses CAMT.053 / CSV files straight into batches."""
+
+import csv
+import io
+import uuid
+from xml.etree.ElementTree import ParseError, iterparse
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+
+from .account_bank_statement_line import statement_line_hash
+
+
+def _local_name(tag):
+    """XML tag without its namespace."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _find_text(element, path):
+    """Text of the first descendant following a namespace-agnostic path of local names."""
+    nodes = [element]
+    for name in path.split('/'):
+        nodes = [child for node in nodes for child in node if _local_name(child.tag) == name]
+        if not nodes:
+            return None
+    return (nodes[0].text or '').strip() or None
+
+
+class MassReconcileImport(models.AbstractModel):
+    """Imports statement files into a batch chunk by chunk, optionally matching as it goes."""
+
+    _name = 'mass.reconcile.import'
+    _description = 'Mass Reconciliation Statement Import'
+
+    # Statement lines created (and optionally matched) per chunk
+    IMPORT_CHUNK_SIZE = 1000
+
+    # Rejected entries listed in a partial import note
+    REJECTED_REPORT_LIMIT = 100
+
+    @api.model
+    def _iter_camt053(self, fileobj):
+        """
+        Parse CAMT.053 entries incrementally.
+
+        Each <Ntry> element is read, turned into values, cleared and removed
+        from its parent, so memory does not grow with the file.
+
+        Args:
+            fileobj: binary file object
+
+        Yields:
+            dict: date, amount, payment_ref, partner_name, account_number,
+                  transaction_ref, currency
+        """
+        # Open elements, from the root down: the parent of an ended element is last
+        ancestors = []
+        for event, element in iterparse(fileobj, events=('start', 'end')):
+            if event == 'start':
+                ancestors.append(element)
+                continue
+            ancestors.pop()
+            if _local_name(element.tag) != 'Ntry':
+                continue
+            amount = float(_find_text(element, 'Amt') or 0.0)
+            debit = _find_text(element, 'CdtDbtInd') == 'DBIT'
+            # The counterparty is the debtor of incoming and the creditor of outgoing payments
+            party = 'Cdtr' if debit else 'Dbtr'
+            reference = (
+                _find_text(element, 'NtryDtls/TxDtls/RmtInf/Ustrd')
+                or _find_text(element, 'NtryDtls/TxDtls/RmtInf/Strd/CdtrRefInf/Ref')
+                or _find_text(element, 'AddtlNtryInf')
+                or _find_text(element, 'AcctSvcrRef')
+            )
+            yield {
+                'date': _find_text(element, 'BookgDt/Dt') or (_find_text(element, 'BookgDt/DtTm') or '')[:10],
+                'amount': -amount if debit else amount,
+                'payment_ref': reference,
+                'partner_name': _find_text(element, f'NtryDtls/TxDtls/RltdPties/{party}/Nm'),
+                'account_number': (
+                    _find_text(element, f'NtryDtls/TxDtls/RltdPties/{party}Acct/Id/IBAN')
+                    or _find_text(element, f'NtryDtls/TxDtls/RltdPties/{party}Acct/Id/Othr/Id')
+                ),
+                'transaction_ref': (
+                    _find_text(element, 'AcctSvcrRef')
+                    or _find_text(element, 'NtryDtls/TxDtls/Refs/AcctSvcrRef')
+                ),
+                'currency': next(
+                    (child.get('Ccy') for child in element if _local_name(child.tag) == 'Amt'), None,
+                ),
+            }
+            # A cleared entry is still a child of the statement element
+            element.clear()
+            if ancestors:
+                ancestors[-1].remove(element)
+
+    @api.model
+    def _iter_csv(self, fileobj, delimiter=','):
+        """
+        Parse CSV statement rows incrementally.
+
+        Expected columns: date, amount, and optionally reference, partner_name,
+        account_number, transaction_id and currency.
+
+        Args:
+            fileobj: binary file object
+            delimiter: CSV field delimiter
+
+        Yields:
+            dict: date, amount, payment_ref, partner_name, account_number,
+                  transaction_ref, currency
+        """
+        stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.DictReader(stream, delimiter=delimiter):
+                yield {
+                    'date': row.get('date'),
+                    'amount': float(row.get('amount') or 0.0),
+                    'payment_ref': row.get('reference') or None,
+                    'partner_name': row.get('partner_name') or None,
+                    'account_number': row.get('account_number') or None,
+                    'transaction_ref': row.get('transaction_id') or None,
+                    'currency': row.get('currency') or None,
+                }
+        finally:
+            stream.detach()
+
+    @api.model
+    def _get_entry_rejection(self, entry):
+        """
+        Why a parsed entry cannot become a statement line, if it cannot.
+
+        Returns:
+            str: reason, or None for a valid entry
+        """
+        if not entry['date']:
+            return "no booking date"
+        try:
+            fields.Date.to_date(entry['date'])
+        except ValueError:
+            return "invalid booking date"
+        return None
+
+    @api.model
+    def _prepare_statement_line_vals(self, batch, entry):
+        """Statement line values of a parsed entry."""
+        currency = batch.journal_id.currency_id or batch.company_id.currency_id
+        if entry['currency'] and entry['currency'] != currency.name:
+            raise ValidationError(
+                f"Entry of {entry['date']} is in {entry['currency']}, "
+                f"the journal {batch.journal_id.name} is in {currency.name}"
+            )
+        return {
+            'journal_id': batch.journal_id.id,
+            'batch_id': batch.id,
+            'date': fields.Date.to_date(entry['date']),
+            'amount': entry['amount'],
+            'payment_ref': entry['payment_ref'] or '/',
+            'partner_name': entry['partner_name'] or False,
+            'account_number': entry['account_number'] or False,
+            'transaction_ref': entry.get('transaction_ref') or False,
+        }
+
+    @api.model
+    def import_statement_file(self, batch, fileobj, file_format='camt053', match=False, delimiter=','):
+        """
+        Import a statement file into a batch, chunk by chunk.
+
+        Lines are created IMPORT_CHUNK_SIZE at a time with batch_id already set.
+        With match=True, each chunk is matched and checkpointed right after it
+        is created, while the rest of the file is still being parsed. In cron
+        and queue workers, chunks are committed as they are imported: when an
+        entry further in the file is invalid, the lines before it are kept and
+        a partial import note is posted on the batch before the error is
+        raised. Within a request, the import is a single transaction that the
+        error rolls back (see _commit_matching_checkpoint). Entries without a
+        valid booking date are rejected and listed in a partial import note,
+        and the rest of the file is imported.
+
+        Args:
+            batch: mass.reconcile.batch record (with a bank journal)
+            fileobj: binary file object
+            file_format: 'camt053' or 'csv'
+            match: match each chunk as soon as it is imported
+            delimiter: CSV field delimiter
+
+        Returns:
+            int: number of statement lines imported
+        """
+        batch.ensure_one()
+        if not batch.journal_id:
+            raise ValidationError("The batch needs a bank journal to import statement lines")
+        if batch.state not in ('draft', 'review'):
+            raise ValidationError("Statement lines can only be imported in draft or review batches")
+        if file_format == 'camt053':
+            entries = self._iter_camt053(fileobj)
+        elif file_format == 'csv':
+            entries = self._iter_csv(fileobj, delimiter=delimiter)
+        else:
+            raise UserError(f"Unsupported statement format: {file_format}")
+
+        if not match:
+            return self._import_entries(batch, entries, file_format, match)
+        # Hold the matching lock so the resume cron leaves the streamed run alone
+        with batch._matching_lock() as locked:
+            if not locked:
+                raise ValidationError(batch._matching_locked_message())
+            batch._start_streaming_matching()
+            return self._import_entries(batch, entries, file_format, match)
+
+    @api.model
+    def _import_entries(self, batch, entries, file_format, match):
+        """
+        Import parsed entries into a batch, chunk by chunk (see import_statement_file).
+
+        Args:
+            batch: mass.reconcile.batch record
+            entries: iterator of parsed entry dicts
+            file_format: 'camt053' or 'csv'
+            match: match each chunk as soon as it is imported
+
+        Returns:
+            int: number of statement lines imported
+        """
+        count = skipped = 0
+        seen_hashes = {}
+        # Tells the lines of this file apart from those of earlier imports
+        # when flagging duplicates
+        import_key = str(uuid.uuid4())
+        vals_list = []
+        rejected = []
+        try:
+            for number, entry in enumerate(entries, start=1):
+                reason = self._get_entry_rejection(entry)
+                if reason:
+                    rejected.append((number, reason))
+                    continue
+                vals = self._prepare_statement_line_vals(batch, entry)
+                vals['import_key'] = import_key
+                vals_list.append(vals)
+                if len(vals_list) == self.IMPORT_CHUNK_SIZE:
+                    vals_list, chunk_skipped = self._drop_duplicates(batch, vals_list, seen_hashes)
+                    count += self._import_chunk(batch, vals_list, match)
+                    skipped += chunk_skipped
+                    vals_list = []
+        except (UserError, ValueError, ParseError) as error:
+            # Workers committed the chunks imported so far: record where the file stopped
+            if count or rejected:
+                self._post_partial_import_report(batch, file_format, count, error, match, rejected)
+            raise
+        if vals_list:
+            vals_list, chunk_skipped = self._drop_duplicates(batch, vals_list, seen_hashes)
+            count += self._import_chunk(batch, vals_list, match)
+            skipped += chunk_skipped
+
+        if match:
+            # Matches lines that were already pending in the batch, closes the run
+            # and posts its summary
+            batch._run_matching()
+        body = f"<p>Imported {count} statement lines from a {file_format.upper()} file.</p>"
+        if skipped:
+            body += f"<p>Skipped {skipped} lines already imported (same content).</p>"
+        elif batch.duplicate_line_count:
+            body += f"<p>{batch.duplicate_line_count} duplicate lines flagged and left out of matching.</p>"
+        batch.message_post(body=body, subject='Statement Import')
+        if rejected:
+            self._post_partial_import_report(batch, file_format, count, None, match, rejected)
+        return count
+
+    @api.model
+    def _post_partial_import_report(self, batch, file_format, count, error, match, rejected=()):
+        """
+        Post and commit the chatter note of an import that left entries out.
+
+        Either an invalid entry stopped the import, or entries were rejected
+        (see _get_entry_rejection) while the rest of the file was imported.
+        The entries read before an error are checked and committed chunk by
+        chunk, so they stay in the batch; the note tells how many, why the
+        rest of the file was not imported, and which entries were rejected.
+
+        Args:
+            batch: mass.reconcile.batch record
+            file_format: 'camt053' or 'csv'
+            count: number of statement lines already imported
+            error: exception that stopped the import, or None
+            match: whether the imported chunks were matched
+            rejected: list of (entry number in the file, reason)
+        """
+        if error:
+            body = (
+                f"<p>Import of a {file_format.upper()} file stopped after {count} statement lines: "
+                f"{error}</p><p>The lines imported before the error are kept"
+            )
+            if match:
+                body += "; their matching is resumed automatically"
+            body += (
+                ". Fix the file and import it again with the duplicate policy set to skip "
+                "to add the remaining lines only.</p>"
+            )
+        else:
+            body = (
+                f"<p>Imported {count} statement lines from a {file_format.upper()} file; "
+                f"{len(rejected)} entries were rejected.</p>"
+            )
+        if rejected:
+            body += "<p>Rejected entries:</p><ul>" + "".join(
+                f"<li>Entry {number}: {reason}</li>"
+                for number, reason in rejected[:self.REJECTED_REPORT_LIMIT]
+            ) + "</ul>"
+            if len(rejected) > self.REJECTED_REPORT_LIMIT:
+                body += f"<p>... and {len(rejected) - self.REJECTED_REPORT_LIMIT} more.</p>"
+        batch.message_post(body=body, subject='Partial Statement Import')
+        batch._commit_matching_checkpoint()
+
+    @api.model
+    def _drop_duplicates(self, batch, vals_list, seen_hashes):
+        """
+        Drop the lines of a chunk already imported, when the batch skips duplicates.
+
+        Identical lines within one file are separate transactions (two equal
+        card payments on the same day), so repeats are counted rather than
+        dropped: the n-th line of the file with a hash is skipped only when the
+        database held at least n lines with that hash before the file. One
+        query for the whole chunk.
+
+        Args:
+            batch: mass.reconcile.batch record
+            vals_list: statement line values of the chunk
+            seen_hashes: dict {content hash: [lines in the database before the
+                file, lines of the file so far]} (updated)
+
+        Returns:
+            tuple: (values to create, number of skipped lines)
+        """
+        if batch.duplicate_policy != 'skip':
+            return vals_list, 0
+        hashes = [
+            statement_line_hash(
+                vals['journal_id'], vals['date'], vals['amount'], vals['payment_ref'],
+                vals['partner_name'], vals['account_number'],
+                transaction_ref=vals.get('transaction_ref'),
+            )
+            for vals in vals_list
+        ]
+        # Lines created from earlier chunks of the file are not counted as
+        # existing: their hash was first seen in the file before they existed
+        new_hashes = list(set(hashes) - set(seen_hashes))
+        if new_hashes:
+            self.env['account.bank.statement.line'].flush_model(['content_hash'])
+            self.env.cr.execute("""
+                SELECT content_hash, COUNT(*) FROM account_bank_statement_line
+                 WHERE content_hash = ANY(%s)
+              GROUP BY content_hash
+            """, (new_hashes,))
+            existing = dict(self.env.cr.fetchall())
+            for content_hash in new_hashes:
+                seen_hashes[content_hash] = [existing.get(content_hash, 0), 0]
+        kept = []
+        for vals, content_hash in zip(vals_list, hashes):
+            counts = seen_hashes[content_hash]
+            counts[1] += 1
+            if counts[1] > counts[0]:
+                kept.append(vals)
+        return kept, len(vals_list) - len(kept)
+
+    @api.model
+    def _import_chunk(self, batch, vals_list, match):
+        """Create one chunk of statement lines, and match it when requested."""
+        if not vals_list:
+            return 0
+        lines = self.env['account.bank.statement.line'].create(vals_list)
+        if match:
+            batch._match_streamed_lines(lines)
+        else:
+            batch._flag_duplicate_lines(lines)
+            batch._commit_matching_checkpoint()
+        count = len(lines)
+        self.env.invalidate_all()
+        return count
@@ -1,5 +1,10 @@
+from collections import Counter
+
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
+
+from .mass_reconcile_claim import ClaimError
 
 
 class MassReconcileMatch(models.Model):
@@ -8,6 +13,13 @@ class MassReconcileMatch(models.Model):
     _description = 'Mass Reconciliation Match Proposal'
     _order = 'match_score desc, create_date desc'
 
+    # Error message per reason a selected journal item could not be claimed
+    CLAIM_ERROR_MESSAGES = {
+        'closed': "Some selected journal items are no longer open (reconciled or reset to draft)",
+        'claimed': "Some selected journal items are claimed by another reconciliation batch",
+        'locked': "Some selected journal items are being claimed by another user right now; try again",
+    }
+
     # Core relational fields
     batch_id = fields.Many2one(
         'mass.reconcile.batch',
@@ -74,6 +86,34 @@ class MassReconcileMatch(models.Model):
         store=True,
         help='Classification based on match score: safe (100), probable (80-99), doubtful (<80)'
     )
+
+    # Per-factor sub-scores (0-100 each) so WEIGHTS can be re-applied in SQL.
+    # Left empty for proposals without a factor breakdown (reconcile models).
+    amount_score = fields.Float(
+        string='Amount Score',
+        digits=(5, 2),
+        help='Amount factor score (0-100) before weighting'
+    )
+    partner_score = fields.Float(
+        string='Partner Score',
+        digits=(5, 2),
+        help='Partner factor score (0-100) before weighting'
+    )
+    reference_score = fields.Float(
+        string='Reference Score',
+        digits=(5, 2),
+        help='Reference factor score (0-100) before weighting'
+    )
+    date_score = fields.Float(
+        string='Date Score',
+        digits=(5, 2),
+        help='Date proximity factor score (0-100) before weighting'
+    )
+    score_bonus = fields.Float(
+        string='Score Bonus',
+        digits=(5, 2),
+        help='Fixed adjustment added on top of the weighted factors (e.g. internal transfers)'
+    )
     is_selected = fields.Boolean(
         string='Selected',
         default=False,
@@ -100,6 +140,24 @@ class MassReconcileMatch(models.Model):
          'Cannot suggest the same move multiple times for one statement line')
     ]
 
+    def init(self):
+        super().init()
+        # Keyset pagination of the review grid (see mass.reconcile.batch.get_review_page):
+        # proposals of a batch by score, with or without a confidence class,
+        # read backwards for the descending order
+        create_index(
+            self.env.cr,
+            'mass_reconcile_match_review_idx',
+            self._table,
+            ['batch_id', 'match_score', 'id'],
+        )
+        create_index(
+            self.env.cr,
+            'mass_reconcile_match_review_class_idx',
+            self._table,
+            ['batch_id', 'confidence_class', 'match_score', 'id'],
+        )
+
     @api.constrains('match_score')
     def _check_match_score(self):
         """Validate match score is within valid range."""
@@ -121,3 +179,118 @@ class MassReconcileMatch(models.Model):
                         f"to batch {record.batch_id.name}. "
                         f"Line's batch: {record.statement_line_id.batch_id.name or 'None'}"
                     )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Count new proposals in their batch statistics."""
+        matches = super().create(vals_list)
+        Batch = self.env['mass.reconcile.batch']
+        Batch._apply_statistics_delta(Counter(), Batch._count_match_statistics(matches))
+        return matches
+
+    def unlink(self):
+        """Remove deleted proposals from their batch statistics."""
+        Batch = self.env['mass.reconcile.batch']
+        before = Batch._count_match_statistics(self)
+        result = super().unlink()
+        Batch._apply_statistics_delta(before, Counter())
+        return result
+
+    def _raise_claim_error(self, lost_ids_by_reason):
+        """
+        Raise a ClaimError naming the journal items that could not be claimed, by reason.
+
+        Args:
+            lost_ids_by_reason: dict from mass.reconcile.claim._explain_unclaimed
+        """
+        MoveLine = self.env['account.move.line']
+        reasons = [reason for reason in self.CLAIM_ERROR_MESSAGES if lost_ids_by_reason.get(reason)]
+        message = "\n".join(
+            f"{self.CLAIM_ERROR_MESSAGES[reason]}: "
+            + ", ".join(MoveLine.browse(sorted(lost_ids_by_reason[reason])).mapped('display_name'))
+            for reason in reasons
+        )
+        raise ClaimError(message, reasons[0])
+
+    def write(self, vals):
+        """
+        Claim the journal item of selected proposals, release it when deselected,
+        and keep the batch statistics in line with the proposals.
+        """
+        tracked = {'batch_id', 'match_score', 'is_selected'} & set(vals)
+        if tracked:
+            before = self.env['mass.reconcile.batch']._count_match_statistics(self)
+        if 'is_selected' in vals:
+            Claim = self.env['mass.reconcile.claim'].sudo()
+            for batch, matches in self.grouped('batch_id').items():
+                move_line_ids = set(matches.suggested_move_line_id.ids)
+                if vals['is_selected']:
+                    lost_ids = move_line_ids - Claim._claim(move_line_ids, batch.id)
+                    if lost_ids:
+                        self._raise_claim_error(Claim._explain_unclaimed(lost_ids, batch.id))
+                else:
+                    Claim._release(batch.ids, move_line_ids)
+        result = super().write(vals)
+        if tracked:
+            Batch = self.env['mass.reconcile.batch']
+            Batch._apply_statistics_delta(before, Batch._count_match_statistics(self))
+        return result
+
+    @api.model
+    def _reweight_scores(self, batch_ids=None):
+        """
+        Recompute match_score and confidence_class from the stored factor scores.
+
+        Applies the scorer's current WEIGHTS and thresholds in a single UPDATE,
+        without searching candidates again. Proposals without a factor
+        breakdown are left untouched.
+
+        Args:
+            batch_ids: optional list of batch ids; all batches when None
+
+        Returns:
+            int: number of proposals re-weighted
+        """
+        scorer = self.env['mass.reconcile.scorer']
+        weights = scorer.WEIGHTS
+        self.flush_model()
+
+        query = """
+            WITH scored AS (
+                SELECT id, LEAST(100.0, GREATEST(0.0, ROUND((
+                    COALESCE(amount_score, 0) * %(w_amount)s
+                    + COALESCE(partner_score, 0) * %(w_partner)s
+                    + COALESCE(reference_score, 0) * %(w_reference)s
+                    + COALESCE(date_score, 0) * %(w_date)s
+                    + COALESCE(score_bonus, 0)
+                )::numeric, 2))) AS score
+                FROM mass_reconcile_match
+                WHERE amount_score IS NOT NULL
+                  AND (%(all_batches)s OR batch_id = ANY(%(batch_ids)s))
+            )
+            UPDATE mass_reconcile_match m
+               SET match_score = scored.score,
+                   confidence_class = CASE
+                       WHEN scored.score >= %(safe)s THEN 'safe'
+                       WHEN scored.score >= %(probable)s THEN 'probable'
+                       ELSE 'doubtful'
+                   END
+              FROM scored
+             WHERE m.id = scored.id
+        """
+        self.env.cr.execute(query, {
+            'w_amount': weights['amount'],
+            'w_partner': weights['partner'],
+            'w_reference': weights['reference'],
+            'w_date': weights['date'],
+            'safe': scorer.SAFE_THRESHOLD,
+            'probable': scorer.PROBABLE_THRESHOLD,
+            'all_batches': batch_ids is None,
+            'batch_ids': list(batch_ids or []),
+        })
+        count = self.env.cr.rowcount
+        self.invalidate_model(['match_score', 'confidence_class'])
+        batches = self.env['mass.reconcile.batch'].sudo()
+        batches = batches.search([]) if batch_ids is None else batches.browse(batch_ids)
+        batches._refresh_statistics()
+        return count
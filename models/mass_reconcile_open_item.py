@@ -0,0 +1,237 @@
+"""Open items snapshot - compact copy of the move lines the engine can match."""
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class MassReconcileOpenItem(models.Model):
+    """
+    One row per open, posted, reconcilable account.move.line.
+
+    Kept up to date incrementally when lines are posted, reset to draft,
+    reconciled or unreconciled, so candidate searches scan this small table
+    instead of the whole (mostly reconciled) account_move_line.
+    """
+
+    _name = 'mass.reconcile.open.item'
+    _description = 'Mass Reconciliation Open Item'
+    _order = 'date, id'
+    _log_access = False
+
+    # Snapshot columns, in the order of _prepare_row
+    SNAPSHOT_COLUMNS = (
+        'move_line_id', 'company_id', 'journal_id', 'partner_id', 'date', 'balance',
+        'abs_amount', 'currency_id', 'amount_currency', 'abs_amount_currency', 'reference_key',
+    )
+
+    move_line_id = fields.Many2one(
+        'account.move.line',
+        string='Journal Item',
+        required=True,
+        ondelete='cascade',
+        help='Open journal item this row mirrors'
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        ondelete='cascade',
+        help='Company of the journal item'
+    )
+    journal_id = fields.Many2one(
+        'account.journal',
+        string='Journal',
+        ondelete='cascade',
+        help='Journal of the journal item'
+    )
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Partner',
+        ondelete='set null',
+        help='Commercial partner of the journal item'
+    )
+    date = fields.Date(
+        string='Date',
+        required=True,
+        help='Accounting date of the journal item'
+    )
+    balance = fields.Float(
+        string='Balance',
+        help='Signed balance (debit - credit) in company currency'
+    )
+    abs_amount = fields.Float(
+        string='Absolute Amount',
+        help='abs(balance), pre-computed for amount searches'
+    )
+    currency_id = fields.Many2one(
+        'res.currency',
+        string='Currency',
+        ondelete='set null',
+        help='Transaction currency of the journal item'
+    )
+    amount_currency = fields.Float(
+        string='Amount in Currency',
+        help='Signed amount in the transaction currency'
+    )
+    abs_amount_currency = fields.Float(
+        string='Absolute Amount in Currency',
+        help='abs(amount_currency), pre-computed for amount searches'
+    )
+    reference_key = fields.Char(
+        string='Reference Key',
+        help='Normalized (stripped, lower-case) payment reference'
+    )
+
+    _sql_constraints = [
+        ('move_line_unique',
+         'UNIQUE(move_line_id)',
+         'A journal item can only appear once in the open items snapshot')
+    ]
+
+    def init(self):
+        # Transaction that inserted the row, for the commit-ordered snapshots of
+        # mass.reconcile.candidate.cache (no ORM field type maps to xid8)
+        self.env.cr.execute("""
+            ALTER TABLE mass_reconcile_open_item
+                ADD COLUMN IF NOT EXISTS sync_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+            CREATE INDEX IF NOT EXISTS mass_reconcile_open_item_sync_xid_idx
+                ON mass_reconcile_open_item (sync_xid);
+            CREATE INDEX IF NOT EXISTS mass_reconcile_open_item_amount_idx
+                ON mass_reconcile_open_item (company_id, abs_amount, date);
+            CREATE INDEX IF NOT EXISTS mass_reconcile_open_item_partner_idx
+                ON mass_reconcile_open_item (company_id, partner_id, date);
+            CREATE INDEX IF NOT EXISTS mass_reconcile_open_item_balance_idx
+                ON mass_reconcile_open_item (company_id, journal_id, balance, date);
+            CREATE INDEX IF NOT EXISTS mass_reconcile_open_item_currency_amount_idx
+                ON mass_reconcile_open_item (company_id, currency_id, abs_amount_currency, date);
+        """)
+
+    @api.model
+    def _prepare_row(self, move_line):
+        """Snapshot row values for an open move line, in column order (see _insert_open_items)."""
+        balance = move_line.debit - move_line.credit
+        reference = (move_line.payment_ref or move_line.ref or '').strip().lower()
+        return (
+            move_line.id,
+            move_line.company_id.id,
+            move_line.journal_id.id or None,
+            move_line.partner_id.commercial_partner_id.id or None,
+            move_line.date,
+            balance,
+            abs(balance),
+            move_line.currency_id.id or None,
+            move_line.amount_currency,
+            abs(move_line.amount_currency),
+            reference or None,
+        )
+
+    @api.model
+    def _new_from_move_lines(self, move_lines):
+        """
+        In-memory (new) snapshot rows for move lines, open or not.
+
+        Used by simulations to put reconciled lines back in the candidate pool
+        without touching the table.
+
+        Args:
+            move_lines: account.move.line recordset
+
+        Returns:
+            mass.reconcile.open.item: new records
+        """
+        return self.concat(*(
+            self.new(dict(zip(self.SNAPSHOT_COLUMNS, self._prepare_row(move_line))))
+            for move_line in move_lines
+        ))
+
+    @api.model
+    def _insert_open_items(self, condition):
+        """
+        Insert the snapshot rows of the open move lines matching a condition, in one statement.
+
+        Open means posted, not fully reconciled and on a reconcilable account.
+        The rows are computed as in _prepare_row.
+
+        Args:
+            condition: SQL condition on the move line, aliased "aml"
+
+        Returns:
+            int: number of rows inserted
+        """
+        self.env['account.move.line'].flush_model()
+        self.env['account.account'].flush_model(['reconcile'])
+        self.env['res.partner'].flush_model(['commercial_partner_id'])
+        self.env.cr.execute(SQL("""
+            INSERT INTO mass_reconcile_open_item
+                (move_line_id, company_id, journal_id, partner_id,
+                 date, balance, abs_amount, currency_id, amount_currency,
+                 abs_amount_currency, reference_key)
+            SELECT aml.id, aml.company_id, aml.journal_id, partner.commercial_partner_id,
+                   aml.date, aml.debit - aml.credit, abs(aml.debit - aml.credit),
+                   aml.currency_id, aml.amount_currency, abs(aml.amount_currency),
+                   NULLIF(lower(btrim(COALESCE(NULLIF(aml.payment_ref, ''), aml.ref, ''))), '')
+              FROM account_move_line aml
+              JOIN account_account account ON account.id = aml.account_id
+         LEFT JOIN res_partner partner ON partner.id = aml.partner_id
+             WHERE aml.full_reconcile_id IS NULL
+               AND aml.parent_state = 'posted'
+               AND account.reconcile
+               AND %s
+        """, condition))
+        return self.env.cr.rowcount
+
+    @api.model
+    def _sync_move_lines(self, move_line_ids):
+        """
+        Bring the snapshot rows of the given move lines up to date.
+
+        Lines that are no longer open are removed; open ones are (re)inserted.
+
+        Args:
+            move_line_ids: iterable of account.move.line ids
+        """
+        move_line_ids = list(set(move_line_ids))
+        if not move_line_ids:
+            return
+        self.flush_model()
+        self.env.cr.execute(
+            "DELETE FROM mass_reconcile_open_item WHERE move_line_id = ANY(%s)", (move_line_ids,),
+        )
+        self._insert_open_items(SQL("aml.id = ANY(%s)", move_line_ids))
+        self.invalidate_model()
+
+    @api.model
+    def _sync_accounts(self, account_ids):
+        """
+        Bring the snapshot rows of every move line of the given accounts up to date.
+
+        Used when accounts become (or stop being) reconcilable.
+
+        Args:
+            account_ids: list of account.account ids
+        """
+        if not account_ids:
+            return
+        self.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM mass_reconcile_open_item item
+             USING account_move_line aml
+             WHERE aml.id = item.move_line_id
+               AND aml.account_id = ANY(%s)
+        """, (list(account_ids),))
+        self._insert_open_items(SQL("aml.account_id = ANY(%s)", list(account_ids)))
+        self.invalidate_model()
+
+    @api.model
+    def rebuild(self):
+        """
+        Rebuild the whole snapshot from account_move_line, in one statement.
+
+        Returns:
+            int: number of open items in the snapshot
+        """
+        self.flush_model()
+        self.env.cr.execute("DELETE FROM mass_reconcile_open_item")
+        count = self._insert_open_items(SQL("TRUE"))
+        self.invalidate_model()
+        return count
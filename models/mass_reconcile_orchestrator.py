@@ -0,0 +1,224 @@
+"""Cross-company orchestrator - schedules one matching shard per company and bank journal."""
+
+import logging
+import threading
+import time
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class MassReconcileOrchestrator(models.AbstractModel):
+    """
+    Month-end matching of several companies at once.
+
+    Unbatched statement lines are gathered into one draft batch per company
+    and bank journal. Each batch is a shard, scheduled for the shard worker
+    crons: every worker takes the next waiting shard and matches it as the
+    user who scheduled it, restricted to the shard's company, so record
+    rules apply per company. Shards run outside of the scheduling request
+    and in parallel, up to one per worker cron (and cron thread).
+
+    A shard commits its work chunk by chunk. When it fails, the chunks
+    committed before the failure are kept, the batch stays in matching state
+    with the error recorded, and the resume cron picks it up again from its
+    last checkpoint.
+    """
+
+    _name = 'mass.reconcile.orchestrator'
+    _description = 'Mass Reconciliation Cross-Company Orchestrator'
+
+    # Shard worker crons (see data/ir_cron_data.xml)
+    SHARD_WORKER_CRONS = (
+        'ir_cron_matching_shard_worker_1',
+        'ir_cron_matching_shard_worker_2',
+        'ir_cron_matching_shard_worker_3',
+        'ir_cron_matching_shard_worker_4',
+    )
+
+    @api.model
+    def run_sharded_matching(self, company_ids=None, date_from=None, date_to=None):
+        """
+        Prepare one batch per company and bank journal and schedule their matching.
+
+        Args:
+            company_ids: companies to match (default: the allowed companies of
+                the environment); must be companies of the user
+            date_from: optional first statement line date
+            date_to: optional last statement line date
+
+        Returns:
+            dict: 'batch_ids' (the scheduled shards, see get_shard_reports)
+                  and 'timings' ({'prepare': seconds})
+        """
+        if company_ids is None:
+            companies = self.env.companies
+        else:
+            companies = self.env['res.company'].browse(company_ids)
+            foreign = companies - self.env.user.company_ids
+            if foreign:
+                raise UserError(
+                    "You are not allowed to match the companies: "
+                    + ", ".join(foreign.sudo().mapped('name'))
+                )
+
+        started = time.perf_counter()
+        batches = self.env['mass.reconcile.batch']
+        for company in companies:
+            batches |= self.with_company(company)._prepare_company_shards(company, date_from, date_to)
+        batches.write({
+            'shard_requested_by_id': self.env.uid,
+            'matching_duration': 0.0,
+            'matching_error': False,
+        })
+        if batches:
+            self._trigger_shard_workers()
+        return {
+            'batch_ids': batches.ids,
+            'timings': {'prepare': time.perf_counter() - started},
+        }
+
+    @api.model
+    def _prepare_company_shards(self, company, date_from=None, date_to=None):
+        """
+        Find or create the draft batch of each bank journal of a company.
+
+        Statement lines that are neither reconciled nor in a batch are added to
+        the journal's draft batch. Journals with continuous matching keep
+        their own batch and are left out.
+
+        Args:
+            company: res.company record
+            date_from: optional first statement line date
+            date_to: optional last statement line date
+
+        Returns:
+            mass.reconcile.batch: the draft batches with lines to match
+        """
+        Batch = self.env['mass.reconcile.batch']
+        journals = self.env['account.journal'].search([
+            ('type', '=', 'bank'),
+            ('company_id', '=', company.id),
+            ('mass_reconcile_continuous', '=', False),
+        ])
+        batches = Batch
+        for journal in journals:
+            line_domain = [
+                ('journal_id', '=', journal.id),
+                ('batch_id', '=', False),
+                ('is_reconciled', '=', False),
+            ]
+            if date_from:
+                line_domain.append(('date', '>=', date_from))
+            if date_to:
+                line_domain.append(('date', '<=', date_to))
+            lines = self.env['account.bank.statement.line'].search(line_domain)
+            batch = Batch.search([
+                ('company_id', '=', company.id),
+                ('journal_id', '=', journal.id),
+                ('state', '=', 'draft'),
+            ], limit=1)
+            if not batch and not lines:
+                continue
+            if not batch:
+                batch = Batch.create({
+                    'name': Batch._get_unique_name(
+                        f"{company.name} / {journal.name} - {fields.Date.context_today(self)}", company,
+                    ),
+                    'company_id': company.id,
+                    'journal_id': journal.id,
+                    'date_from': date_from,
+                    'date_to': date_to,
+                })
+            lines.write({'batch_id': batch.id})
+            if batch.line_count:
+                batches |= batch
+        return batches
+
+    @api.model
+    def _trigger_shard_workers(self):
+        """Wake the shard worker crons; they see the waiting shards once the caller commits."""
+        for xmlid in self.SHARD_WORKER_CRONS:
+            cron = self.env.ref(f'{self._module}.{xmlid}', raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+
+    @api.model
+    def _cron_run_scheduled_shards(self):
+        """Shard worker: match waiting shards one after the other until none is left."""
+        worker = self.with_context(mass_reconcile_checkpoint_commits=True)
+        while worker._run_next_shard():
+            pass
+
+    @api.model
+    def _run_next_shard(self):
+        """
+        Take the next waiting shard and match it.
+
+        The shard row is locked with SKIP LOCKED, so parallel workers never
+        take the same shard, and is released from the waiting list before the
+        (chunk by chunk committed) matching starts.
+
+        Returns:
+            bool: whether a shard was taken
+        """
+        self.env.cr.execute("""
+            SELECT id FROM mass_reconcile_batch
+             WHERE shard_requested_by_id IS NOT NULL
+          ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        if not row:
+            return False
+        batch = self.env['mass.reconcile.batch'].sudo().browse(row[0])
+        user = batch.shard_requested_by_id
+        batch.write({'shard_requested_by_id': False})
+        batch._commit_matching_checkpoint()
+
+        shard = batch.with_user(user).with_context(allowed_company_ids=[batch.company_id.id])
+        started = time.perf_counter()
+        try:
+            shard._start_matching()
+        except Exception as error:
+            if getattr(threading.current_thread(), 'testing', False):
+                raise
+            _logger.exception("Mass reconciliation shard of batch %s failed", batch.id)
+            # Chunks committed before the failure are kept; the resume cron
+            # continues from the last checkpoint
+            self.env.cr.rollback()
+            batch.write({'matching_error': str(error)})
+        batch.write({'matching_duration': time.perf_counter() - started})
+        batch._commit_matching_checkpoint()
+        return True
+
+    @api.model
+    def get_shard_reports(self, batch_ids):
+        """
+        Progress and timings of scheduled shards.
+
+        Args:
+            batch_ids: ids returned by run_sharded_matching
+
+        Returns:
+            list: one dict per batch: batch_id, company, journal, line_count,
+                  state, waiting, error, matching_seconds and lines_per_second
+        """
+        reports = []
+        for batch in self.env['mass.reconcile.batch'].browse(batch_ids).exists():
+            seconds = batch.matching_duration
+            reports.append({
+                'batch_id': batch.id,
+                'company': batch.company_id.name,
+                'journal': batch.journal_id.name,
+                'line_count': batch.line_count,
+                'state': batch.state,
+                'waiting': bool(batch.shard_requested_by_id),
+                'error': batch.matching_error or False,
+                'matching_seconds': seconds,
+                'lines_per_second': batch.line_count / seconds if seconds else 0.0,
+            })
+        return reports
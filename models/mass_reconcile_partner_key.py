@@ -0,0 +1,217 @@
+"""Partner inference index - resolves probable partners for statement lines without one."""
+
+import re
+import unicodedata
+from collections import defaultdict
+
+from odoo import models, fields, api
+
+
+# Legal-form tokens ignored when normalizing counterparty names
+LEGAL_FORM_TOKENS = {
+    'sa', 'sl', 'sas', 'sarl', 'srl', 'spa', 'ltd', 'limited', 'inc', 'llc',
+    'gmbh', 'ag', 'bv', 'nv', 'plc', 'co', 'corp', 'cia',
+}
+
+
+def normalize_partner_name(name):
+    """
+    Normalize a counterparty or partner name for index lookups.
+
+    Lowercases, strips accents and punctuation, and drops legal-form tokens
+    so that "ACME, S.L." and "Acme SL" resolve to the same key.
+
+    Args:
+        name: str or False
+
+    Returns:
+        str: normalized name ('' when nothing is left)
+    """
+    if not name:
+        return ''
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    # Collapse dotted abbreviations ("s.l." -> "sl") before splitting on punctuation
+    name = re.sub(r'\b(\w)\.(?=\w\b)', r'\1', name).replace('.', ' ')
+    tokens = re.findall(r'[a-z0-9]+', name)
+    return ' '.join(t for t in tokens if t not in LEGAL_FORM_TOKENS)
+
+
+def normalize_account_number(acc_number):
+    """
+    Normalize a bank account number (IBAN or local) for index lookups.
+
+    Args:
+        acc_number: str or False
+
+    Returns:
+        str: upper-cased alphanumerics only ('' when empty)
+    """
+    if not acc_number:
+        return ''
+    return re.sub(r'[^A-Za-z0-9]', '', acc_number).upper()
+
+
+class MassReconcilePartnerKey(models.Model):
+    """Precomputed lookup keys (bank accounts, names, aliases) pointing to partners."""
+
+    _name = 'mass.reconcile.partner.key'
+    _description = 'Mass Reconciliation Partner Inference Key'
+    _order = 'key_type, key'
+
+    # Resolution priority: a bank account beats an alias, which beats a name
+    KEY_PRIORITY = ('bank_account', 'alias', 'name')
+
+    key = fields.Char(
+        string='Key',
+        required=True,
+        index=True,
+        help='Normalized bank account number or counterparty name'
+    )
+    key_type = fields.Selection(
+        selection=[
+            ('bank_account', 'Bank Account'),
+            ('name', 'Partner Name'),
+            ('alias', 'Alias'),
+        ],
+        string='Key Type',
+        required=True,
+        help='Bank account and name keys are rebuilt automatically; aliases are maintained by users'
+    )
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Partner',
+        required=True,
+        ondelete='cascade',
+        help='Commercial partner this key resolves to'
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        index=True,
+        ondelete='cascade',
+        help='Company the key applies to (empty for all companies)'
+    )
+
+    _sql_constraints = [
+        ('key_partner_unique',
+         'UNIQUE(key, key_type, partner_id, company_id)',
+         'This key already points to this partner')
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Normalize alias keys typed by users."""
+        for vals in vals_list:
+            if vals.get('key_type') == 'alias' and vals.get('key'):
+                vals['key'] = normalize_partner_name(vals['key'])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        """Normalize alias keys edited by users."""
+        if vals.get('key') and (vals.get('key_type') or self[:1].key_type) == 'alias':
+            vals = dict(vals, key=normalize_partner_name(vals['key']))
+        return super().write(vals)
+
+    @api.model
+    def rebuild_index(self):
+        """
+        Rebuild the bank account and name keys from res.partner.bank and res.partner.
+
+        User-maintained aliases are kept as they are.
+
+        Returns:
+            int: number of keys created
+        """
+        self.search([('key_type', '!=', 'alias')]).unlink()
+
+        vals_set = set()
+
+        # Bank account numbers
+        self.env.cr.execute("""
+            SELECT b.acc_number, p.commercial_partner_id, b.company_id
+              FROM res_partner_bank b
+              JOIN res_partner p ON p.id = b.partner_id
+             WHERE b.active AND p.active
+        """)
+        for acc_number, partner_id, company_id in self.env.cr.fetchall():
+            key = normalize_account_number(acc_number)
+            if key:
+                vals_set.add((key, 'bank_account', partner_id, company_id))
+
+        # Commercial partner names
+        self.env.cr.execute("""
+            SELECT name, id, company_id
+              FROM res_partner
+             WHERE active AND id = commercial_partner_id AND name IS NOT NULL
+        """)
+        for name, partner_id, company_id in self.env.cr.fetchall():
+            key = normalize_partner_name(name)
+            if key:
+                vals_set.add((key, 'name', partner_id, company_id))
+
+        self.create([
+            {
+                'key': key,
+                'key_type': key_type,
+                'partner_id': partner_id,
+                'company_id': company_id,
+            }
+            for key, key_type, partner_id, company_id in vals_set
+        ])
+        return len(vals_set)
+
+    @api.model
+    def resolve_statement_lines(self, statement_lines):
+        """
+        Infer a probable partner for every statement line without one, in bulk.
+
+        Keys pointing to more than one partner are ambiguous and ignored.
+
+        Args:
+            statement_lines: account.bank.statement.line recordset
+
+        Returns:
+            dict: {statement_line_id: partner_id} for the lines that resolved
+        """
+        lines = statement_lines.filtered(lambda l: not l.partner_id)
+        if not lines:
+            return {}
+
+        lookups = {}
+        for line in lines:
+            lookups[line.id] = {
+                'bank_account': normalize_account_number(line.account_number),
+                'name': normalize_partner_name(line.partner_name),
+            }
+        wanted_keys = {k for lk in lookups.values() for k in lk.values() if k}
+        if not wanted_keys:
+            return {}
+
+        company_ids = lines.company_id.ids
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT key, key_type, company_id, ARRAY_AGG(DISTINCT partner_id)
+              FROM mass_reconcile_partner_key
+             WHERE key = ANY(%s)
+               AND (company_id IS NULL OR company_id = ANY(%s))
+          GROUP BY key, key_type, company_id
+        """, (list(wanted_keys), company_ids))
+
+        index = defaultdict(set)
+        for key, key_type, company_id, partner_ids in self.env.cr.fetchall():
+            index[(key, key_type, company_id)].update(partner_ids)
+
+        resolved = {}
+        for line in lines:
+            company_id = line.company_id.id
+            for key_type in self.KEY_PRIORITY:
+                # Aliases are matched against the counterparty name
+                key = lookups[line.id]['bank_account' if key_type == 'bank_account' else 'name']
+                if not key:
+                    continue
+                partners = index.get((key, key_type, company_id), set()) | index.get((key, key_type, None), set())
+                if len(partners) == 1:
+                    resolved[line.id] = next(iter(partners))
+                    break
+        return resolved
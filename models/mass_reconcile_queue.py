@@ -0,0 +1,154 @@
+"""Continuous matching queue - statement lines waiting to be (re-)matched."""
+
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+
+class MassReconcileQueue(models.Model):
+    """
+    Statement lines waiting for continuous matching.
+
+    Lines of journals with continuous matching are queued when they are
+    created, and open unmatched lines are queued again when a journal item
+    they could match is posted. A debounced cron drains the queue in
+    micro-batches through the batch matching pipeline.
+    """
+    _name = 'mass.reconcile.queue'
+    _description = 'Mass Reconciliation Continuous Matching Queue'
+    _order = 'id'
+    _log_access = False
+
+    # Delay between the first queued line of a burst and the worker run
+    DEBOUNCE_SECONDS = 10
+    # Statement lines matched (and committed) per micro-batch
+    MICRO_BATCH_SIZE = 50
+    # Date window around newly posted items for re-scoring open lines
+    RESCORE_DATE_DAYS = 30
+
+    statement_line_id = fields.Many2one(
+        'account.bank.statement.line',
+        string='Statement Line',
+        required=True,
+        ondelete='cascade',
+        help='Statement line to (re-)match'
+    )
+    queued_at = fields.Datetime(
+        string='Queued At',
+        required=True,
+        default=fields.Datetime.now,
+        help='When the line was queued'
+    )
+
+    _sql_constraints = [
+        ('unique_statement_line',
+         'UNIQUE(statement_line_id)',
+         'A statement line is queued only once'),
+    ]
+
+    @api.model
+    def _enqueue(self, statement_line_ids):
+        """
+        Queue statement lines, and schedule the worker.
+
+        Lines already queued are left as they are. The worker is triggered on
+        every call, DEBOUNCE_SECONDS later: checking whether the queue was
+        empty is unreliable while another transaction is queueing or draining
+        it, and triggers due by the time the worker runs are all consumed by
+        that one run, so a burst of lines is still matched together.
+
+        Args:
+            statement_line_ids: list of account.bank.statement.line ids
+        """
+        if not statement_line_ids:
+            return
+        self.flush_model()
+        self.env.cr.execute("""
+            INSERT INTO mass_reconcile_queue (statement_line_id, queued_at)
+            SELECT unnest(%s::int[]), (now() AT TIME ZONE 'UTC')
+            ON CONFLICT (statement_line_id) DO NOTHING
+        """, (list(statement_line_ids),))
+        cron = self.env.ref(f'{self._module}.ir_cron_continuous_matching', raise_if_not_found=False)
+        if cron:
+            cron._trigger(at=fields.Datetime.now() + timedelta(seconds=self.DEBOUNCE_SECONDS))
+
+    @api.model
+    def _enqueue_for_move_lines(self, move_lines):
+        """
+        Queue open unmatched lines of continuous journals that could match new items.
+
+        A line qualifies when its amount equals the amount of one of the items,
+        in the same company and within RESCORE_DATE_DAYS of their dates.
+
+        Args:
+            move_lines: account.move.line recordset just posted
+        """
+        move_lines = move_lines.filtered(lambda aml: aml.account_id.reconcile)
+        if not move_lines:
+            return
+        amounts = sorted({
+            round(abs(amount), 2)
+            for aml in move_lines
+            for amount in (aml.balance, aml.amount_currency)
+            if amount
+        })
+        if not amounts:
+            return
+        dates = move_lines.mapped('date')
+        window = timedelta(days=self.RESCORE_DATE_DAYS)
+        self.env['account.bank.statement.line'].flush_model()
+        self.env.cr.execute("""
+            SELECT sl.id
+              FROM account_bank_statement_line sl
+              JOIN account_journal j ON j.id = sl.journal_id
+             WHERE j.mass_reconcile_continuous
+               AND sl.batch_id = j.mass_reconcile_batch_id
+               AND sl.match_state = 'unmatched'
+               AND sl.duplicate_of_id IS NULL
+               AND sl.company_id = ANY(%s)
+               AND ROUND(ABS(sl.amount), 2) = ANY(%s::numeric[])
+               AND sl.date BETWEEN %s AND %s
+        """, (
+            move_lines.company_id.ids, amounts, min(dates) - window, max(dates) + window,
+        ))
+        self._enqueue([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _cron_process_queue(self):
+        """Queue worker: drain the queue, committing micro-batch by micro-batch."""
+        self.with_context(mass_reconcile_checkpoint_commits=True)._process_queue()
+
+    @api.model
+    def _process_queue(self):
+        """
+        Drain the queue, matching MICRO_BATCH_SIZE lines at a time.
+
+        Rows are taken with SKIP LOCKED so concurrent workers split the queue,
+        and each micro-batch is committed with its proposals (in workers, see
+        mass.reconcile.batch._commit_matching_checkpoint).
+        """
+        Line = self.env['account.bank.statement.line']
+        while True:
+            self.flush_model()
+            self.env.cr.execute("""
+                DELETE FROM mass_reconcile_queue
+                 WHERE id IN (
+                    SELECT id FROM mass_reconcile_queue
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING statement_line_id
+            """, (self.MICRO_BATCH_SIZE,))
+            line_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not line_ids:
+                break
+            self.invalidate_model()
+            lines = Line.browse(line_ids).exists().filtered(
+                lambda line: line.batch_id and line.match_state in ('unmatched', 'matched')
+            )
+            for batch, batch_lines in lines.grouped('batch_id').items():
+                batch._rematch_lines(batch_lines)
+            # Statement lines with nothing to (re-)match still free their queue rows
+            self.env['mass.reconcile.batch']._commit_matching_checkpoint()
+            self.env.invalidate_all()
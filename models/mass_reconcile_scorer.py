@@ -1,7 +1,6 @@
 """Mass Reconciliation Scorer - calculates weighted confidence scores for match candidates."""
 
 from odoo import models, fields, api
-from odoo.tools.float_utils import float_compare
 
 
 class MassReconcileScorer(models.AbstractModel):
@@ -18,6 +17,32 @@ class MassReconcileScorer(models.AbstractModel):
         'date': 0.05,      # 5% - minor factor
     }
 
+    # Factor registry: name -> (relative evaluation cost, scoring method name).
+    # Each method takes (statement_line, move_line, matching_context) and
+    # returns 0-100; its weight comes from WEIGHTS. Inheriting models add
+    # factors by extending FACTORS and WEIGHTS. Factors are evaluated by
+    # decreasing weight per unit of cost, so the most decisive ones come first.
+    FACTORS = {
+        'partner': (1, '_score_partner'),
+        'date': (1, '_score_date'),
+        'reference': (2, '_score_reference'),
+        'amount': (3, '_score_amount'),
+    }
+
+    # Factors with their own column on proposals; the weighted contribution of
+    # any other factor is stored in score_bonus
+    STORED_FACTORS = ('amount', 'partner', 'reference', 'date')
+
+    # Classification thresholds (shared by classify_match and SQL re-weighting)
+    SAFE_THRESHOLD = 100.0
+    PROBABLE_THRESHOLD = 80.0
+
+    # Default minimum score of candidate pairs: 0 keeps every pair, doubtful
+    # ones included. Batches opt in to a floor (mass.reconcile.batch
+    # score_floor): pairs that cannot reach it are dropped as soon as the
+    # factors evaluated so far rule it out
+    SCORE_FLOOR = 0.0
+
     # Configuration field for date range scoring
     date_range_days = fields.Integer(
         string='Date Range Days',
@@ -25,34 +50,116 @@ class MassReconcileScorer(models.AbstractModel):
         help='Number of days for date range scoring decay'
     )
 
-    def calculate_score(self, statement_line, move_line):
+    def calculate_score(self, statement_line, move_line, matching_context=None):
         """
         Calculate weighted confidence score (0-100) for a candidate match.
 
         Args:
             statement_line: account.bank.statement.line record
             move_line: account.move.line record
+            matching_context: optional MatchingContext from the engine
 
         Returns:
             float: Confidence score between 0 and 100
         """
         self.ensure_one() if self.ids else None
 
-        # Calculate individual factor scores (each 0-100)
-        amount_score = self._score_amount(statement_line, move_line)
-        partner_score = self._score_partner(statement_line, move_line)
-        reference_score = self._score_reference(statement_line, move_line)
-        date_score = self._score_date(statement_line, move_line)
-
-        # Apply weights and combine
-        weighted_score = (
-            amount_score * self.WEIGHTS['amount'] +
-            partner_score * self.WEIGHTS['partner'] +
-            reference_score * self.WEIGHTS['reference'] +
-            date_score * self.WEIGHTS['date']
+        factor_scores = self.calculate_factor_scores(
+            statement_line, move_line, matching_context=matching_context, floor=0.0,
+        )
+        return self.combine_factor_scores(factor_scores)
+
+    def calculate_factor_scores(self, statement_line, move_line, matching_context=None, floor=None):
+        """
+        Calculate the individual factor scores (each 0-100) for a candidate.
+
+        Factors are evaluated most decisive first (see _get_score_factors). As
+        soon as the weighted score so far plus the maximum of the factors left
+        falls below the floor, the pair is given up without evaluating the rest.
+
+        Args:
+            statement_line: account.bank.statement.line record
+            move_line: account.move.line record
+            matching_context: optional MatchingContext from the engine
+            floor: minimum weighted score (defaults to _get_score_floor())
+
+        Returns:
+            dict: {factor name: float score}, or None when the pair cannot
+                  reach the floor
+        """
+        if floor is None:
+            floor = self._get_score_floor()
+        if matching_context is None:
+            # Built once for all factors of the pair; callers scoring many pairs pass it
+            matching_context = self.env['mass.reconcile.engine']._get_matching_context(statement_line.company_id)
+        factors = self._get_score_factors()
+        reachable = 100.0 * sum(weight for _name, weight, _method in factors)
+        score = 0.0
+        factor_scores = {}
+        for name, weight, method in factors:
+            if floor and round(reachable, 6) < floor:
+                return None
+            factor_scores[name] = method(statement_line, move_line, matching_context)
+            score += factor_scores[name] * weight
+            reachable += (factor_scores[name] - 100.0) * weight
+        if floor and round(score, 6) < floor:
+            return None
+        return factor_scores
+
+    def _get_score_factors(self):
+        """
+        Registered factors in evaluation order: highest weight per unit of cost first.
+
+        The factor that can rule a pair out for the least work comes first, so
+        a heavy factor (the amount) is not left for last just because it costs
+        more than light ones.
+
+        Returns:
+            list: (name, weight, bound scoring method) tuples
+        """
+        weights = self._get_weights()
+        factors = sorted(
+            self.FACTORS.items(),
+            key=lambda item: (-weights.get(item[0], 0.0) / item[1][0], item[1][0]),
         )
+        return [
+            (name, weights.get(name, 0.0), getattr(self, method_name))
+            for name, (_cost, method_name) in factors
+        ]
+
+    def _get_score_floor(self):
+        """Score floor: SCORE_FLOOR, or the batch's floor passed through the context."""
+        return self.env.context.get('mass_reconcile_score_floor', self.SCORE_FLOOR)
 
-        return weighted_score
+    def _get_date_range_days(self):
+        """Date decay window in days: date_range_days, or the window a simulation tries through the context."""
+        return self.env.context.get('mass_reconcile_date_range_days') or self.date_range_days or 30
+
+    def _get_weights(self):
+        """Factor weights: WEIGHTS, or the weights a simulation tries through the context."""
+        return self.env.context.get('mass_reconcile_weights') or self.WEIGHTS
+
+    def combine_factor_scores(self, factor_scores):
+        """
+        Apply WEIGHTS to factor scores and combine them into one score.
+
+        Args:
+            factor_scores: dict as returned by calculate_factor_scores
+
+        Returns:
+            float: Weighted confidence score between 0 and 100
+        """
+        return sum(
+            factor_scores.get(factor, 0.0) * weight
+            for factor, weight in self._get_weights().items()
+        )
+
+    def _unstored_factor_bonus(self, factor_scores):
+        """Weighted contribution of the factors without a column on proposals."""
+        return self.combine_factor_scores({
+            factor: score for factor, score in factor_scores.items()
+            if factor not in self.STORED_FACTORS
+        })
 
     def classify_match(self, score):
         """
@@ -64,47 +171,45 @@ class MassReconcileScorer(models.AbstractModel):
         Returns:
             str: 'safe', 'probable', or 'doubtful'
         """
-        if score == 100.0:
+        if score >= self.SAFE_THRESHOLD:
             return 'safe'
-        elif score >= 80.0:
+        elif score >= self.PROBABLE_THRESHOLD:
             return 'probable'
         else:
             return 'doubtful'
 
-    def _score_amount(self, statement_line, move_line):
+    def _score_amount(self, statement_line, move_line, matching_context=None):
         """
         Score amount match using float_compare for precision.
 
         Args:
             statement_line: account.bank.statement.line record
             move_line: account.move.line record
+            matching_context: optional MatchingContext (cached roundings and rates)
 
         Returns:
             float: 100 if amounts match exactly, 0 otherwise
         """
-        # Get currency precision
-        currency = statement_line.currency_id or statement_line.company_id.currency_id
-        precision = currency.rounding
-
-        # Statement line amount
-        st_amount = abs(statement_line.amount)
-
-        # Move line amount (debit - credit gives signed amount)
-        mv_amount = abs(move_line.debit - move_line.credit)
+        # Compare in the transaction currency when the move line shares it,
+        # else in company currency through the run's rate table
+        engine = self.env['mass.reconcile.engine']
+        ctx = matching_context or engine._get_matching_context(statement_line.company_id)
+        st_amounts = engine._get_statement_amounts(statement_line, ctx)
 
         # Use float_compare for precision-aware comparison
-        if float_compare(st_amount, mv_amount, precision_rounding=precision) == 0:
+        if engine._amount_matches(st_amounts, move_line, ctx):
             return 100.0
         else:
             return 0.0
 
-    def _score_partner(self, statement_line, move_line):
+    def _score_partner(self, statement_line, move_line, matching_context=None):
         """
         Score partner match.
 
         Args:
             statement_line: account.bank.statement.line record
             move_line: account.move.line record
+            matching_context: unused, part of the factor method signature
 
         Returns:
             float: 100 if both set and match, 50 if only move has partner, 0 otherwise
@@ -125,13 +230,14 @@ class MassReconcileScorer(models.AbstractModel):
             # No partner info to compare
             return 0.0
 
-    def _score_reference(self, statement_line, move_line):
+    def _score_reference(self, statement_line, move_line, matching_context=None):
         """
         Score reference match (exact or substring).
 
         Args:
             statement_line: account.bank.statement.line record
             move_line: account.move.line record
+            matching_context: unused, part of the factor method signature
 
         Returns:
             float: 100 for exact match, 75 for substring, 0 for no match
@@ -154,13 +260,14 @@ class MassReconcileScorer(models.AbstractModel):
         # No match
         return 0.0
 
-    def _score_date(self, statement_line, move_line):
+    def _score_date(self, statement_line, move_line, matching_context=None):
         """
         Score date proximity with linear decay.
 
         Args:
             statement_line: account.bank.statement.line record
             move_line: account.move.line record
+            matching_context: unused, part of the factor method signature
 
         Returns:
             float: 100 for same day, linear decay to 0 at date_range_days boundary
@@ -179,7 +286,7 @@ class MassReconcileScorer(models.AbstractModel):
             return 100.0
 
         # Linear decay to 0 at date_range_days
-        max_days = self.date_range_days or 30
+        max_days = self._get_date_range_days()
         if day_diff >= max_days:
             return 0.0
 
@@ -0,0 +1,10 @@
+from odoo import models
+
+
+class ResCurrency(models.Model):
+    """Invalidate the cached mass reconciliation matching context on changes."""
+    _name = 'res.currency'
+    _inherit = ['res.currency', 'mass.reconcile.context.mixin']
+
+    # Fields the cached matching context depends on (every currency's rounding)
+    _MASS_RECONCILE_CONTEXT_FIELDS = {'rounding'}
@@ -1 +1,4 @@
 # Mass reconciliation tests
+from . import test_matching_engine
+from . import test_mass_reconcile_batch
+from . import test_matching_benchmark
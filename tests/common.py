@@ -0,0 +1,137 @@
+"""Shared fixtures for mass reconciliation tests."""
+
+from datetime import datetime
+from odoo.tests.common import TransactionCase
+
+
+class MassReconcileCommon(TransactionCase):
+    """Company, journals, accounts and a batch, plus move/statement line helpers."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures."""
+        super().setUpClass()
+
+        # Create test company
+        cls.company = cls.env['res.company'].create({
+            'name': 'Test Company',
+        })
+
+        # Create test currency
+        cls.currency = cls.env['res.currency'].search([('name', '=', 'USD')], limit=1)
+        if not cls.currency:
+            cls.currency = cls.env['res.currency'].create({
+                'name': 'USD',
+                'symbol': '$',
+                'rounding': 0.01,
+            })
+
+        # Create test partner
+        cls.partner = cls.env['res.partner'].create({
+            'name': 'Test Partner',
+            'company_id': cls.company.id,
+        })
+
+        # Create bank journals
+        cls.bank_journal = cls.env['account.journal'].create({
+            'name': 'Bank Journal 1',
+            'code': 'BNK1',
+            'type': 'bank',
+            'company_id': cls.company.id,
+            'currency_id': cls.currency.id,
+        })
+
+        cls.bank_journal_2 = cls.env['account.journal'].create({
+            'name': 'Bank Journal 2',
+            'code': 'BNK2',
+            'type': 'bank',
+            'company_id': cls.company.id,
+            'currency_id': cls.currency.id,
+        })
+
+        # Create reconcilable account
+        cls.account_receivable = cls.env['account.account'].create({
+            'name': 'Test Receivable',
+            'code': 'TEST_AR',
+            'account_type': 'asset_receivable',
+            'reconcile': True,
+            'company_id': cls.company.id,
+        })
+
+        cls.account_bank = cls.env['account.account'].create({
+            'name': 'Test Bank',
+            'code': 'TEST_BNK',
+            'account_type': 'asset_cash',
+            'reconcile': True,
+            'company_id': cls.company.id,
+        })
+
+        # Create test batch
+        cls.batch = cls.env['mass.reconcile.batch'].create({
+            'name': 'Test Batch',
+            'company_id': cls.company.id,
+            'journal_id': cls.bank_journal.id,
+        })
+
+        # Create bank statement
+        cls.statement = cls.env['account.bank.statement'].create({
+            'name': 'Test Statement',
+            'journal_id': cls.bank_journal.id,
+            'date': datetime.now().date(),
+        })
+
+        # Reference date for tests
+        cls.test_date = datetime.now().date()
+
+        # Initialize engine and scorer
+        cls.engine = cls.env['mass.reconcile.engine']
+        cls.scorer = cls.env['mass.reconcile.scorer']
+
+    def _create_posted_move_line(self, amount, partner=None, payment_ref=None,
+                                   date=None, account=None, journal=None):
+        """Helper to create a posted move line."""
+        if date is None:
+            date = self.test_date
+        if account is None:
+            account = self.account_receivable
+        if journal is None:
+            journal = self.bank_journal
+
+        move = self.env['account.move'].create({
+            'journal_id': journal.id,
+            'date': date,
+            'state': 'draft',
+            'move_type': 'entry',
+            'company_id': self.company.id,
+            'line_ids': [
+                (0, 0, {
+                    'account_id': account.id,
+                    'partner_id': partner.id if partner else False,
+                    'payment_ref': payment_ref,
+                    'debit': amount if amount > 0 else 0,
+                    'credit': -amount if amount < 0 else 0,
+                }),
+                (0, 0, {
+                    'account_id': self.account_bank.id,
+                    'debit': -amount if amount < 0 else 0,
+                    'credit': amount if amount > 0 else 0,
+                }),
+            ],
+        })
+        move.action_post()
+        # Return the reconcilable line
+        return move.line_ids.filtered(lambda l: l.account_id.reconcile)
+
+    def _create_statement_line(self, amount, partner=None, payment_ref=None, date=None):
+        """Helper to create a bank statement line."""
+        if date is None:
+            date = self.test_date
+
+        return self.env['account.bank.statement.line'].create({
+            'statement_id': self.statement.id,
+            'payment_ref': payment_ref or 'Test payment',
+            'partner_id': partner.id if partner else False,
+            'amount': amount,
+            'date': date,
+            'batch_id': self.batch.id,
+        })
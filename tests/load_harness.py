@@ -0,0 +1,295 @@
+"""
+Concurrent-load harness: matching runs and reviewers hitting the same batches.
+
+Not collected by the test runner; TestConcurrentLoad in test_matching_benchmark
+runs a small smoke load (--test-tags mass_reconcile_benchmark). For a real
+load, run it against a disposable database with the module installed and
+batches ready to match (each operation commits):
+
+    python -m odoo.addons.<module>.tests.load_harness -c odoo.conf -d loadtest \\
+        --batch-ids 1 2 3 4 --runs 4 --reviewers 20 --review-iterations 200
+
+Every operation runs on its own cursor. The report gives, per operation, the
+throughput and p50/p95/p99 latencies, plus the contention seen meanwhile:
+serialization failures, deadlocks, lock timeouts, lost claims (held by
+another batch, locked by a concurrent claim, or on items no longer open),
+proposals deleted under a reviewer, and sampled sessions waiting on a lock.
+"""
+
+import argparse
+import logging
+import math
+import random
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+
+import psycopg2
+from psycopg2 import errorcodes
+
+from odoo import api
+from odoo.exceptions import MissingError, ValidationError
+
+from ..models.mass_reconcile_claim import ClaimError
+
+_logger = logging.getLogger(__name__)
+
+
+class LoadReport:
+    """Latencies and contention counters collected by the harness threads."""
+
+    # Outcome counted for each PostgreSQL error code caused by contention
+    CONTENTION_CODES = {
+        errorcodes.SERIALIZATION_FAILURE: 'serialization_failures',
+        errorcodes.DEADLOCK_DETECTED: 'deadlocks',
+        errorcodes.LOCK_NOT_AVAILABLE: 'lock_timeouts',
+    }
+
+    # Outcome counted for each reason a journal item could not be claimed
+    CLAIM_OUTCOMES = {
+        'claimed': 'claim_conflicts',
+        'locked': 'claim_lock_contention',
+        'closed': 'claims_on_closed_items',
+    }
+
+    # Tracebacks of unexpected errors kept in the report (all are logged)
+    MAX_TRACEBACKS = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.counters = Counter()
+        self.lock_wait_samples = []
+        self.tracebacks = []
+        self.wall_seconds = 0.0
+
+    def add_latency(self, operation, seconds):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+
+    def count(self, outcome):
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def add_traceback(self, operation, formatted):
+        with self._lock:
+            if len(self.tracebacks) < self.MAX_TRACEBACKS:
+                self.tracebacks.append((operation, formatted))
+
+    def add_lock_wait_sample(self, waiting_sessions):
+        with self._lock:
+            self.lock_wait_samples.append(waiting_sessions)
+
+    @staticmethod
+    def percentile(values, rank):
+        """Nearest-rank percentile of a sorted list."""
+        if not values:
+            return None
+        return values[max(0, math.ceil(rank / 100.0 * len(values)) - 1)]
+
+    def summary(self):
+        """
+        Summarize the load.
+
+        Returns:
+            dict: 'operations' ({operation: count, throughput (per second),
+                  p50, p95, p99, max}), 'contention' (outcome counters,
+                  lock wait samples, samples with waiters, max waiters),
+                  'tracebacks' (the first MAX_TRACEBACKS unexpected errors, as
+                  (operation, formatted traceback)) and 'wall_seconds'
+        """
+        operations = {}
+        for operation, values in self.latencies.items():
+            values = sorted(values)
+            operations[operation] = {
+                'count': len(values),
+                'throughput': len(values) / self.wall_seconds if self.wall_seconds else 0.0,
+                'p50': self.percentile(values, 50),
+                'p95': self.percentile(values, 95),
+                'p99': self.percentile(values, 99),
+                'max': values[-1],
+            }
+        contention = dict(self.counters)
+        contention.update({
+            'lock_wait_samples': len(self.lock_wait_samples),
+            'samples_with_lock_waits': sum(1 for waiting in self.lock_wait_samples if waiting),
+            'max_lock_waiters': max(self.lock_wait_samples, default=0),
+        })
+        return {
+            'operations': operations,
+            'contention': contention,
+            'tracebacks': list(self.tracebacks),
+            'wall_seconds': self.wall_seconds,
+        }
+
+
+class LoadHarness:
+    """Drives concurrent matching runs and reviewers on a set of batches."""
+
+    # Seconds between two samples of the sessions waiting on a lock
+    LOCK_SAMPLE_INTERVAL = 0.1
+    # Statement lines a reviewer loads per review page
+    REVIEW_PAGE_SIZE = 20
+
+    def __init__(self, registry, uid, batch_ids, seed=0):
+        """
+        Args:
+            registry: odoo.modules.registry.Registry of the database
+            uid: user running the operations (record rules apply)
+            batch_ids: mass.reconcile.batch ids shared by runs and reviewers
+            seed: seed of the reviewers' random choices
+        """
+        self.registry = registry
+        self.uid = uid
+        self.batch_ids = list(batch_ids)
+        self.seed = seed
+
+    def run(self, runs=2, reviewers=4, run_iterations=1, review_iterations=50):
+        """
+        Run the load and return its summary.
+
+        Matching run i restarts matching on batch i (modulo the number of
+        batches) run_iterations times; each reviewer loads a review page of a
+        random batch and toggles a random proposal, review_iterations times.
+
+        Returns:
+            dict: LoadReport.summary()
+        """
+        report = LoadReport()
+        stop = threading.Event()
+        monitor = threading.Thread(target=self._sample_lock_waits, args=(report, stop), daemon=True)
+        workers = [
+            threading.Thread(
+                target=self._matching_worker,
+                args=(report, self.batch_ids[index % len(self.batch_ids)], run_iterations),
+            )
+            for index in range(runs)
+        ] + [
+            threading.Thread(
+                target=self._reviewer_worker,
+                args=(report, random.Random(self.seed + index), review_iterations),
+            )
+            for index in range(reviewers)
+        ]
+        started = time.perf_counter()
+        monitor.start()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        report.wall_seconds = time.perf_counter() - started
+        stop.set()
+        monitor.join()
+        return report.summary()
+
+    def _timed(self, report, operation, function, *args):
+        """
+        Run one operation in its own committed transaction and record its outcome.
+
+        Operations return None when done (their latency is recorded), or the
+        name of the outcome to count when there was nothing to do.
+        """
+        started = time.perf_counter()
+        try:
+            with self.registry.cursor() as cr:
+                outcome = function(api.Environment(cr, self.uid, {}), *args)
+        except psycopg2.Error as error:
+            report.count(LoadReport.CONTENTION_CODES.get(error.pgcode, 'database_errors'))
+        except MissingError:
+            # The proposal was deleted by a matching run while being reviewed
+            report.count('stale_reviews')
+        except ClaimError as error:
+            # The selected journal item could not be claimed
+            report.count(LoadReport.CLAIM_OUTCOMES[error.reason])
+        except ValidationError:
+            report.count('validation_errors')
+        except Exception:
+            _logger.exception("Load harness operation %s failed", operation)
+            report.count('errors')
+            report.add_traceback(operation, traceback.format_exc())
+        else:
+            if outcome:
+                report.count(outcome)
+            else:
+                report.add_latency(operation, time.perf_counter() - started)
+
+    def _matching_worker(self, report, batch_id, iterations):
+        for _iteration in range(iterations):
+            self._timed(report, 'matching_run', self._start_matching, batch_id)
+
+    def _reviewer_worker(self, report, rng, iterations):
+        for _iteration in range(iterations):
+            self._timed(report, 'review_toggle', self._toggle_random_proposal, rng)
+
+    def _start_matching(self, env, batch_id):
+        # Like a shard worker: the run commits chunk by chunk
+        batch = env['mass.reconcile.batch'].browse(batch_id)
+        batch.with_context(mass_reconcile_checkpoint_commits=True)._start_matching()
+
+    def _toggle_random_proposal(self, env, rng):
+        """Load a review page and flip the selection of one of its proposals."""
+        batch = env['mass.reconcile.batch'].browse(rng.choice(self.batch_ids))
+        page = batch.get_review_page(limit=self.REVIEW_PAGE_SIZE)
+        proposals = [proposal for line in page['lines'] for proposal in line['proposals']]
+        if not proposals:
+            return 'idle_reviews'
+        proposal = rng.choice(proposals)
+        env['mass.reconcile.match'].browse(proposal['id']).write({
+            'is_selected': not proposal['is_selected'],
+        })
+        return None
+
+    def _sample_lock_waits(self, report, stop):
+        """Sample the sessions of the database waiting on a lock until stopped."""
+        while not stop.wait(self.LOCK_SAMPLE_INTERVAL):
+            with self.registry.cursor() as cr:
+                cr.execute("""
+                    SELECT COUNT(*) FROM pg_stat_activity
+                     WHERE datname = current_database() AND wait_event_type = 'Lock'
+                """)
+                report.add_lock_wait_sample(cr.fetchone()[0])
+
+
+def main():
+    """Command line entry point (see the module docstring)."""
+    import odoo
+    from odoo.modules.registry import Registry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', required=True, help='Odoo configuration file')
+    parser.add_argument('-d', '--database', required=True, help='Disposable database to load')
+    parser.add_argument('--login', default='admin', help='User running the operations')
+    parser.add_argument('--batch-ids', type=int, nargs='+', required=True)
+    parser.add_argument('--runs', type=int, default=2, help='Concurrent matching runs')
+    parser.add_argument('--reviewers', type=int, default=4, help='Concurrent reviewers')
+    parser.add_argument('--run-iterations', type=int, default=1)
+    parser.add_argument('--review-iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    odoo.tools.config.parse_config(['-c', args.config, '-d', args.database])
+    registry = Registry(args.database)
+    with registry.cursor() as cr:
+        cr.execute("SELECT id FROM res_users WHERE login = %s", (args.login,))
+        uid = cr.fetchone()[0]
+
+    summary = LoadHarness(registry, uid, args.batch_ids, seed=args.seed).run(
+        runs=args.runs, reviewers=args.reviewers,
+        run_iterations=args.run_iterations, review_iterations=args.review_iterations,
+    )
+    print(f"Wall time: {summary['wall_seconds']:.2f}s")
+    for operation, stats in sorted(summary['operations'].items()):
+        print(
+            f"{operation}: {stats['count']} ops, {stats['throughput']:.2f}/s, "
+            f"p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s, p99 {stats['p99']:.3f}s, "
+            f"max {stats['max']:.3f}s"
+        )
+    for outcome, count in sorted(summary['contention'].items()):
+        print(f"{outcome}: {count}")
+    for operation, formatted in summary['tracebacks']:
+        print(f"\n{operation} failed:\n{formatted}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,663 @@
+"""Tests for mass.reconcile.batch matching runs."""
+
+import csv
+import io
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import Command, fields
+from odoo.exceptions import ValidationError
+from odoo.sql_db import db_connect
+
+from ..models.mass_reconcile_claim import ClaimError
+from .common import MassReconcileCommon
+
+
+class TestMassReconcileBatch(MassReconcileCommon):
+    """Test cases for batch-level matching orchestration."""
+
+    def test_resume_skips_checkpointed_lines(self):
+        """Test that resuming only processes lines not checkpointed yet."""
+        done_line = self._create_statement_line(1000.00)
+        self._create_posted_move_line(1000.00)
+        pending_line = self._create_statement_line(2000.00)
+        self._create_posted_move_line(2000.00)
+
+        # Simulate a run that crashed after checkpointing the first line
+        self.batch.write({'state': 'matching'})
+        done_line.write({'match_processed': True, 'match_state': 'reviewed'})
+
+        self.batch.action_resume_matching()
+        self.assertFalse(self.batch.matching_heartbeat)
+        self.env['mass.reconcile.batch']._cron_resume_stalled_matching()
+
+        self.assertEqual(self.batch.state, 'review')
+        self.assertFalse(
+            self.batch.match_ids.filtered(lambda m: m.statement_line_id == done_line),
+            "Checkpointed lines must not be matched again",
+        )
+        self.assertTrue(
+            self.batch.match_ids.filtered(lambda m: m.statement_line_id == pending_line)
+        )
+        self.assertEqual(done_line.match_state, 'reviewed')
+        self.assertTrue(pending_line.match_processed)
+
+    def test_cron_resumes_stalled_batches_only(self):
+        """Test that the cron resumes runs with a stale heartbeat, not live ones."""
+        self._create_statement_line(1000.00)
+        live_batch = self.env['mass.reconcile.batch'].create({
+            'name': 'Live Batch',
+            'company_id': self.company.id,
+            'state': 'matching',
+            'matching_heartbeat': fields.Datetime.now(),
+        })
+        self.batch.write({
+            'state': 'matching',
+            'matching_heartbeat': fields.Datetime.now() - timedelta(hours=1),
+        })
+
+        self.env['mass.reconcile.batch']._cron_resume_stalled_matching()
+
+        self.assertEqual(self.batch.state, 'review')
+        self.assertEqual(live_batch.state, 'matching')
+
+    def test_cron_skips_stalled_batches_still_locked(self):
+        """Test that a slow run holding the matching lock is not resumed in parallel."""
+        self._create_statement_line(1000.00)
+        self.batch.write({
+            'state': 'matching',
+            'matching_heartbeat': fields.Datetime.now() - timedelta(hours=1),
+        })
+
+        # The lock of a run in another worker, on its own connection (outside
+        # of the registry, whatever its test mode)
+        with db_connect(self.env.cr.dbname).cursor() as worker_cr:
+            worker_cr.execute(
+                "SELECT pg_try_advisory_xact_lock(%s, %s)",
+                (self.batch.MATCHING_LOCK_NAMESPACE, self.batch.id),
+            )
+            self.assertTrue(worker_cr.fetchone()[0])
+
+            self.env['mass.reconcile.batch']._cron_resume_stalled_matching()
+            self.assertEqual(self.batch.state, 'matching')
+            with self.assertRaises(ValidationError):
+                self.batch.action_resume_matching()
+            with self.batch._matching_lock() as locked:
+                self.assertFalse(locked)
+
+        # Ending the worker's transaction releases the lock
+        with self.batch._matching_lock() as locked:
+            self.assertTrue(locked)
+        self.env['mass.reconcile.batch']._cron_resume_stalled_matching()
+        self.assertEqual(self.batch.state, 'review')
+
+    def test_start_button_schedules_matching(self):
+        """Test that the button queues the run for the shard workers instead of matching."""
+        move_line = self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-77')
+        self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV-77')
+
+        self.batch.action_start_matching()
+
+        self.assertEqual(self.batch.shard_requested_by_id, self.env.user)
+        self.assertEqual(self.batch.state, 'draft')
+        self.assertFalse(self.batch.match_ids)
+
+        self.assertTrue(self.env['mass.reconcile.orchestrator']._run_next_shard())
+        self.assertFalse(self.batch.shard_requested_by_id)
+        self.assertEqual(self.batch.state, 'review')
+        self.assertIn(move_line, self.batch.match_ids.suggested_move_line_id)
+
+    def test_claim_errors_tell_the_reason(self):
+        """Test that unclaimable journal items are reported by cause."""
+        claimed = self._create_posted_move_line(1000.00, payment_ref='CLAIMED')
+        closed = self._create_posted_move_line(1001.00, payment_ref='CLOSED')
+        locked = self._create_posted_move_line(1002.00, payment_ref='LOCKED')
+        other_batch = self.env['mass.reconcile.batch'].create({
+            'name': 'Claiming Batch',
+            'company_id': self.company.id,
+        })
+        Claim = self.env['mass.reconcile.claim']
+        Claim._claim(claimed.ids, other_batch.id)
+        self.env['mass.reconcile.open.item'].search([('move_line_id', '=', closed.id)]).unlink()
+
+        reasons = Claim._explain_unclaimed((claimed | closed | locked).ids, self.batch.id)
+
+        self.assertEqual(reasons, {'closed': set(closed.ids), 'claimed': set(claimed.ids), 'locked': set(locked.ids)})
+        with self.assertRaises(ClaimError) as error:
+            self.env['mass.reconcile.match']._raise_claim_error(reasons)
+        self.assertEqual(error.exception.reason, 'closed')
+
+    def test_concurrent_batch_skips_claimed_move_lines(self):
+        """Test that a safe match claims its journal item away from other batches."""
+        move_line = self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV/001')
+        self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV/001')
+        other_batch = self.env['mass.reconcile.batch'].create({
+            'name': 'Concurrent Batch',
+            'company_id': self.company.id,
+            'journal_id': self.bank_journal.id,
+        })
+        other_line = self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV/001')
+        other_line.write({'batch_id': other_batch.id})
+
+        self.batch._start_matching()
+        best = self.batch.match_ids.sorted('match_score', reverse=True)[:1]
+        self.assertEqual(best.suggested_move_line_id, move_line)
+        self.assertEqual(best.confidence_class, 'safe')
+
+        other_batch._start_matching()
+        self.assertNotIn(move_line, other_batch.match_ids.suggested_move_line_id)
+
+        # Resetting the batch releases its claims
+        self.batch.action_reset_to_draft()
+        self.assertFalse(self.env['mass.reconcile.claim'].search([('batch_id', '=', self.batch.id)]))
+
+    def test_read_replica_search_drops_stale_candidates(self):
+        """Test replica-routed matching and the staleness guard on the primary."""
+        move_line = self._create_posted_move_line(1000.00)
+        st_line = self._create_statement_line(1000.00)
+        self.batch.write({'use_read_replica': True})
+
+        self.batch._start_matching()
+        self.assertIn(move_line, self.batch.match_ids.suggested_move_line_id)
+
+        # The item leaves the open items after the replica was read
+        candidates = [{'move_line_id': move_line.id, 'score': 100.0}]
+        move_line.move_id.button_draft()
+        result = self.batch._drop_stale_candidates([(st_line, candidates)])
+        self.assertEqual(result, [(st_line, [])])
+
+    def test_statistics_are_maintained_incrementally(self):
+        """Test the batch counters and dashboard after matching and selection."""
+        self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-1')
+        self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-2')
+        self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-3')
+        self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV-1')
+        self._create_statement_line(5555.00)
+        self.assertEqual(self.batch.line_count, 2)
+        self.assertEqual(self.batch.unmatched_line_count, 2)
+
+        # One line per chunk: each chunk adds its own delta to the counters
+        with patch.object(type(self.batch), 'MATCHING_CHUNK_SIZE', 1):
+            self.batch._start_matching()
+
+        self.assertEqual(self.batch.matched_line_count, 1)
+        self.assertEqual(self.batch.unmatched_line_count, 1)
+        self.assertEqual(self.batch.match_count, len(self.batch.match_ids))
+        self.assertEqual(self.batch.match_count, 3)
+        self.assertEqual(
+            self.batch.safe_match_count,
+            len(self.batch.match_ids.filtered(lambda m: m.confidence_class == 'safe')),
+        )
+        # Several proposals for one line must not push the percentage past 100
+        self.assertEqual(self.batch.matched_percentage, 50.0)
+
+        self.batch.match_ids[:1].write({'is_selected': True})
+        self.assertEqual(self.batch.selected_match_count, 1)
+
+        dashboard = self.env['mass.reconcile.batch'].get_dashboard_data([('id', '=', self.batch.id)])
+        self.assertEqual(dashboard['totals']['batch_count'], 1)
+        self.assertEqual(dashboard['batches'][0]['selected_match_count'], 1)
+        self.assertEqual(dashboard['totals']['matched_percentage'], 50.0)
+
+        # A full recount agrees with the incremental counters
+        before = {f: self.batch[f] for f in self.batch.STATISTICS_FIELDS}
+        self.batch._refresh_statistics()
+        self.assertEqual({f: self.batch[f] for f in self.batch.STATISTICS_FIELDS}, before)
+
+    def test_review_page_keyset_pagination(self):
+        """Test that review pages walk every proposal once, best score first, grouped by line."""
+        for index, amount in enumerate((100.00, 200.00, 300.00)):
+            ref = f'PAY-{index}'
+            self._create_posted_move_line(amount, partner=self.partner, payment_ref=ref)
+            self._create_statement_line(amount, partner=self.partner, payment_ref=ref)
+        self._create_posted_move_line(400.00)
+        self._create_statement_line(400.00, payment_ref='Unrelated')
+        self.batch._start_matching()
+
+        seen = []
+        cursor = None
+        while True:
+            page = self.batch.get_review_page(after=cursor, limit=2)
+            for line in page['lines']:
+                proposals = self.env['mass.reconcile.match'].browse(p['id'] for p in line['proposals'])
+                self.assertEqual(proposals.statement_line_id.ids, [line['id']])
+                seen += line['proposals']
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(sorted(proposal['id'] for proposal in seen), sorted(self.batch.match_ids.ids))
+        scores = [proposal['match_score'] for proposal in seen]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        safe_page = self.batch.get_review_page(confidence_class='safe')
+        safe_ids = [proposal['id'] for line in safe_page['lines'] for proposal in line['proposals']]
+        self.assertEqual(
+            sorted(safe_ids),
+            sorted(self.batch.match_ids.filtered(lambda m: m.confidence_class == 'safe').ids),
+        )
+        self.assertIsNone(safe_page['next_cursor'])
+
+    def test_review_page_filters_and_pages_proposals(self):
+        """Test that the class filter and the cursor follow the proposals, not their line's best score."""
+        Match = self.env['mass.reconcile.match']
+        matches = {}
+        for ref, scores in (('A', (100.0, 60.0)), ('B', (85.0,)), ('C', (90.0, 70.0))):
+            line = self._create_statement_line(100.00, payment_ref=ref)
+            line.write({'match_state': 'matched', 'match_score': scores[0]})
+            for score in scores:
+                move_line = self._create_posted_move_line(100.00)
+                matches[ref, score] = Match.create({
+                    'batch_id': self.batch.id,
+                    'statement_line_id': line.id,
+                    'suggested_move_id': move_line.move_id.id,
+                    'suggested_move_line_id': move_line.id,
+                    'match_score': score,
+                    'match_type': 'partial',
+                })
+
+        # Line A's best proposal is safe, its second one is still listed as doubtful
+        page = self.batch.get_review_page(confidence_class='doubtful')
+        self.assertEqual(
+            [(line['payment_ref'], [p['id'] for p in line['proposals']]) for line in page['lines']],
+            [('C', [matches['C', 70.0].id]), ('A', [matches['A', 60.0].id])],
+        )
+
+        page = self.batch.get_review_page(limit=2)
+        seen = [p['id'] for line in page['lines'] for p in line['proposals']]
+        self.assertEqual(seen, [matches['A', 100.0].id, matches['C', 90.0].id])
+
+        # Rescoring between pages: lines leave the cursor alone, a proposal
+        # rescored below the cursor is still returned once
+        matches['A', 100.0].statement_line_id.write({'match_score': 50.0})
+        matches['C', 90.0].statement_line_id.write({'match_score': 0.0})
+        matches['A', 60.0].write({'match_score': 65.0})
+        cursor = page['next_cursor']
+        while cursor:
+            page = self.batch.get_review_page(after=cursor, limit=2)
+            seen += [p['id'] for line in page['lines'] for p in line['proposals']]
+            cursor = page['next_cursor']
+        self.assertEqual(seen, [
+            matches['A', 100.0].id, matches['C', 90.0].id, matches['B', 85.0].id,
+            matches['C', 70.0].id, matches['A', 60.0].id,
+        ])
+
+    def test_export_proposals_csv(self):
+        """Test the streaming CSV export of proposals with its filters."""
+        self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-1')
+        self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV-1')
+        self.batch._start_matching()
+        self.batch.match_ids[:1].write({'is_selected': True})
+
+        output = io.BytesIO()
+        count = self.env['mass.reconcile.export'].export_proposals(
+            output, file_format='csv', batch_ids=[self.batch.id],
+        )
+        rows = list(csv.DictReader(io.StringIO(output.getvalue().decode())))
+
+        self.assertEqual(count, len(self.batch.match_ids))
+        self.assertEqual(len(rows), count)
+        self.assertEqual(rows[0]['batch'], self.batch.name)
+        self.assertIn('amount_score', rows[0])
+        self.assertIn('True', [row['is_selected'] for row in rows])
+
+        future = self.test_date + timedelta(days=365)
+        empty = io.BytesIO()
+        self.assertEqual(
+            self.env['mass.reconcile.export'].export_proposals(empty, date_from=future), 0,
+        )
+
+    def test_import_csv_and_match_chunks(self):
+        """Test that a streamed CSV import creates batch lines and matches them."""
+        move_line = self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-55')
+        content = (
+            "date,amount,reference,partner_name\n"
+            f"{self.test_date},1000.00,INV-55,Test Partner\n"
+            f"{self.test_date},-25.50,Bank fees,\n"
+        ).encode()
+
+        with patch.object(type(self.env['mass.reconcile.import']), 'IMPORT_CHUNK_SIZE', 1):
+            count = self.batch.action_import_statement_file(
+                io.BytesIO(content), file_format='csv', match=True,
+            )
+
+        self.assertEqual(count, 2)
+        self.assertEqual(self.batch.line_count, 2)
+        self.assertEqual(self.batch.state, 'review')
+        self.assertTrue(all(self.batch.statement_line_ids.mapped('match_processed')))
+        self.assertIn(move_line, self.batch.match_ids.suggested_move_line_id)
+
+    def test_import_reports_partial_file(self):
+        """Test that an invalid entry after committed chunks leaves a partial import note."""
+        content = (
+            "date,amount,reference,currency\n"
+            f"{self.test_date},10.00,Coffee,{self.currency.name}\n"
+            f"{self.test_date},20.00,Lunch,XXX\n"
+        ).encode()
+
+        with patch.object(type(self.env['mass.reconcile.import']), 'IMPORT_CHUNK_SIZE', 1):
+            with self.assertRaises(ValidationError):
+                self.batch.action_import_statement_file(io.BytesIO(content), file_format='csv')
+
+        self.assertEqual(self.batch.line_count, 1)
+        self.assertTrue(self.batch.message_ids.filtered(
+            lambda message: message.subject == 'Partial Statement Import'
+        ))
+
+    def test_import_rejects_entries_without_date(self):
+        """Test that entries without a usable date are reported as rejected rows."""
+        content = (
+            "date,amount,reference\n"
+            f"{self.test_date},10.00,Coffee\n"
+            ",20.00,Lunch\n"
+            "2024-13-45,30.00,Dinner\n"
+            f"{self.test_date},40.00,Taxi\n"
+        ).encode()
+
+        count = self.batch.action_import_statement_file(io.BytesIO(content), file_format='csv')
+
+        self.assertEqual(count, 2)
+        self.assertEqual(self.batch.line_count, 2)
+        report = self.batch.message_ids.filtered(
+            lambda message: message.subject == 'Partial Statement Import'
+        )
+        self.assertEqual(len(report), 1)
+        self.assertIn('Entry 2: no booking date', report.body)
+        self.assertIn('Entry 3: invalid booking date', report.body)
+
+    def test_import_camt053_entries(self):
+        """Test the iterative CAMT.053 parser on credit and debit entries."""
+        content = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+  <BkToCstmrStmt><Stmt>
+    <Ntry>
+      <Amt Ccy="USD">150.00</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+      <BookgDt><Dt>2024-03-01</Dt></BookgDt>
+      <AcctSvcrRef>BANK-20240301-001</AcctSvcrRef>
+      <NtryDtls><TxDtls>
+        <RltdPties><Dbtr><Nm>ACME SL</Nm></Dbtr><DbtrAcct><Id><IBAN>ES7620770024003102575766</IBAN></Id></DbtrAcct></RltdPties>
+        <RmtInf><Ustrd>INV/2024/0001</Ustrd></RmtInf>
+      </TxDtls></NtryDtls>
+    </Ntry>
+    <Ntry>
+      <Amt Ccy="USD">20.00</Amt><CdtDbtInd>DBIT</CdtDbtInd>
+      <BookgDt><Dt>2024-03-02</Dt></BookgDt>
+      <AddtlNtryInf>Fees</AddtlNtryInf>
+    </Ntry>
+  </Stmt></BkToCstmrStmt>
+</Document>"""
+        entries = list(self.env['mass.reconcile.import']._iter_camt053(io.BytesIO(content)))
+
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]['amount'], 150.00)
+        self.assertEqual(entries[0]['payment_ref'], 'INV/2024/0001')
+        self.assertEqual(entries[0]['partner_name'], 'ACME SL')
+        self.assertEqual(entries[0]['account_number'], 'ES7620770024003102575766')
+        self.assertEqual(entries[0]['transaction_ref'], 'BANK-20240301-001')
+        self.assertEqual(entries[1]['amount'], -20.00)
+        self.assertEqual(entries[1]['payment_ref'], 'Fees')
+
+    def test_duplicate_lines_are_flagged_and_not_matched(self):
+        """Test that a re-sent statement line is flagged and left out of matching."""
+        self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-9')
+        original = self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV-9')
+        duplicate = self._create_statement_line(1000.00, partner=self.partner, payment_ref=' inv-9 ')
+        self.assertEqual(original.content_hash, duplicate.content_hash)
+
+        self.batch._start_matching()
+
+        self.assertEqual(duplicate.duplicate_of_id, original)
+        self.assertFalse(original.duplicate_of_id)
+        self.assertEqual(self.batch.duplicate_line_count, 1)
+        self.assertEqual(self.batch.match_ids.statement_line_id, original)
+
+    def test_import_skips_duplicate_lines(self):
+        """Test that the importer skips lines already imported, not repeats within a file."""
+        self.batch.duplicate_policy = 'skip'
+        content = (
+            "date,amount,reference\n"
+            f"{self.test_date},10.00,Coffee\n"
+            f"{self.test_date},10.00,Coffee\n"
+        ).encode()
+        longer = content + f"{self.test_date},10.00,Coffee\n".encode()
+
+        with patch.object(type(self.env['mass.reconcile.import']), 'IMPORT_CHUNK_SIZE', 1):
+            self.assertEqual(self.batch.action_import_statement_file(io.BytesIO(content), file_format='csv'), 2)
+        self.assertEqual(self.batch.action_import_statement_file(io.BytesIO(content), file_format='csv'), 0)
+        self.assertEqual(self.batch.action_import_statement_file(io.BytesIO(longer), file_format='csv'), 1)
+        self.assertEqual(self.batch.line_count, 3)
+
+    def test_repeats_within_one_import_are_not_flagged(self):
+        """Test that identical lines of one file are only flagged when the file is re-sent."""
+        content = (
+            "date,amount,reference\n"
+            f"{self.test_date},10.00,Coffee\n"
+            f"{self.test_date},10.00,Coffee\n"
+        ).encode()
+
+        self.batch.action_import_statement_file(io.BytesIO(content), file_format='csv')
+        first_import = self.batch.statement_line_ids
+        self.assertEqual(len(first_import), 2)
+        self.assertFalse(first_import.duplicate_of_id)
+        self.batch._start_matching()
+        self.assertFalse(first_import.duplicate_of_id)
+        self.assertEqual(self.batch.duplicate_line_count, 0)
+
+        self.batch.action_import_statement_file(io.BytesIO(content), file_format='csv')
+        second_import = self.batch.statement_line_ids - first_import
+        self.assertEqual(second_import.duplicate_of_id, first_import)
+        self.assertEqual(len(second_import.duplicate_of_id), 2)
+        self.assertEqual(self.batch.duplicate_line_count, 2)
+
+    def test_content_hash_sql_matches_python(self):
+        """Test that the set-based hash fill gives the digests of the ORM compute."""
+        lines = self.env['account.bank.statement.line'].create([{
+            'journal_id': self.bank_journal.id,
+            'date': self.test_date,
+            'amount': amount,
+            'payment_ref': ref,
+            'partner_name': name,
+            'account_number': account,
+            'transaction_ref': transaction_ref,
+        } for amount, ref, name, account, transaction_ref in (
+            (10.00, '  Coffee\tSHOP  ', 'Café  S.L.', False, False),
+            (-1234.5, 'INV/2024/1', False, 'es76 2077-0024', 'TX-1'),
+            (0.0, '/', False, False, False),
+        )])
+        lines.flush_recordset()
+        expected = {line.id: line.content_hash for line in lines}
+        self.env.cr.execute(
+            "UPDATE account_bank_statement_line SET content_hash = NULL WHERE id = ANY(%s)", (lines.ids,)
+        )
+
+        lines._fill_content_hashes()
+
+        self.assertEqual({line.id: line.content_hash for line in lines}, expected)
+
+    def test_content_hash_tells_transactions_apart(self):
+        """Test that the bank transaction id separates lines with the same content."""
+        first, second, resent = self.env['account.bank.statement.line'].create([{
+            'journal_id': self.bank_journal.id,
+            'date': self.test_date,
+            'amount': 10.00,
+            'payment_ref': 'Coffee',
+            'transaction_ref': ref,
+        } for ref in ('TX-1', 'TX-2', 'TX-1')])
+
+        self.assertNotEqual(first.content_hash, second.content_hash)
+        self.assertEqual(first.content_hash, resent.content_hash)
+
+    def test_continuous_matching_queue(self):
+        """Test that continuous journals queue new lines and re-score them on new items."""
+        Queue = self.env['mass.reconcile.queue']
+        self.bank_journal_2.mass_reconcile_continuous = True
+        statement = self.env['account.bank.statement'].create({
+            'name': 'Continuous Statement',
+            'journal_id': self.bank_journal_2.id,
+            'date': self.test_date,
+        })
+        move_line = self._create_posted_move_line(300.00, partner=self.partner, payment_ref='INV-300')
+        matched_line, waiting_line = self.env['account.bank.statement.line'].create([{
+            'statement_id': statement.id,
+            'payment_ref': ref,
+            'partner_id': self.partner.id,
+            'amount': amount,
+            'date': self.test_date,
+        } for amount, ref in ((300.00, 'INV-300'), (450.00, 'INV-450'))])
+
+        batch = self.bank_journal_2.mass_reconcile_batch_id
+        self.assertTrue(batch)
+        self.assertEqual(matched_line.batch_id, batch)
+        self.assertEqual(Queue.search_count([]), 2)
+
+        Queue._cron_process_queue()
+        self.assertFalse(Queue.search_count([]))
+        self.assertIn(move_line, batch.match_ids.suggested_move_line_id)
+        self.assertEqual(waiting_line.match_state, 'unmatched')
+
+        # Posting an item the waiting line could match queues it again
+        new_item = self._create_posted_move_line(450.00, partner=self.partner, payment_ref='INV-450')
+        self.assertEqual(Queue.search([]).statement_line_id, waiting_line)
+        Queue._cron_process_queue()
+        self.assertIn(new_item, batch.match_ids.filtered(
+            lambda match: match.statement_line_id == waiting_line
+        ).suggested_move_line_id)
+
+    def test_rerun_warm_starts_from_candidate_cache(self):
+        """Test that a re-run keeps open cached candidates and finds the new items."""
+        Cache = self.env['mass.reconcile.candidate.cache']
+        first_item = self._create_posted_move_line(700.00, partner=self.partner, payment_ref='INV-700')
+        st_line = self._create_statement_line(700.00, partner=self.partner, payment_ref='INV-700')
+        self.batch._start_matching()
+
+        entry = Cache.search([('statement_line_id', '=', st_line.id)])
+        self.assertEqual(len(entry), 1)
+        self.assertEqual([c['move_line_id'] for c in entry.candidates], first_item.ids)
+
+        # One cached candidate leaves the open items, another item is posted
+        second_item = self._create_posted_move_line(700.00, partner=self.partner, payment_ref='INV-700')
+        first_item.move_id.button_draft()
+        with patch.object(
+            type(self.env['mass.reconcile.engine']), '_search_amount_candidates',
+            autospec=True, side_effect=type(self.env['mass.reconcile.engine'])._search_amount_candidates,
+        ) as search:
+            self.batch._start_matching()
+        self.assertTrue(all(
+            call.args[0].env.context.get('mass_reconcile_open_item_ids') is not None
+            for call in search.call_args_list
+        ))
+        self.assertEqual(self.batch.match_ids.suggested_move_line_id, second_item)
+        self.assertTrue(entry.snapshot)
+
+    def test_cache_researches_items_committed_after_the_search(self):
+        """Test that items of transactions running during a cached search are found on re-run."""
+        Cache = self.env['mass.reconcile.candidate.cache']
+        st_line = self._create_statement_line(710.00, partner=self.partner, payment_ref='INV-710')
+        self.batch._start_matching()
+        entry = Cache.search([('statement_line_id', '=', st_line.id)])
+        self.assertFalse(entry.candidates)
+
+        # The item's transaction was still running when the candidates were
+        # searched: its row is not in the search snapshot, whatever its id
+        item = self._create_posted_move_line(710.00, partner=self.partner, payment_ref='INV-710')
+        self.env['mass.reconcile.open.item'].flush_model()
+        self.env.cr.execute(
+            "SELECT sync_xid::text::bigint FROM mass_reconcile_open_item WHERE move_line_id = %s", (item.id,),
+        )
+        xid = self.env.cr.fetchone()[0]
+        self.env.cr.execute(
+            "UPDATE mass_reconcile_candidate_cache SET snapshot = %s WHERE id = %s",
+            (f"{xid}:{xid + 1}:{xid}", entry.id),
+        )
+        entry.invalidate_recordset()
+
+        self.batch._start_matching()
+
+        self.assertEqual(self.batch.match_ids.suggested_move_line_id, item)
+
+    def test_sharded_matching_across_journals(self):
+        """Test that the orchestrator gathers unbatched lines and reports per shard."""
+        self.env.user.write({'company_ids': [Command.link(self.company.id)]})
+        self._create_posted_move_line(900.00, partner=self.partner, payment_ref='INV-900')
+        self._create_statement_line(900.00, partner=self.partner, payment_ref='INV-900')
+        loose_line = self.env['account.bank.statement.line'].create({
+            'journal_id': self.bank_journal_2.id,
+            'payment_ref': 'Loose payment',
+            'amount': 120.00,
+            'date': self.test_date,
+        })
+
+        Orchestrator = self.env['mass.reconcile.orchestrator']
+        result = Orchestrator.run_sharded_matching(company_ids=self.company.ids)
+        self.assertIn(self.batch.id, result['batch_ids'])
+        self.assertTrue(loose_line.batch_id)
+        self.assertEqual(loose_line.batch_id.journal_id, self.bank_journal_2)
+        self.assertTrue(all(r['waiting'] for r in Orchestrator.get_shard_reports(result['batch_ids'])))
+
+        # A shard worker cron runs them
+        Orchestrator._cron_run_scheduled_shards()
+
+        reports = {report['batch_id']: report for report in Orchestrator.get_shard_reports(result['batch_ids'])}
+        for batch in self.batch | loose_line.batch_id:
+            report = reports[batch.id]
+            self.assertFalse(report['waiting'])
+            self.assertFalse(report['error'])
+            self.assertEqual(report['state'], 'review')
+            self.assertEqual(report['line_count'], 1)
+            self.assertGreater(report['matching_seconds'], 0.0)
+        self.assertTrue(self.batch.match_ids)
+
+        # A second run the same day, once the first batch is in review, gets a free name
+        self.env['account.bank.statement.line'].create({
+            'journal_id': self.bank_journal_2.id,
+            'payment_ref': 'Late payment',
+            'amount': 130.00,
+            'date': self.test_date,
+        })
+        second = Orchestrator.run_sharded_matching(company_ids=self.company.ids)
+        late_batch = self.env['mass.reconcile.batch'].browse(second['batch_ids']).filtered(
+            lambda batch: batch.journal_id == self.bank_journal_2
+        )
+        self.assertEqual(late_batch.name, f"{loose_line.batch_id.name} (2)")
+        self.assertIn('prepare', result['timings'])
+
+    def test_best_matches_written_back_per_chunk(self):
+        """Test that each chunk's best matches are written back in a single call."""
+        items = {}
+        for amount in (100.00, 200.00, 300.00):
+            items[amount] = self._create_posted_move_line(amount, partner=self.partner, payment_ref=f'WB-{amount}')
+            self._create_statement_line(amount, partner=self.partner, payment_ref=f'WB-{amount}')
+        self._create_statement_line(999.00)
+
+        Batch = type(self.batch)
+        with patch.object(Batch, 'MATCHING_CHUNK_SIZE', 2), \
+                patch.object(Batch, '_write_back_best_matches', autospec=True,
+                             side_effect=Batch._write_back_best_matches) as write_back:
+            self.batch._start_matching()
+
+        self.assertEqual(write_back.call_count, 2)
+        for line in self.batch.statement_line_ids:
+            if line.amount == 999.00:
+                self.assertEqual(line.match_state, 'unmatched')
+                continue
+            self.assertEqual(line.match_state, 'matched')
+            self.assertEqual(line.suggested_move_id, items[line.amount].move_id)
+            self.assertEqual(line.match_score, max(line.batch_id.match_ids.filtered(
+                lambda match: match.statement_line_id == line
+            ).mapped('match_score')))
+        self.assertEqual(self.batch.matched_line_count, 3)
+        self.assertEqual(self.batch.unmatched_line_count, 1)
+
+    def test_continuous_batch_rotates_with_unique_name(self):
+        """Test that a reconciled continuous batch is replaced by one with a free name."""
+        self.bank_journal_2.mass_reconcile_continuous = True
+        line_vals = {'journal_id': self.bank_journal_2.id, 'amount': 10.00, 'date': self.test_date}
+        self.env['account.bank.statement.line'].create(dict(line_vals, payment_ref='First'))
+        first_batch = self.bank_journal_2.mass_reconcile_batch_id
+        first_batch.state = 'reconciled'
+
+        self.env['account.bank.statement.line'].create(dict(line_vals, payment_ref='Second'))
+
+        second_batch = self.bank_journal_2.mass_reconcile_batch_id
+        self.assertNotEqual(second_batch, first_batch)
+        self.assertEqual(second_batch.name, f"{first_batch.name} (2)")
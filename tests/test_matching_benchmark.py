@@ -0,0 +1,88 @@
+"""Benchmarks for batch matching (run with --test-tags mass_reconcile_benchmark)."""
+
+import tracemalloc
+from unittest.mock import patch
+from odoo.tests import tagged
+
+from .common import MassReconcileCommon
+from .load_harness import LoadHarness, LoadReport
+
+
+@tagged('mass_reconcile_benchmark', '-standard')
+class TestMatchingBenchmark(MassReconcileCommon):
+    """Resource usage of matching runs (_start_matching) on growing batches."""
+
+    CHUNK_SIZE = 25
+
+    def _peak_memory_for_batch(self, line_count):
+        """Create a batch of line_count lines and return the matching peak memory."""
+        batch = self.env['mass.reconcile.batch'].create({
+            'name': f'Benchmark {line_count}',
+            'company_id': self.company.id,
+            'journal_id': self.bank_journal.id,
+        })
+        for i in range(line_count):
+            amount = 100.0 + i
+            self._create_posted_move_line(amount, payment_ref=f'BENCH-{line_count}-{i}')
+            line = self._create_statement_line(amount, payment_ref=f'BENCH-{line_count}-{i}')
+            line.batch_id = batch
+        self.env.flush_all()
+        self.env.invalidate_all()
+
+        batch_model = type(self.env['mass.reconcile.batch'])
+        with patch.object(batch_model, 'MATCHING_CHUNK_SIZE', self.CHUNK_SIZE):
+            tracemalloc.start()
+            batch._start_matching()
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return peak
+
+    def test_peak_memory_flat_across_batch_sizes(self):
+        """Peak memory must not grow with the number of chunks processed."""
+        small_peak = self._peak_memory_for_batch(self.CHUNK_SIZE * 2)
+        large_peak = self._peak_memory_for_batch(self.CHUNK_SIZE * 8)
+
+        # 4x the lines may cost a little more (ids, chatter), not 4x the memory
+        self.assertLess(
+            large_peak, small_peak * 1.5,
+            f"Peak memory grew from {small_peak} to {large_peak} bytes",
+        )
+
+
+@tagged('mass_reconcile_benchmark', '-standard')
+class TestConcurrentLoad(MassReconcileCommon):
+    """Smoke load of concurrent matching runs and reviewers through the load harness."""
+
+    def test_concurrent_runs_and_reviewers(self):
+        """The harness reports latencies and contention for every operation."""
+        batches = self.batch
+        batches |= self.env['mass.reconcile.batch'].create({
+            'name': 'Load Batch',
+            'company_id': self.company.id,
+            'journal_id': self.bank_journal.id,
+        })
+        for i, batch in enumerate(batches.ids * 5):
+            amount = 500.0 + i
+            self._create_posted_move_line(amount, partner=self.partner, payment_ref=f'LOAD-{i}')
+            line = self._create_statement_line(amount, partner=self.partner, payment_ref=f'LOAD-{i}')
+            line.batch_id = batch
+        self.env.flush_all()
+
+        # Harness cursors share the test transaction
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        summary = LoadHarness(self.registry, self.env.uid, batches.ids).run(
+            runs=2, reviewers=2, review_iterations=5,
+        )
+        self.env.invalidate_all()
+
+        self.assertEqual(summary['operations']['matching_run']['count'], 2)
+        self.assertFalse(summary['contention'].get('errors'), summary['tracebacks'])
+        self.assertEqual(
+            summary['operations'].get('review_toggle', {}).get('count', 0)
+            + summary['contention'].get('idle_reviews', 0)
+            + summary['contention'].get('stale_reviews', 0)
+            + sum(summary['contention'].get(outcome, 0) for outcome in LoadReport.CLAIM_OUTCOMES.values()),
+            10,
+        )
+        self.assertEqual(batches.mapped('state'), ['review', 'review'])
@@ -1,141 +1,19 @@
 """Tests for matching engine and scorer."""
 
-from datetime import datetime, timedelta
-from odoo.tests.common import TransactionCase
-from odoo.tools import float_compare
+from datetime import timedelta
+from unittest.mock import patch
 
+from odoo.exceptions import ValidationError
 
-class TestMatchingEngine(TransactionCase):
-    """Test cases for mass.reconcile.engine and mass.reconcile.scorer."""
-
-    @classmethod
-    def setUpClass(cls):
-        """Set up test fixtures."""
-        super().setUpClass()
-
-        # Create test company
-        cls.company = cls.env['res.company'].create({
-            'name': 'Test Company',
-        })
-
-        # Create test currency
-        cls.currency = cls.env['res.currency'].search([('name', '=', 'USD')], limit=1)
-        if not cls.currency:
-            cls.currency = cls.env['res.currency'].create({
-                'name': 'USD',
-                'symbol': '$',
-                'rounding': 0.01,
-            })
-
-        # Create test partner
-        cls.partner = cls.env['res.partner'].create({
-            'name': 'Test Partner',
-            'company_id': cls.company.id,
-        })
-
-        # Create bank journals
-        cls.bank_journal = cls.env['account.journal'].create({
-            'name': 'Bank Journal 1',
-            'code': 'BNK1',
-            'type': 'bank',
-            'company_id': cls.company.id,
-            'currency_id': cls.currency.id,
-        })
-
-        cls.bank_journal_2 = cls.env['account.journal'].create({
-            'name': 'Bank Journal 2',
-            'code': 'BNK2',
-            'type': 'bank',
-            'company_id': cls.company.id,
-            'currency_id': cls.currency.id,
-        })
-
-        # Create reconcilable account
-        cls.account_receivable = cls.env['account.account'].create({
-            'name': 'Test Receivable',
-            'code': 'TEST_AR',
-            'account_type': 'asset_receivable',
-            'reconcile': True,
-            'company_id': cls.company.id,
-        })
-
-        cls.account_bank = cls.env['account.account'].create({
-            'name': 'Test Bank',
-            'code': 'TEST_BNK',
-            'account_type': 'asset_cash',
-            'reconcile': True,
-            'company_id': cls.company.id,
-        })
-
-        # Create test batch
-        cls.batch = cls.env['mass.reconcile.batch'].create({
-            'name': 'Test Batch',
-            'company_id': cls.company.id,
-            'journal_id': cls.bank_journal.id,
-        })
-
-        # Create bank statement
-        cls.statement = cls.env['account.bank.statement'].create({
-            'name': 'Test Statement',
-            'journal_id': cls.bank_journal.id,
-            'date': datetime.now().date(),
-        })
-
-        # Reference date for tests
-        cls.test_date = datetime.now().date()
+from ..models.mass_reconcile_partner_key import (
+    normalize_account_number,
+    normalize_partner_name,
+)
+from .common import MassReconcileCommon
 
-        # Initialize engine and scorer
-        cls.engine = cls.env['mass.reconcile.engine']
-        cls.scorer = cls.env['mass.reconcile.scorer']
 
-    def _create_posted_move_line(self, amount, partner=None, payment_ref=None,
-                                   date=None, account=None, journal=None):
-        """Helper to create a posted move line."""
-        if date is None:
-            date = self.test_date
-        if account is None:
-            account = self.account_receivable
-        if journal is None:
-            journal = self.bank_journal
-
-        move = self.env['account.move'].create({
-            'journal_id': journal.id,
-            'date': date,
-            'state': 'draft',
-            'move_type': 'entry',
-            'company_id': self.company.id,
-            'line_ids': [
-                (0, 0, {
-                    'account_id': account.id,
-                    'partner_id': partner.id if partner else False,
-                    'payment_ref': payment_ref,
-                    'debit': amount if amount > 0 else 0,
-                    'credit': -amount if amount < 0 else 0,
-                }),
-                (0, 0, {
-                    'account_id': self.account_bank.id,
-                    'debit': -amount if amount < 0 else 0,
-                    'credit': amount if amount > 0 else 0,
-                }),
-            ],
-        })
-        move.action_post()
-        # Return the reconcilable line
-        return move.line_ids.filtered(lambda l: l.account_id.reconcile)
-
-    def _create_statement_line(self, amount, partner=None, payment_ref=None, date=None):
-        """Helper to create a bank statement line."""
-        if date is None:
-            date = self.test_date
-
-        return self.env['account.bank.statement.line'].create({
-            'statement_id': self.statement.id,
-            'payment_ref': payment_ref or 'Test payment',
-            'partner_id': partner.id if partner else False,
-            'amount': amount,
-            'date': date,
-            'batch_id': self.batch.id,
-        })
+class TestMatchingEngine(MassReconcileCommon):
+    """Test cases for mass.reconcile.engine and mass.reconcile.scorer."""
 
     def test_exact_amount_match(self):
         """Test that engine finds move line with exact matching amount."""
@@ -391,3 +269,522 @@ class TestMatchingEngine(TransactionCase):
         # Amount (50%) + Date (5%) = 55% minimum
         self.assertGreaterEqual(score2, 55.0, "Amount + date should score at least 55")
         self.assertLess(score2, 100.0, "Partial match should score less than 100")
+
+    def test_factor_scores_combine_to_score(self):
+        """Test that the stored factor breakdown reproduces the weighted score."""
+        st_line = self._create_statement_line(
+            1000.00, partner=self.partner, payment_ref='Payment INV-777'
+        )
+        move_line = self._create_posted_move_line(
+            1000.00, partner=self.partner, payment_ref='INV-777'
+        )
+
+        factors = self.scorer.calculate_factor_scores(st_line, move_line)
+
+        self.assertEqual(factors['amount'], 100.0)
+        self.assertEqual(factors['partner'], 100.0)
+        self.assertEqual(factors['reference'], 75.0)
+        self.assertEqual(
+            self.scorer.combine_factor_scores(factors),
+            self.scorer.calculate_score(st_line, move_line),
+        )
+
+    def test_scorer_short_circuits_below_floor(self):
+        """Test that cheap factors rule a pair out before the amount is scored."""
+        other_partner = self.env['res.partner'].create({'name': 'Other Partner'})
+        st_line = self._create_statement_line(1000.00, partner=self.partner, payment_ref='Unrelated')
+        move_line = self._create_posted_move_line(1000.00, partner=other_partner, payment_ref='INV-1')
+        Scorer = type(self.scorer)
+
+        with patch.object(Scorer, '_score_amount', autospec=True, return_value=100.0) as score_amount:
+            factors = self.scorer.calculate_factor_scores(
+                st_line, move_line, floor=self.scorer.PROBABLE_THRESHOLD,
+            )
+        self.assertIsNone(factors)
+        score_amount.assert_not_called()
+
+        # A floor the pair can still reach evaluates every factor
+        factors = self.scorer.calculate_factor_scores(st_line, move_line, floor=50.0)
+        self.assertEqual(set(factors), set(self.scorer.STORED_FACTORS))
+
+    def test_scorer_evaluates_decisive_factors_first(self):
+        """Test that factors run by weight per cost and that the floor is configurable."""
+        names = [name for name, _weight, _method in self.scorer._get_score_factors()]
+        self.assertLess(names.index('amount'), names.index('reference'))
+        self.assertLess(names.index('amount'), names.index('date'))
+
+        # No floor by default: doubtful candidates are kept
+        self.assertEqual(self.scorer.SCORE_FLOOR, 0.0)
+        self.assertEqual(self.batch.score_floor, 0.0)
+        st_line = self._create_statement_line(1000.00, payment_ref='Unrelated')
+        doubtful_line = self._create_posted_move_line(700.00)
+        factors = self.scorer.calculate_factor_scores(st_line, doubtful_line)
+        self.assertEqual(set(factors), set(self.scorer.STORED_FACTORS))
+        self.assertLess(self.scorer.calculate_score(st_line, doubtful_line), 50.0)
+
+        move_line = self._create_posted_move_line(1000.00)
+        floored = self.scorer.with_context(mass_reconcile_score_floor=99.0)
+        self.assertIsNone(floored.calculate_factor_scores(st_line, move_line))
+        self.assertGreater(floored.calculate_score(st_line, move_line), 0.0)
+
+    def test_scorer_custom_factor(self):
+        """Test that a registered factor is evaluated and weighted without code changes."""
+        st_line = self._create_statement_line(1000.00, payment_ref='Unrelated')
+        move_line = self._create_posted_move_line(1000.00)
+        Scorer = type(self.scorer)
+        weights = {'amount': 0.4, 'partner': 0.25, 'reference': 0.2, 'date': 0.05, 'iban': 0.1}
+
+        with patch.object(Scorer, '_score_iban', create=True,
+                          new=lambda self, st_line, move_line, matching_context=None: 100.0), \
+                patch.dict(Scorer.FACTORS, {'iban': (1, '_score_iban')}), \
+                patch.dict(Scorer.WEIGHTS, weights):
+            factors = self.scorer.calculate_factor_scores(st_line, move_line)
+            self.assertEqual(factors['iban'], 100.0)
+            self.assertAlmostEqual(self.scorer._unstored_factor_bonus(factors), 10.0)
+            self.assertAlmostEqual(
+                self.scorer.calculate_score(st_line, move_line),
+                100.0 * 0.4 + factors['date'] * 0.05 + 10.0,
+            )
+
+    def test_reweight_scores_without_rematching(self):
+        """Test that re-weighting recomputes scores and classes from stored factors."""
+        st_line = self._create_statement_line(1000.00, payment_ref='Unrelated')
+        move_line = self._create_posted_move_line(1000.00, date=self.test_date)
+        self.batch._start_matching()
+
+        match = self.batch.match_ids.filtered(
+            lambda m: m.suggested_move_line_id == move_line
+        )
+        self.assertEqual(match.amount_score, 100.0)
+        self.assertEqual(match.confidence_class, 'doubtful')
+
+        # Put all the weight on the amount factor: the match becomes safe
+        weights = {'amount': 1.0, 'partner': 0.0, 'reference': 0.0, 'date': 0.0}
+        with patch.dict(type(self.scorer).WEIGHTS, weights):
+            self.batch.action_reweight_scores()
+
+        self.assertEqual(match.match_score, 100.0)
+        self.assertEqual(match.confidence_class, 'safe')
+        self.assertEqual(st_line.match_score, 100.0)
+
+    def test_partner_name_normalization(self):
+        """Test that legal forms, accents and punctuation do not affect name keys."""
+        self.assertEqual(normalize_partner_name('ACME, S.L.'), 'acme')
+        self.assertEqual(normalize_partner_name('Acme SL'), 'acme')
+        self.assertEqual(normalize_partner_name('Café Müller GmbH'), 'cafe muller')
+        self.assertEqual(normalize_account_number('es91 2100-0418 4502'), 'ES91210004184502')
+
+    def test_partner_inference_scopes_search(self):
+        """Test that a line without partner is resolved from its counterparty account."""
+        self.env['res.partner.bank'].create({
+            'acc_number': 'ES91 2100 0418 4502 0005 1332',
+            'partner_id': self.partner.id,
+        })
+        self.env['mass.reconcile.partner.key'].rebuild_index()
+
+        st_line = self._create_statement_line(1000.00)
+        st_line.account_number = 'ES9121000418450200051332'
+        matching_line = self._create_posted_move_line(1000.00, partner=self.partner)
+
+        self.batch._infer_statement_line_partners()
+        self.assertEqual(st_line.inferred_partner_id, self.partner)
+
+        domain = self.engine._build_base_domain(st_line)
+        self.assertIn(('partner_id', '=', self.partner.id), domain)
+
+        candidate_ids = [c['move_line_id'] for c in self.engine.find_candidates(st_line)]
+        self.assertIn(matching_line.id, candidate_ids)
+
+    def test_progressive_search_stops_on_unique_safe(self):
+        """Test that progressive mode stops at the first stage with a unique safe match."""
+        st_line = self._create_statement_line(
+            1000.00, partner=self.partner, payment_ref='INV-555'
+        )
+        exact = self._create_posted_move_line(
+            1000.00, partner=self.partner, payment_ref='INV-555'
+        )
+        far = self._create_posted_move_line(
+            1000.00, partner=self.partner, payment_ref='INV-555',
+            date=self.test_date - timedelta(days=20),
+        )
+
+        stats = {}
+        candidates = self.engine.find_candidates(
+            st_line, search_mode='progressive', stage_stats=stats
+        )
+
+        candidate_ids = [c['move_line_id'] for c in candidates]
+        self.assertIn(exact.id, candidate_ids)
+        self.assertNotIn(far.id, candidate_ids, "Wider rings should not be searched")
+        self.assertEqual(stats, {'3d': 1})
+
+    def test_progressive_search_widens_to_full_window(self):
+        """Test that progressive mode reaches the full window when nothing is safe."""
+        st_line = self._create_statement_line(1000.00)
+        far = self._create_posted_move_line(
+            1000.00, date=self.test_date + timedelta(days=20)
+        )
+
+        stats = {}
+        candidates = self.engine.find_candidates(
+            st_line, search_mode='progressive', stage_stats=stats
+        )
+
+        self.assertIn(far.id, [c['move_line_id'] for c in candidates])
+        self.assertEqual(stats, {'full': 1})
+
+    def test_blocking_scores_only_pairs_sharing_a_key(self):
+        """Test that blocking skips pairs with no common key and reports reduction."""
+        st_line = self._create_statement_line(
+            1000.00, partner=self.partner, payment_ref='INV-98765'
+        )
+        same_partner = self._create_posted_move_line(
+            1000.00, partner=self.partner, payment_ref='INV-98765'
+        )
+        other_partner = self.env['res.partner'].create({
+            'name': 'Unrelated Partner',
+            'company_id': self.company.id,
+        })
+        unrelated = self._create_posted_move_line(
+            4321.00, partner=other_partner, payment_ref='ZZZZ',
+            date=self.test_date + timedelta(days=15),
+        )
+
+        stats = {}
+        index = self.engine._build_blocking_index(st_line, blocking_stats=stats)
+        blocked = self.engine._search_blocked_candidates(st_line, index)
+        self.assertIn(same_partner, blocked)
+        self.assertNotIn(unrelated, blocked)
+        self.assertLess(stats['pairs_blocked'], stats['pairs_total'])
+
+        candidates = self.engine.find_candidates(
+            st_line, search_mode='blocking', blocking_index=index
+        )
+        self.assertIn(same_partner.id, [c['move_line_id'] for c in candidates])
+
+        Engine = type(self.engine)
+        with patch.object(
+            Engine, '_get_matching_context', autospec=True, side_effect=Engine._get_matching_context,
+        ) as get_context:
+            evaluation = self.engine.evaluate_blocking(st_line)
+        self.assertEqual(evaluation['recall'], 1.0)
+        self.assertGreater(evaluation['reduction_ratio'], 0.0)
+        # One context (and rate table) for the evaluation, not one per scored pair
+        self.assertEqual(get_context.call_count, 1)
+
+    def test_blocking_keys_amounts_in_a_common_currency(self):
+        """Test that a foreign-currency statement line blocks with items in either currency."""
+        currency = self.env['res.currency'].create({'name': 'XBC', 'symbol': 'B', 'rounding': 0.01})
+        self.env['res.currency.rate'].create({
+            'currency_id': currency.id, 'company_id': self.company.id,
+            'name': self.test_date, 'rate': 2.0,
+        })
+        journal = self.env['account.journal'].create({
+            'name': 'Foreign Bank',
+            'code': 'BNKX',
+            'type': 'bank',
+            'company_id': self.company.id,
+            'currency_id': currency.id,
+        })
+        st_line = self.env['account.bank.statement.line'].create({
+            'journal_id': journal.id,
+            'date': self.test_date,
+            'amount': 400.00,
+            'payment_ref': 'Wire',
+        })
+        # Another week and no common reference: only the amount keys can block
+        later = self.test_date + timedelta(days=10)
+        company_item = self._create_posted_move_line(200.00, payment_ref='AAAA', date=later).filtered(
+            lambda line: line.account_id == self.account_receivable
+        )
+        move = self.env['account.move'].create({
+            'journal_id': self.bank_journal.id,
+            'date': later,
+            'move_type': 'entry',
+            'company_id': self.company.id,
+            'line_ids': [
+                (0, 0, {
+                    'account_id': self.account_receivable.id,
+                    'currency_id': currency.id,
+                    'amount_currency': 400.00,
+                    'debit': 190.00,
+                    'credit': 0,
+                    'ref': 'BBBB',
+                }),
+                (0, 0, {
+                    'account_id': self.account_bank.id,
+                    'currency_id': currency.id,
+                    'amount_currency': -400.00,
+                    'debit': 0,
+                    'credit': 190.00,
+                }),
+            ],
+        })
+        move.action_post()
+        foreign_item = move.line_ids.filtered(lambda line: line.account_id == self.account_receivable)
+
+        index = self.engine._build_blocking_index(st_line)
+        blocked = self.engine._search_blocked_candidates(st_line, index)
+
+        # 400 XBC is 200 in company currency, and 400 in the item's transaction currency
+        self.assertIn(company_item, blocked)
+        self.assertIn(foreign_item, blocked)
+
+    def test_matching_context_cached_and_invalidated(self):
+        """Test that the company context is cached and refreshed on journal changes."""
+        context = self.engine._get_matching_context(self.company)
+        self.assertIn(self.bank_journal.id, context.bank_journal_ids)
+        self.assertIn(self.bank_journal_2.id, context.bank_journal_ids)
+        self.assertEqual(context.get_rounding(), self.company.currency_id.rounding)
+
+        # Cached: no query on the second lookup
+        with self.assertQueryCount(0):
+            self.engine._get_matching_context(self.company)
+
+        new_journal = self.env['account.journal'].create({
+            'name': 'Bank Journal 3',
+            'code': 'BNK3',
+            'type': 'bank',
+            'company_id': self.company.id,
+        })
+        context = self.engine._get_matching_context(self.company)
+        self.assertIn(new_journal.id, context.bank_journal_ids)
+
+        # Fields the context does not read leave the cache alone
+        new_journal.name = 'Bank Journal 3 (renamed)'
+        with self.assertQueryCount(0):
+            self.engine._get_matching_context(self.company)
+
+        new_journal.type = 'cash'
+        context = self.engine._get_matching_context(self.company)
+        self.assertNotIn(new_journal.id, context.bank_journal_ids)
+
+    def test_index_advisor_reports_plans(self):
+        """Test that the index advisor explains every candidate query."""
+        st_line = self._create_statement_line(1000.00, partner=self.partner)
+
+        report = self.engine.explain_candidate_queries(st_line)
+
+        self.assertEqual(
+            set(report), {'amount_candidates', 'partner_scoped', 'internal_transfers'}
+        )
+        for result in report.values():
+            self.assertIn('mass_reconcile_open_item', result['plan'])
+            self.assertIsInstance(result['indexes'], list)
+
+    def test_open_item_snapshot_follows_move_lifecycle(self):
+        """Test that posting, reconciling and resetting keep the snapshot in sync."""
+        OpenItem = self.env['mass.reconcile.open.item']
+        move_line = self._create_posted_move_line(
+            1000.00, partner=self.partner, payment_ref=' INV-42 '
+        )
+
+        item = OpenItem.search([('move_line_id', '=', move_line.id)])
+        self.assertEqual(len(item), 1, "Posted open line should be in the snapshot")
+        self.assertEqual(item.abs_amount, 1000.00)
+        self.assertEqual(item.reference_key, 'inv-42')
+        self.assertEqual(item.partner_id, self.partner.commercial_partner_id)
+
+        full_reconcile = self.env['account.full.reconcile'].create({'name': 'Snapshot'})
+        move_line.write({'full_reconcile_id': full_reconcile.id})
+        self.assertFalse(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+        move_line.write({'full_reconcile_id': False})
+        self.assertTrue(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+        move_line.move_id.button_draft()
+        self.assertFalse(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+        self.assertEqual(OpenItem.rebuild(), OpenItem.search_count([]))
+        self.assertFalse(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+    def test_open_item_snapshot_follows_new_lines_and_accounts(self):
+        """Test that lines added to posted moves and reconcile flag toggles reach the snapshot."""
+        OpenItem = self.env['mass.reconcile.open.item']
+        move = self._create_posted_move_line(500.00, partner=self.partner).move_id
+        added = self.env['account.move.line'].create([{
+            'move_id': move.id,
+            'account_id': account.id,
+            'partner_id': self.partner.id,
+            'ref': ' Added ',
+            'debit': debit,
+            'credit': credit,
+        } for account, debit, credit in (
+            (self.account_receivable, 50.00, 0.0),
+            (self.account_bank, 0.0, 50.00),
+        )])
+        item = OpenItem.search([('move_line_id', '=', added[0].id)])
+        self.assertEqual(item.balance, 50.00)
+        self.assertEqual(item.reference_key, 'added')
+        self.assertEqual(item.partner_id, self.partner.commercial_partner_id)
+
+        account = self.env['account.account'].create({
+            'name': 'Test Suspense',
+            'code': 'TEST_SUSP',
+            'account_type': 'asset_current',
+            'reconcile': False,
+            'company_id': self.company.id,
+        })
+        move_line = self._create_posted_move_line(75.00, account=account).move_id.line_ids.filtered(
+            lambda line: line.account_id == account
+        )
+        self.assertFalse(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+        account.reconcile = True
+        self.assertTrue(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+        account.reconcile = False
+        self.assertFalse(OpenItem.search([('move_line_id', '=', move_line.id)]))
+
+    def test_foreign_currency_matches_on_amount_currency(self):
+        """Test that foreign-currency lines match on the transaction currency amount."""
+        gbp = self.env['res.currency'].with_context(active_test=False).search(
+            [('name', '=', 'GBP')], limit=1
+        )
+        gbp.active = True
+        move = self.env['account.move'].create({
+            'journal_id': self.bank_journal.id,
+            'date': self.test_date,
+            'move_type': 'entry',
+            'company_id': self.company.id,
+            'line_ids': [
+                (0, 0, {
+                    'account_id': self.account_receivable.id,
+                    'currency_id': gbp.id,
+                    'amount_currency': 500.00,
+                    'debit': 640.00,
+                    'credit': 0,
+                }),
+                (0, 0, {
+                    'account_id': self.account_bank.id,
+                    'currency_id': gbp.id,
+                    'amount_currency': -500.00,
+                    'debit': 0,
+                    'credit': 640.00,
+                }),
+            ],
+        })
+        move.action_post()
+        invoice_line = move.line_ids.filtered(lambda l: l.account_id == self.account_receivable)
+
+        # Booked at a different rate on the bank side: only the GBP amounts agree
+        st_line = self._create_statement_line(655.00)
+        st_line.write({'foreign_currency_id': gbp.id, 'amount_currency': 500.00})
+
+        candidates = self.engine.find_candidates(st_line)
+
+        self.assertIn(invoice_line.id, [c['move_line_id'] for c in candidates])
+        self.assertEqual(self.scorer._score_amount(st_line, invoice_line), 100.0)
+
+    def test_rate_table_loaded_once_per_date(self):
+        """Test that converted comparisons reuse the run's rate table."""
+        context = self.engine._get_matching_context(self.company)
+        eur = self.env['res.currency'].with_context(active_test=False).search(
+            [('name', '=', 'EUR')], limit=1
+        )
+        other = eur if eur.id != context.company_currency_id else self.currency
+
+        self.engine._convert_to_company_currency(100.0, other.id, self.test_date, context)
+        with self.assertQueryCount(0):
+            self.engine._convert_to_company_currency(250.0, other.id, self.test_date, context)
+
+    def test_payload_api_ranks_without_creating_records(self):
+        """Test that the payload API ranks candidates and stores nothing."""
+        move_line = self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-777')
+        line_count = self.env['account.bank.statement.line'].search_count([])
+        match_count = self.env['mass.reconcile.match'].search_count([])
+
+        results = self.engine.match_statement_payloads(self.bank_journal.id, [
+            {'ref': 'TRX-1', 'amount': 1000.00, 'date': str(self.test_date),
+             'reference': 'INV-777', 'partner_id': self.partner.id},
+            {'ref': 'TRX-2', 'amount': 4321.00, 'date': str(self.test_date)},
+        ])
+
+        self.assertEqual([r['ref'] for r in results], ['TRX-1', 'TRX-2'])
+        self.assertEqual(results[0]['candidates'][0]['move_line_id'], move_line.id)
+        self.assertEqual(results[0]['candidates'][0]['confidence_class'], 'safe')
+        self.assertEqual(results[1]['candidates'], [])
+        self.assertEqual(self.env['account.bank.statement.line'].search_count([]), line_count)
+        self.assertEqual(self.env['mass.reconcile.match'].search_count([]), match_count)
+
+        with self.assertRaises(ValidationError):
+            self.engine.match_statement_payloads(self.bank_journal.id, [
+                {'amount': 10.0, 'date': str(self.test_date), 'currency': 'XXZ'},
+            ])
+
+    def test_payload_amount_in_foreign_journal_currency(self):
+        """Test that a payload in a third currency is converted to the journal currency."""
+        journal_currency, payload_currency = self.env['res.currency'].create([
+            {'name': 'XJC', 'symbol': 'J', 'rounding': 0.01},
+            {'name': 'XPC', 'symbol': 'P', 'rounding': 0.01},
+        ])
+        self.env['res.currency.rate'].create([
+            {'currency_id': journal_currency.id, 'company_id': self.company.id,
+             'name': self.test_date, 'rate': 2.0},
+            {'currency_id': payload_currency.id, 'company_id': self.company.id,
+             'name': self.test_date, 'rate': 4.0},
+        ])
+        journal = self.env['account.journal'].create({
+            'name': 'Foreign Bank',
+            'code': 'BNKF',
+            'type': 'bank',
+            'company_id': self.company.id,
+            'currency_id': journal_currency.id,
+        })
+        context = self.engine._get_matching_context(self.company)
+
+        line = self.engine._new_payload_statement_lines(journal, [
+            {'amount': 400.0, 'date': str(self.test_date), 'currency': 'XPC'},
+        ], {'XPC': payload_currency.id}, context)
+
+        self.assertEqual(line.foreign_currency_id, payload_currency)
+        self.assertEqual(line.amount_currency, 400.0)
+        self.assertEqual(line.amount, 200.0)
+
+    def _reconcile_statement_line(self, st_line, move_line):
+        """Reconcile a statement line with a journal item through its suspense line."""
+        _liquidity, suspense, _other = st_line._seek_for_lines()
+        suspense.with_context(skip_account_move_synchronization=True).write({
+            'account_id': move_line.account_id.id,
+            'partner_id': move_line.partner_id.id,
+        })
+        (suspense | move_line).reconcile()
+        self.assertTrue(st_line.is_reconciled)
+
+    def test_simulation_writes_nothing(self):
+        """Test that a dry run reports statistics against reconciled lines without writing."""
+        move_line = self._create_posted_move_line(1000.00, partner=self.partner, payment_ref='INV-900')
+        move_line = move_line.filtered(lambda line: line.account_id == self.account_receivable)
+        st_line = self._create_statement_line(1000.00, partner=self.partner, payment_ref='INV-900')
+        self._create_statement_line(7777.00)
+        self._reconcile_statement_line(st_line, move_line)
+
+        stats = self.batch.action_simulate_matching(weights={'amount': 1.0})
+
+        self.assertEqual(stats['lines'], 2)
+        self.assertEqual(stats['ground_truth_lines'], 1)
+        self.assertEqual(stats['classes']['safe'], 1)
+        self.assertEqual(stats['classes']['unmatched'], 1)
+        self.assertEqual(stats['precision']['safe'], 1.0)
+        self.assertEqual(stats['recall'], 1.0)
+        self.assertIn('candidate_search', stats['timings'])
+        self.assertFalse(self.batch.match_ids)
+        self.assertEqual(st_line.match_state, 'unmatched')
+        self.assertTrue(move_line.full_reconcile_id)
+
+    def test_simulation_date_window_reaches_the_scorer(self):
+        """Test that a simulated date window changes the date factor, not only the search."""
+        move_line = self._create_posted_move_line(
+            1000.00, partner=self.partner, date=self.test_date - timedelta(days=5),
+        ).filtered(lambda line: line.account_id == self.account_receivable)
+        st_line = self._create_statement_line(1000.00, partner=self.partner)
+        self._reconcile_statement_line(st_line, move_line)
+        lines = self.batch.statement_line_ids
+
+        # Date factor only: 5 days off scores 100 * (1 - 5/30) by default, 50 over 10 days
+        default = self.engine.simulate_matching(lines, weights={'date': 1.0})
+        narrow = self.engine.simulate_matching(lines, weights={'date': 1.0}, date_range_days=10)
+
+        self.assertEqual(default['classes']['probable'], 1)
+        self.assertEqual(narrow['classes']['doubtful'], 1)
+        self.assertEqual(narrow['recall'], 1.0)